@@ -0,0 +1,63 @@
+"""Benchmark of state machine class construction.
+
+Builds machines with 10, 100, 1,000 and 10,000 states, each with transitions
+to the next two states and one named transition per state. Time of creating
+states enum is measured separately, since it doesn't depend on this library.
+
+Run with ``python benchmarks/construction.py`` (package must be importable,
+for example installed with ``pip install -e .``).
+"""
+
+import time
+from enum import Enum
+
+from super_state_machine import machines
+
+
+def build_config(size):
+    names = ["s{}".format(number) for number in range(size)]
+    transitions = dict(
+        (name, [names[(number + 1) % size], names[(number + 2) % size]])
+        for number, name in enumerate(names)
+    )
+    named_transitions = [
+        ("go_{}".format(name), name, [names[number - 1], names[number - 3]])
+        for number, name in enumerate(names)
+    ]
+    return names, transitions, named_transitions
+
+
+def build_machine(states, transitions, named_transitions):
+    class Meta:
+        pass
+
+    Meta.initial_state = "s0"
+    Meta.transitions = transitions
+    Meta.named_transitions = named_transitions
+    return type(machines.StateMachine)(
+        "Machine", (machines.StateMachine,), {"States": states, "Meta": Meta}
+    )
+
+
+def main(sizes=(10, 100, 1000, 10000)):
+    print("{:>8}{:>14}{:>14}".format("states", "enum [ms]", "machine [ms]"))
+    for size in sizes:
+        names, transitions, named_transitions = build_config(size)
+
+        start = time.perf_counter()
+        states = Enum("States", [(name.upper(), name) for name in names])
+        enum_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_machine(states, transitions, named_transitions)
+        machine_time = time.perf_counter() - start
+
+        print(
+            "{:>8}{:>14.2f}{:>14.2f}".format(
+                size, enum_time * 1000, machine_time * 1000
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
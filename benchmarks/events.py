@@ -0,0 +1,70 @@
+"""Benchmark of event dispatch.
+
+Compares ``send`` (one lookup in compiled table) with chain of conditions,
+which checks state and event before calling generated setter.
+
+Run with ``python benchmarks/events.py`` (package must be importable, for
+example installed with ``pip install -e .``).
+"""
+
+import timeit
+from enum import Enum
+
+from super_state_machine import machines
+
+
+class Document(machines.StateMachine):
+    state = "draft"
+
+    class States(Enum):
+        DRAFT = "draft"
+        PENDING = "pending"
+        APPROVED = "approved"
+        REJECTED = "rejected"
+
+    class Meta:
+        events = {
+            "submit": [("draft", "pending"), ("rejected", "pending")],
+            "approve": [("pending", "approved"), ("draft", "approved")],
+            "reject": [("pending", "rejected")],
+            "reopen": [("approved", "draft"), ("rejected", "draft")],
+        }
+
+
+def dispatch(document, event):
+    if event == "submit" and (document.is_draft or document.is_rejected):
+        document.set_pending()
+    elif event == "approve" and (document.is_pending or document.is_draft):
+        document.set_approved()
+    elif event == "reject" and document.is_pending:
+        document.set_rejected()
+    elif event == "reopen" and (document.is_approved or document.is_rejected):
+        document.set_draft()
+    else:
+        raise ValueError(event)
+
+
+def measure(function, number):
+    return min(timeit.repeat(function, number=number, repeat=5))
+
+
+def main(number=20000):
+    events = ["submit", "reject", "submit", "approve", "reopen"]
+    document = Document()
+
+    def with_conditions():
+        for event in events:
+            dispatch(document, event)
+
+    def with_send():
+        for event in events:
+            document.send(event)
+
+    print("{:<12}{:>12}".format("method", "ns/event"))
+    for name, function in [("conditions", with_conditions), ("send", with_send)]:
+        elapsed = measure(function, number)
+        print("{:<12}{:>12.1f}".format(name, elapsed / number / len(events) * 1e9))
+
+
+if __name__ == "__main__":
+    main()
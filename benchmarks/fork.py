@@ -0,0 +1,50 @@
+"""Benchmark of copying state machines.
+
+Compares `copy.deepcopy` with ``fork`` and ``fork_many``.
+
+Run with ``python benchmarks/fork.py`` (package must be importable, for
+example installed with ``pip install -e .``).
+"""
+
+import copy
+import timeit
+from enum import Enum
+
+from super_state_machine import machines
+
+
+class Task(machines.StateMachine):
+    state = "draft"
+
+    class States(Enum):
+        DRAFT = "draft"
+        SCHEDULED = "scheduled"
+        SENT = "sent"
+
+    class Meta:
+        transitions = {
+            "draft": ["scheduled"],
+            "scheduled": ["sent"],
+        }
+
+
+def measure(function, number):
+    return min(timeit.repeat(function, number=number, repeat=5))
+
+
+def main(size=1000, number=20):
+    tasks = [Task() for _ in range(size)]
+    cases = [
+        ("deepcopy", lambda: [copy.deepcopy(task) for task in tasks]),
+        ("fork", lambda: [task.fork() for task in tasks]),
+        ("fork_many", lambda: Task.fork_many(tasks)),
+    ]
+
+    print("{:<12}{:>16}".format("method", "ns/machine"))
+    for name, function in cases:
+        elapsed = measure(function, number)
+        print("{:<12}{:>16.1f}".format(name, elapsed / number / size * 1e9))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Benchmark of bulk state migration.
+
+Compares migration of codes stored in bytes with per row approach (translate
+old state and force set new one on machine).
+
+Run with ``python benchmarks/migrations.py`` (package must be importable, for
+example installed with ``pip install -e .``).
+"""
+
+import random
+import time
+from enum import Enum
+
+from super_state_machine import machines, migrations
+
+
+class OldStates(Enum):
+    DRAFT = "draft"
+    NEW = "new"
+    SENT = "sent"
+    BROKEN = "broken"
+
+
+class NewStates(Enum):
+    DRAFT = "draft"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class NewMachine(machines.StateMachine):
+    States = NewStates
+    state = "draft"
+
+
+def main(rows=1000000):
+    migration = migrations.StateMigration(
+        OldStates, NewMachine, {"new": "draft", "broken": "failed"}
+    )
+    old_states = list(OldStates)
+    codes = bytearray(random.randrange(len(old_states)) for _ in range(rows))
+
+    machine = NewMachine()
+    start = time.perf_counter()
+    for code in codes:
+        machine.force_set(migration.translate(old_states[code]))
+    per_row = time.perf_counter() - start
+
+    start = time.perf_counter()
+    migration.migrate_codes(codes)
+    bulk = time.perf_counter() - start
+
+    print("rows: {rows}".format(rows=rows))
+    print("per row: {time:.3f}s".format(time=per_row))
+    print("bulk:    {time:.3f}s".format(time=bulk))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark of simulating many entities.
+
+Compares stepping machine instances with ``set_`` (drawing target of each
+entity in Python) with vectorized ``simulation.simulate``.
+
+Run with ``python benchmarks/simulation.py`` (package and NumPy must be
+importable, for example installed with ``pip install -e .[simulation]``).
+"""
+
+import random
+import time
+from enum import Enum
+
+from super_state_machine import machines, simulation
+
+
+class Order(machines.StateMachine):
+    state = "new"
+
+    class States(Enum):
+        NEW = "new"
+        PAID = "paid"
+        SHIPPED = "shipped"
+        CANCELLED = "cancelled"
+
+    class Meta:
+        transitions = {
+            "new": ["paid", "cancelled"],
+            "paid": ["shipped", "cancelled"],
+        }
+
+
+PROBABILITIES = {
+    ("new", "paid"): 0.2,
+    ("new", "cancelled"): 0.05,
+    ("paid", "shipped"): 0.1,
+    ("paid", "cancelled"): 0.01,
+}
+
+
+def simulate_instances(size, ticks):
+    targets = {}
+    for (source, target), probability in PROBABILITIES.items():
+        targets.setdefault(source, []).append((probability, target))
+
+    orders = [Order() for _ in range(size)]
+    for _ in range(ticks):
+        for order in orders:
+            draw = random.random()
+            for probability, target in targets.get(order.state, ()):
+                if draw < probability:
+                    order.set_(target)
+                    break
+                draw -= probability
+
+
+def main(size=100000, ticks=20):
+    print("{:<12}{:>20}".format("method", "ns/entity/tick"))
+    cases = [
+        ("instances", lambda: simulate_instances(size, ticks)),
+        (
+            "simulate",
+            lambda: simulation.simulate(
+                Order, PROBABILITIES, {"new": size}, ticks, seed=1
+            ),
+        ),
+    ]
+    for name, function in cases:
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        print("{:<12}{:>20.1f}".format(name, elapsed / size / ticks * 1e9))
+
+
+if __name__ == "__main__":
+    main()
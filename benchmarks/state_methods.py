@@ -0,0 +1,79 @@
+"""Benchmark of state dependent methods.
+
+Compares method dispatched by `state_method` tables with method checking
+generated ``is_*`` properties one by one.
+
+Run with ``python benchmarks/state_methods.py`` (package must be importable,
+for example installed with ``pip install -e .``).
+"""
+
+import timeit
+from enum import Enum
+
+from super_state_machine import machines
+
+
+class States(Enum):
+    NEW = "new"
+    OPEN = "open"
+    PAUSED = "paused"
+    CLOSING = "closing"
+    CLOSED = "closed"
+
+
+class WithConditions(machines.StateMachine):
+    States = States
+    state = "closed"
+
+    def handle(self):
+        if self.is_new:
+            return 0
+        elif self.is_open:
+            return 1
+        elif self.is_paused:
+            return 2
+        elif self.is_closing:
+            return 3
+        elif self.is_closed:
+            return 4
+
+
+class WithStateMethods(machines.StateMachine):
+    States = States
+    state = "closed"
+
+    @machines.state_method("new")
+    def handle(self):
+        return 0
+
+    @handle.state("open")
+    def handle(self):
+        return 1
+
+    @handle.state("paused")
+    def handle(self):
+        return 2
+
+    @handle.state("closing")
+    def handle(self):
+        return 3
+
+    @handle.state("closed")
+    def handle(self):
+        return 4
+
+
+def measure(function, number):
+    return min(timeit.repeat(function, number=number, repeat=5))
+
+
+def main(number=100000):
+    print("{:<16}{:>12}".format("method", "ns/call"))
+    for machine_class in [WithConditions, WithStateMethods]:
+        machine = machine_class()
+        elapsed = measure(lambda: machine.handle(), number)
+        print("{:<16}{:>12.1f}".format(machine_class.__name__, elapsed / number * 1e9))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark of changing states from many threads.
+
+Measures throughput of ``set_`` with growing number of threads, both on
+independent machines (one per thread) and on one shared machine. On builds of
+Python with GIL throughput doesn't grow with threads, on free-threaded builds
+independent machines should scale.
+
+Run with ``python benchmarks/threads.py`` (package must be importable, for
+example installed with ``pip install -e .``).
+"""
+
+import os
+import sys
+import threading
+import time
+from enum import Enum
+
+from super_state_machine import machines
+
+
+class Task(machines.StateMachine):
+    state = "draft"
+
+    class States(Enum):
+        DRAFT = "draft"
+        SCHEDULED = "scheduled"
+        SENT = "sent"
+
+    class Meta:
+        # Shared machine is changed concurrently, so its transitions can't
+        # be checked against state seen by one thread.
+        complete = True
+
+
+def work(task, number):
+    for _ in range(number):
+        task.set_("scheduled")
+        task.set_("sent")
+        task.set_("draft")
+
+
+def measure(tasks, number):
+    barrier = threading.Barrier(len(tasks) + 1)
+
+    def run(task):
+        barrier.wait()
+        work(task, number)
+
+    threads = [threading.Thread(target=run, args=(task,)) for task in tasks]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return len(tasks) * number * 3 / elapsed
+
+
+def main(number=20000):
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)
+    print("GIL enabled: {}".format(is_gil_enabled()))
+    print("{:<10}{:>20}{:>20}".format("threads", "independent/s", "shared/s"))
+
+    count = 1
+    while count <= (os.cpu_count() or 1) * 2:
+        independent = measure([Task() for _ in range(count)], number)
+        shared = measure([Task()] * count, number)
+        print("{:<10}{:>20.0f}{:>20.0f}".format(count, independent, shared))
+        count *= 2
+
+
+if __name__ == "__main__":
+    main()
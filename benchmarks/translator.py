@@ -0,0 +1,62 @@
+"""Benchmark of state translation.
+
+Compares actual `EnumValueTranslator` with previous implementation, which
+checked enum membership before looking into search table.
+
+Run with ``python benchmarks/translator.py`` (package must be importable, for
+example installed with ``pip install -e .``).
+"""
+
+import timeit
+from enum import Enum
+
+from super_state_machine import utils
+
+
+class States(Enum):
+    DRAFT = "draft"
+    SCHEDULED = "scheduled"
+    PROCESSING = "processing"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class LegacyTranslator(object):
+    """Translator as it was implemented before single lookup table."""
+
+    def __init__(self, base_enum):
+        self.base_enum = base_enum
+        self.search_table = dict((item.value, item) for item in base_enum)
+
+    def translate(self, value):
+        if isinstance(value, Enum):
+            if value in self.base_enum:
+                return value
+            raise ValueError(value)
+        try:
+            return self.search_table[value]
+        except KeyError:
+            raise ValueError(value)
+
+
+def measure(translator, value, number):
+    translate = translator.translate
+    return min(timeit.repeat(lambda: translate(value), number=number, repeat=5))
+
+
+def main(number=200000):
+    translators = [
+        ("legacy", LegacyTranslator(States)),
+        ("current", utils.EnumValueTranslator(States)),
+    ]
+    cases = [("value", "processing"), ("member", States.PROCESSING)]
+
+    print("{:<10}{:<10}{:>12}".format("case", "impl", "ns/call"))
+    for case, value in cases:
+        for name, translator in translators:
+            elapsed = measure(translator, value, number)
+            print("{:<10}{:<10}{:>12.1f}".format(case, name, elapsed / number * 1e9))
+
+
+if __name__ == "__main__":
+    main()
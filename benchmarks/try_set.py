@@ -0,0 +1,61 @@
+"""Benchmark of non raising transitions.
+
+Compares ``set_`` (with exception handling) with ``try_set_`` and generated
+``try_set_*`` methods, both for accepted and rejected transitions.
+
+Run with ``python benchmarks/try_set.py`` (package must be importable, for
+example installed with ``pip install -e .``).
+"""
+
+import timeit
+from enum import Enum
+
+from super_state_machine import errors, machines
+
+
+class Task(machines.StateMachine):
+    state = "draft"
+
+    class States(Enum):
+        DRAFT = "draft"
+        SCHEDULED = "scheduled"
+        SENT = "sent"
+
+    class Meta:
+        transitions = {
+            "draft": ["draft", "scheduled"],
+            "scheduled": ["sent"],
+        }
+
+
+def set_or_reject(task, state):
+    try:
+        task.set_(state)
+    except errors.TransitionError:
+        return False
+    return True
+
+
+def measure(function, number):
+    return min(timeit.repeat(function, number=number, repeat=5))
+
+
+def main(number=100000):
+    task = Task()
+    cases = [
+        ("accept", "set_", lambda: set_or_reject(task, "draft")),
+        ("accept", "try_set_", lambda: task.try_set_("draft")),
+        ("accept", "try_set_*", task.try_set_draft),
+        ("reject", "set_", lambda: set_or_reject(task, "sent")),
+        ("reject", "try_set_", lambda: task.try_set_("sent")),
+        ("reject", "try_set_*", task.try_set_sent),
+    ]
+
+    print("{:<10}{:<12}{:>12}".format("case", "method", "ns/call"))
+    for case, name, function in cases:
+        elapsed = measure(function, number)
+        print("{:<10}{:<12}{:>12.1f}".format(case, name, elapsed / number * 1e9))
+
+
+if __name__ == "__main__":
+    main()
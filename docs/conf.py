@@ -41,6 +41,9 @@ sys.path.insert(0, project_root)
 # extensions coming with Sphinx (named 'sphinx.ext.*') or your custom ones.
 extensions = ["sphinx.ext.autodoc", "sphinx.ext.viewcode", "sphinx_mdinclude"]
 
+# Optional dependencies, not needed to build documentation.
+autodoc_mock_imports = ["numpy"]
+
 # Add any paths that contain templates here, relative to this directory.
 templates_path = ["_templates"]
 
@@ -0,0 +1,514 @@
+"""Backends for keeping states of machines outside of their instances.
+
+Backend keeps serialized states (values of states enum) under keys of
+machines. State machine class uses backend when it is set in ``backend``
+option - its state attribute reads from and writes to backend, so all other
+features work without changes.
+
+"""
+
+import sqlite3
+import threading
+
+from .versions import VersionedState
+
+_missing = object()
+
+
+class Backend(object):
+    """Interface of state backends.
+
+    Next to each value backend keeps its version - number of writes of key,
+    which allows to detect lost updates. Batched variants are implemented on
+    top of single key operations, so backends should override them when they
+    can do better.
+
+    """
+
+    def read(self, key, default=None):
+        """Get value stored under key (or default if there is none)."""
+        raise NotImplementedError
+
+    def write(self, key, value):
+        """Store value under key."""
+        raise NotImplementedError
+
+    def compare_and_set(self, key, expected, value):
+        """Store value under key only if actual value is the expected one.
+
+        Expected value `None` means that nothing is stored under key yet.
+
+        :returns: `True` if value was stored, `False` otherwise.
+
+        """
+        raise NotImplementedError
+
+    def read_version(self, key):
+        """Get version of value stored under key (``0`` if there is none)."""
+        raise NotImplementedError
+
+    def compare_version_and_set(self, key, expected_version, value):
+        """Store value under key only if its version is the expected one.
+
+        :returns: `True` if value was stored, `False` otherwise.
+
+        """
+        raise NotImplementedError
+
+    def compare_version_and_set_many(self, items):
+        """Store many values, each only if its version is the expected one.
+
+        :param dict items: Maps keys to 2-tuples of expected version and
+            value.
+        :returns: List of keys, which values were not stored.
+
+        """
+        return [
+            key
+            for key, (expected_version, value) in items.items()
+            if not self.compare_version_and_set(key, expected_version, value)
+        ]
+
+    def read_many(self, keys):
+        """Get values stored under keys, as dict (missing keys are skipped)."""
+        result = {}
+        for key in keys:
+            value = self.read(key, _missing)
+            if value is not _missing:
+                result[key] = value
+        return result
+
+    def write_many(self, items):
+        """Store many values at once.
+
+        :param dict items: Maps keys to values.
+
+        """
+        for key, value in items.items():
+            self.write(key, value)
+
+    def flush(self):
+        """Make sure that all pending writes are stored."""
+
+
+class MemoryBackend(Backend):
+    """Backend keeping values in dictionary of process."""
+
+    def __init__(self):
+        """Init."""
+        self.data = {}
+        self.versions = {}
+        self._lock = threading.Lock()
+
+    def read(self, key, default=None):
+        """Get value stored under key (or default if there is none)."""
+        return self.data.get(key, default)
+
+    def write(self, key, value):
+        """Store value under key."""
+        with self._lock:
+            self._write(key, value)
+
+    def _write(self, key, value):
+        self.data[key] = value
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def compare_and_set(self, key, expected, value):
+        """Store value under key only if actual value is the expected one."""
+        with self._lock:
+            if self.data.get(key) != expected:
+                return False
+            self._write(key, value)
+            return True
+
+    def read_version(self, key):
+        """Get version of value stored under key (``0`` if there is none)."""
+        return self.versions.get(key, 0)
+
+    def compare_version_and_set(self, key, expected_version, value):
+        """Store value under key only if its version is the expected one."""
+        with self._lock:
+            if self.versions.get(key, 0) != expected_version:
+                return False
+            self._write(key, value)
+            return True
+
+    def read_many(self, keys):
+        """Get values stored under keys, as dict (missing keys are skipped)."""
+        data = self.data
+        return dict((key, data[key]) for key in keys if key in data)
+
+    def write_many(self, items):
+        """Store many values at once."""
+        with self._lock:
+            for key, value in items.items():
+                self._write(key, value)
+
+
+class SQLiteBackend(Backend):
+    """Backend keeping values in SQLite table.
+
+    Writes are pipelined - they are buffered (only the last write of each key
+    is kept, along with number of writes) and stored in one transaction when
+    buffer reaches ``batch_size`` or when `flush` is called. Reads see
+    buffered writes.
+
+    """
+
+    def __init__(self, path=":memory:", table="states", batch_size=100):
+        """Init.
+
+        :param str path: Path of database file.
+        :param str table: Name of table, created if it doesn't exist.
+        :param int batch_size: Number of buffered writes that triggers flush.
+
+        """
+        if not table.isidentifier():
+            raise ValueError("Wrong table name: '{table}'.".format(table=table))
+
+        self.table = table
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS {table} "
+            "(key PRIMARY KEY, value, version INTEGER NOT NULL)".format(table=table)
+        )
+        self.pending = {}
+        self._lock = threading.RLock()
+
+    def read(self, key, default=None):
+        """Get value stored under key (or default if there is none)."""
+        with self._lock:
+            try:
+                return self.pending[key][0]
+            except KeyError:
+                pass
+            row = self.connection.execute(
+                "SELECT value FROM {table} WHERE key = ?".format(table=self.table),
+                (key,),
+            ).fetchone()
+        return default if row is None else row[0]
+
+    def write(self, key, value):
+        """Buffer write of value under key."""
+        with self._lock:
+            self._buffer(key, value)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+
+    def _buffer(self, key, value):
+        try:
+            writes = self.pending[key][1]
+        except KeyError:
+            writes = 0
+        self.pending[key] = (value, writes + 1)
+
+    def compare_and_set(self, key, expected, value):
+        """Store value under key only if actual value is the expected one.
+
+        Buffered writes are flushed first, so comparison is made against
+        database, which may be shared with other processes.
+
+        """
+        with self._lock:
+            self.flush()
+            if expected is None:
+                query = (
+                    "INSERT OR IGNORE INTO {table} (key, value, version) "
+                    "VALUES (?, ?, 1)"
+                )
+                parameters = (key, value)
+            else:
+                query = (
+                    "UPDATE {table} SET value = ?, version = version + 1 "
+                    "WHERE key = ? AND value = ?"
+                )
+                parameters = (value, key, expected)
+            cursor = self.connection.execute(query.format(table=self.table), parameters)
+            return cursor.rowcount == 1
+
+    def read_version(self, key):
+        """Get version of value stored under key (``0`` if there is none)."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT version FROM {table} WHERE key = ?".format(table=self.table),
+                (key,),
+            ).fetchone()
+            version = 0 if row is None else row[0]
+            try:
+                return version + self.pending[key][1]
+            except KeyError:
+                return version
+
+    def compare_version_and_set(self, key, expected_version, value):
+        """Store value under key only if its version is the expected one.
+
+        Buffered writes are flushed first, so comparison is made against
+        database, which may be shared with other processes.
+
+        """
+        return not self.compare_version_and_set_many({key: (expected_version, value)})
+
+    def compare_version_and_set_many(self, items):
+        """Store many values, each only if its version is the expected one.
+
+        All values are stored in one transaction.
+
+        """
+        rejected = []
+        insert = (
+            "INSERT OR IGNORE INTO {table} (key, value, version) "
+            "VALUES (?, ?, 1)".format(table=self.table)
+        )
+        update = (
+            "UPDATE {table} SET value = ?, version = version + 1 "
+            "WHERE key = ? AND version = ?".format(table=self.table)
+        )
+        with self._lock:
+            self.flush()
+            with self.connection:
+                self.connection.execute("BEGIN")
+                for key, (expected_version, value) in items.items():
+                    if expected_version == 0:
+                        cursor = self.connection.execute(insert, (key, value))
+                    else:
+                        cursor = self.connection.execute(
+                            update, (value, key, expected_version)
+                        )
+                    if cursor.rowcount != 1:
+                        rejected.append(key)
+        return rejected
+
+    def read_many(self, keys, chunk_size=500):
+        """Get values stored under keys, as dict (missing keys are skipped)."""
+        keys = list(keys)
+        result = {}
+        with self._lock:
+            for start in range(0, len(keys), chunk_size):
+                chunk = keys[start : start + chunk_size]
+                rows = self.connection.execute(
+                    "SELECT key, value FROM {table} WHERE key IN ({marks})".format(
+                        table=self.table, marks=", ".join("?" * len(chunk))
+                    ),
+                    chunk,
+                )
+                result.update(rows)
+            pending = self.pending
+            for key in keys:
+                if key in pending:
+                    result[key] = pending[key][0]
+        return result
+
+    def write_many(self, items):
+        """Buffer many writes at once."""
+        with self._lock:
+            for key, value in items.items():
+                self._buffer(key, value)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Store all buffered writes in one transaction."""
+        with self._lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, {}
+            with self.connection:
+                self.connection.execute("BEGIN")
+                self.connection.executemany(
+                    "INSERT INTO {table} (key, value, version) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+                    "version = version + excluded.version".format(table=self.table),
+                    ((key, value, writes) for key, (value, writes) in pending.items()),
+                )
+
+    def close(self):
+        """Flush buffered writes and close database."""
+        self.flush()
+        self.connection.close()
+
+
+class CachedBackend(Backend):
+    """Read-through cache in front of other backend.
+
+    Cache is write-through, so it is valid as long as stored values are
+    changed only through it. Values changed elsewhere are visible after
+    `invalidate`. Cache and backend are changed together under lock, so
+    cache doesn't get stale values when used from many threads.
+
+    """
+
+    def __init__(self, backend):
+        """Init.
+
+        :param Backend backend: Backend to cache.
+
+        """
+        self.backend = backend
+        self.cache = {}
+        self._lock = threading.RLock()
+
+    def read(self, key, default=None):
+        """Get value stored under key (or default if there is none)."""
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+        with self._lock:
+            value = self.backend.read(key, _missing)
+            if value is _missing:
+                return default
+            self.cache[key] = value
+            return value
+
+    def write(self, key, value):
+        """Store value under key."""
+        with self._lock:
+            self.cache[key] = value
+            self.backend.write(key, value)
+
+    def compare_and_set(self, key, expected, value):
+        """Store value under key only if actual value is the expected one."""
+        with self._lock:
+            if self.backend.compare_and_set(key, expected, value):
+                self.cache[key] = value
+                return True
+            self.cache.pop(key, None)
+            return False
+
+    def read_version(self, key):
+        """Get version of value stored under key (never cached)."""
+        return self.backend.read_version(key)
+
+    def compare_version_and_set(self, key, expected_version, value):
+        """Store value under key only if its version is the expected one."""
+        with self._lock:
+            if self.backend.compare_version_and_set(key, expected_version, value):
+                self.cache[key] = value
+                return True
+            self.cache.pop(key, None)
+            return False
+
+    def compare_version_and_set_many(self, items):
+        """Store many values, each only if its version is the expected one."""
+        with self._lock:
+            rejected = self.backend.compare_version_and_set_many(items)
+            for key, (expected_version, value) in items.items():
+                self.cache[key] = value
+            for key in rejected:
+                self.cache.pop(key, None)
+            return rejected
+
+    def read_many(self, keys):
+        """Get values stored under keys, reading only missing ones."""
+        cache = self.cache
+        result = {}
+        missing = []
+        for key in keys:
+            try:
+                result[key] = cache[key]
+            except KeyError:
+                missing.append(key)
+        if missing:
+            with self._lock:
+                values = self.backend.read_many(missing)
+                cache.update(values)
+            result.update(values)
+        return result
+
+    def write_many(self, items):
+        """Store many values at once."""
+        with self._lock:
+            self.cache.update(items)
+            self.backend.write_many(items)
+
+    def flush(self):
+        """Make sure that all pending writes are stored."""
+        self.backend.flush()
+
+    def invalidate(self, keys=None):
+        """Forget cached values of given keys (or all of them)."""
+        with self._lock:
+            if keys is None:
+                self.cache.clear()
+            else:
+                for key in keys:
+                    self.cache.pop(key, None)
+
+
+class BackendState(object):
+    """State attribute of machine class, which keeps states in backend.
+
+    Instances which have state in their own attribute (forks and speculating
+    machines) are detached from backend - their states and versions are kept
+    only in instance, like by `versions.VersionedState`.
+
+    """
+
+    def __init__(self, backend, key_attribute_name, translator, initial_state, name):
+        """Init.
+
+        :param Backend backend: Backend to use.
+        :param str key_attribute_name: Name of instance attribute with key.
+        :param EnumValueTranslator translator: Translator of machine.
+        :param Enum initial_state: State of machines without stored state.
+        :param str name: Name of state attribute.
+
+        """
+        self.backend = backend
+        self.key_attribute_name = key_attribute_name
+        self.translator = translator
+        self.initial_state = initial_state
+        self.name = name
+        self.detached = VersionedState(name, initial_state)
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self.initial_state
+        values = instance.__dict__
+        if self.name in values:
+            return values[self.name]
+        value = self.backend.read(getattr(instance, self.key_attribute_name))
+        if value is None:
+            return self.initial_state
+        return self.translator.translate(value)
+
+    def __set__(self, instance, state):
+        if self.name in instance.__dict__:
+            self.detached.__set__(instance, state)
+            return
+        key = getattr(instance, self.key_attribute_name)
+        self.backend.write(key, None if state is None else state.value)
+
+    def read_version(self, instance):
+        """Get version of state of instance."""
+        if self.name in instance.__dict__:
+            return self.detached.read_version(instance)
+        return self.backend.read_version(getattr(instance, self.key_attribute_name))
+
+    def compare_version_and_set_many(self, items):
+        """Set states of instances, if their versions are the expected ones.
+
+        :param list items: 3-tuples of instance, expected version and state.
+        :returns: List of instances, which states were not set.
+
+        """
+        instances = {}
+        changes = {}
+        detached = []
+        for instance, expected_version, state in items:
+            if self.name in instance.__dict__:
+                detached.append((instance, expected_version, state))
+                continue
+            key = getattr(instance, self.key_attribute_name)
+            instances[key] = instance
+            changes[key] = (expected_version, None if state is None else state.value)
+        rejected = self.detached.compare_version_and_set_many(detached)
+        if changes:
+            rejected.extend(
+                instances[key]
+                for key in self.backend.compare_version_and_set_many(changes)
+            )
+        return rejected
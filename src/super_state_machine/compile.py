@@ -0,0 +1,579 @@
+"""Ahead-of-time compilation of state machines to plain Python modules.
+
+Generated module contains states enum and fully expanded machine class with
+literal translation and transition tables and direct methods for every state,
+so importing it doesn't run state machine metaclass at all.
+
+Only state machine part of the class is compiled - methods and attributes
+defined by you are listed in header of generated module and must be added by
+subclassing generated class.
+
+Usage::
+
+    python -m super_state_machine.compile mymodule:OrderMachine -o order.py
+
+"""
+
+import argparse
+import importlib
+import sys
+from enum import Enum, IntEnum
+
+from . import timers, utils
+
+INDENT = "    "
+
+
+class MachineCompiler(object):
+    """Generates source of module with expanded state machine class."""
+
+    def __init__(self, machine, source=None):
+        """Init.
+
+        :param machine: State machine class to compile.
+        :param str source: Description of origin, put in module docstring.
+
+        """
+        self.machine = machine
+        self.meta = machine._meta
+        self.source = source or "{module}:{name}".format(
+            module=machine.__module__, name=machine.__qualname__
+        )
+        self.translator = self.meta["translator"]
+        self.states_enum = self.translator.base_enum
+        self.attribute = self.meta["state_attribute_name"]
+        self._library = dict(
+            (id(value), name)
+            for name, value in vars(utils).items()
+            if not name.startswith("__")
+        )
+
+    def compile(self):
+        """Get source of generated module."""
+        if "backend" in self.meta or "state_store" in self.meta:
+            raise ValueError(
+                "Can't compile machine - it keeps states in backend or counts "
+                "their versions."
+            )
+        if self.meta.get("state_methods"):
+            raise ValueError(
+                "Can't compile machine with state methods - their "
+                "implementations can't be generated."
+            )
+
+        lines = []
+        lines.extend(self._compile_header())
+        lines.extend(self._compile_enum())
+        lines.extend(self._compile_tables())
+        lines.extend(self._compile_class())
+        return "\n".join(lines) + "\n"
+
+    def _compile_header(self):
+        skipped = sorted(self._get_skipped_attributes())
+        lines = [
+            '"""Generated from {source} by super_state_machine.compile.'.format(
+                source=self.source
+            ),
+            "",
+            "Do not edit - regenerate instead.",
+        ]
+        if skipped:
+            lines.extend(
+                ["", "Not compiled: {names}.".format(names=", ".join(skipped))]
+            )
+        lines.extend(
+            [
+                '"""',
+                "",
+                "from enum import Enum, IntEnum",
+                "from functools import partial",
+                "",
+                "from super_state_machine import graph, machines, timers, utils",
+                "from super_state_machine.errors import TransitionError",
+                "",
+            ]
+        )
+        return lines
+
+    def _get_skipped_attributes(self):
+        generated = self.meta["generated_methods"]
+        states_enum_name = self.meta["config_getter"]("states_enum_name")
+        known = set(["Meta", "__module__", "__qualname__", "__doc__", "_meta"])
+        known.update([states_enum_name, "state", self.attribute])
+        known.update(["is_", "can_be_", "set_", "try_set_"])
+        known.update(["__dict__", "__weakref__"])
+        skipped = set()
+        for klass in self.machine.__mro__:
+            if klass is object or not hasattr(klass, "_meta"):
+                continue
+            for name in vars(klass):
+                if name not in generated and name not in known:
+                    skipped.add(name)
+        return skipped
+
+    def _compile_enum(self):
+        states_enum = self.states_enum
+        if issubclass(states_enum, IntEnum):
+            bases = "IntEnum"
+        elif issubclass(states_enum, str):
+            bases = "str, Enum"
+        elif issubclass(states_enum, int):
+            bases = "int, Enum"
+        else:
+            bases = "Enum"
+
+        lines = ["", "class States({bases}):".format(bases=bases)]
+        for item in states_enum:
+            self._check_literal(item.value)
+            lines.append(
+                "{indent}{name} = {value!r}".format(
+                    indent=INDENT, name=item.name, value=item.value
+                )
+            )
+        lines.append("")
+        lines.append("")
+        for item in states_enum:
+            lines.append(
+                "{constant} = States.{name}".format(
+                    constant=self._constant(item), name=item.name
+                )
+            )
+        return lines
+
+    def _constant(self, state):
+        return "_S_{name}".format(name=state.name)
+
+    def _literal(self, value):
+        if isinstance(value, Enum):
+            if value not in self.states_enum:
+                raise ValueError(
+                    "Can't compile '{value}' - only members of states enum "
+                    "can be used.".format(value=value)
+                )
+            return self._constant(value)
+        self._check_literal(value)
+        return repr(value)
+
+    @staticmethod
+    def _check_literal(value):
+        if type(value) not in (str, int):
+            raise ValueError(
+                "Can't compile value '{value}' - only strings and integers "
+                "are supported.".format(value=value)
+            )
+
+    def _compile_tables(self):
+        search_table = [
+            (key, state)
+            for key, state in self.translator.search_table.items()
+            # Members of parent enums (for narrowed states) don't exist in
+            # generated module.
+            if not isinstance(key, Enum) or key in self.states_enum
+        ]
+        lines = [""]
+        lines.extend(self._compile_table("_SEARCH_TABLE", search_table))
+        lines.extend(
+            self._compile_table("_FOLDED_TABLE", self.translator.folded_table.items())
+        )
+
+        lines.append("_TRANSITIONS = {")
+        for state, targets in self.meta["transitions"].items():
+            lines.append(
+                "{indent}{state}: {{{targets}}},".format(
+                    indent=INDENT,
+                    state=self._constant(state),
+                    targets=", ".join(
+                        self._constant(target)
+                        for target in sorted(targets, key=self._position)
+                    ),
+                ).replace("{}", "set()")
+            )
+        lines.append("}")
+        lines.extend(self._compile_events())
+
+        lines.extend(
+            [
+                "",
+                "_translator = utils.EnumValueTranslator.__new__(utils.EnumValueTranslator)",
+                "_translator.base_enum = States",
+                "_translator.aliases = {}",
+                "_translator.names = {names!r}".format(names=self.translator.names),
+                "_translator.case_insensitive = {value!r}".format(
+                    value=self.translator.case_insensitive
+                ),
+                "_translator.set_tables(_SEARCH_TABLE, _FOLDED_TABLE)",
+            ]
+        )
+        lines.extend(self._compile_listeners())
+        return lines
+
+    def _compile_events(self):
+        events = self.meta.get("events")
+        if not events:
+            return []
+
+        lines = ["", "_EVENTS = {"]
+        for event, edges in events.items():
+            lines.append(
+                "{indent}{event}: {{{edges}}},".format(
+                    indent=INDENT,
+                    event=self._literal(event),
+                    edges=", ".join(
+                        "{source}: {target}".format(
+                            source=self._constant(source),
+                            target=self._constant(target),
+                        )
+                        for source, target in edges.items()
+                    ),
+                )
+            )
+        lines.append("}")
+        lines.append(
+            "_EVENT_IDS = {{{ids}}}".format(
+                ids=", ".join(
+                    "{event}: {number}".format(
+                        event=self._literal(event), number=number
+                    )
+                    for event, number in self.meta["event_ids"].items()
+                )
+            )
+        )
+        lines.append("_EVENT_TABLE = (")
+        for target in self.meta["event_table"]:
+            lines.append(
+                "{indent}{target},".format(
+                    indent=INDENT,
+                    target="None" if target is None else self._constant(target),
+                )
+            )
+        lines.append(")")
+        return lines
+
+    def _compile_table(self, name, items):
+        lines = ["{name} = {{".format(name=name)]
+        for key, state in items:
+            lines.append(
+                "{indent}{key}: {state},".format(
+                    indent=INDENT, key=self._literal(key), state=self._constant(state)
+                )
+            )
+        if len(lines) == 1:
+            return ["{name} = {{}}".format(name=name)]
+        lines.append("}")
+        return lines
+
+    def _position(self, state):
+        return self.meta["graph"].index[state]
+
+    def _compile_listeners(self):
+        timeouts = self.meta.get("timeouts", None)
+        listeners = list(self.meta["listeners"])
+        initializers = list(self.meta["initializers"])
+        lines = []
+        if timeouts:
+            scheduler = next(
+                listener.__self__
+                for listener in listeners
+                if isinstance(
+                    getattr(listener, "__self__", None), timers.TimeoutScheduler
+                )
+            )
+            if scheduler.wheel is not timers.default_wheel:
+                raise ValueError(
+                    "Can't compile machine with custom timer wheel - only "
+                    "default one is supported."
+                )
+            lines.append("_TIMEOUTS = {")
+            for state, (delay, target) in timeouts.items():
+                lines.append(
+                    "{indent}{state}: ({delay!r}, {target}),".format(
+                        indent=INDENT,
+                        state=self._constant(state),
+                        delay=delay,
+                        target=self._constant(target),
+                    )
+                )
+            lines.append("}")
+            lines.append("_scheduler = timers.TimeoutScheduler(_TIMEOUTS)")
+            listeners.remove(scheduler.on_change)
+            initializers.remove(scheduler.on_create)
+
+        if listeners or initializers:
+            raise ValueError(
+                "Can't compile machine - it uses options, that can't be compiled."
+            )
+        return lines
+
+    def _compile_class(self):
+        meta = self.meta
+        name = self.machine.__name__
+        states_enum_name = meta["config_getter"]("states_enum_name")
+        lines = [
+            "",
+            "",
+            "class {name}(object):".format(name=name),
+            '{indent}"""State machine {name}."""'.format(indent=INDENT, name=name),
+            "",
+            "{indent}{enum_name} = States".format(
+                indent=INDENT, enum_name=states_enum_name
+            ),
+            "{indent}{attribute} = {state}".format(
+                indent=INDENT,
+                attribute=self.attribute,
+                state=self._constant(meta["initial_state"]),
+            ),
+            "{indent}state = utils.state_property".format(indent=INDENT),
+            "{indent}is_ = utils.is_".format(indent=INDENT),
+            "{indent}can_be_ = utils.can_be_".format(indent=INDENT),
+            "{indent}set_ = utils.set_".format(indent=INDENT),
+            "{indent}try_set_ = utils.try_set_".format(indent=INDENT),
+        ]
+        if meta["initializers"]:
+            lines.extend(self._compile_init())
+
+        for method_name in sorted(meta["generated_methods"]):
+            method = self._get_raw_attribute(method_name)
+            lines.append("")
+            lines.extend(self._compile_method(method_name, method))
+
+        lines.extend(self._compile_meta())
+        return lines
+
+    def _get_raw_attribute(self, name):
+        for klass in self.machine.__mro__:
+            if name in vars(klass):
+                return vars(klass)[name]
+        raise AttributeError(name)
+
+    def _compile_init(self):
+        return [
+            "",
+            "{indent}def __init__(self):".format(indent=INDENT),
+            "{indent}for initializer in self._meta['initializers']:".format(
+                indent=INDENT * 2
+            ),
+            "{indent}initializer(self)".format(indent=INDENT * 3),
+        ]
+
+    def _compile_method(self, name, method):
+        if id(method) in self._library:
+            return [
+                "{indent}{name} = utils.{library}".format(
+                    indent=INDENT, name=name, library=self._library[id(method)]
+                )
+            ]
+
+        if isinstance(method, classmethod) and id(method.__func__) in self._library:
+            return [
+                "{indent}{name} = classmethod(utils.{library})".format(
+                    indent=INDENT, name=name, library=self._library[id(method.__func__)]
+                )
+            ]
+
+        if isinstance(method, utils.ClassOrInstanceMethod):
+            return [
+                "{indent}{name} = utils.ClassOrInstanceMethod(".format(
+                    indent=INDENT, name=name
+                ),
+                "{indent}utils.{first}, utils.{second}".format(
+                    indent=INDENT * 2,
+                    first=self._library[id(method.class_method)],
+                    second=self._library[id(method.instance_method)],
+                ),
+                "{indent})".format(indent=INDENT),
+            ]
+
+        try:
+            kind, state = self.meta["method_states"][name]
+        except KeyError:
+            pass
+        else:
+            compilers = {
+                "getter": self._compile_getter,
+                "checker": self._compile_checker,
+                "setter": self._compile_setter,
+                "try_setter": self._compile_try_setter,
+            }
+            return compilers[kind](name, state)
+
+        raise ValueError(
+            "Can't compile method '{name}' - it is not generated by state "
+            "machine.".format(name=name)
+        )
+
+    def _compile_getter(self, name, state):
+        return [
+            "{indent}@property".format(indent=INDENT),
+            "{indent}def {name}(self):".format(indent=INDENT, name=name),
+            "{indent}return self.{attribute} is {state}".format(
+                indent=INDENT * 2, attribute=self.attribute, state=self._constant(state)
+            ),
+        ]
+
+    def _compile_checker(self, name, state):
+        lines = [
+            "{indent}@property".format(indent=INDENT),
+            "{indent}def {name}(self):".format(indent=INDENT, name=name),
+        ]
+        if self.meta["complete"]:
+            lines.append("{indent}return True".format(indent=INDENT * 2))
+        else:
+            lines.append(
+                "{indent}return {state} in _TRANSITIONS[self.{attribute}]".format(
+                    indent=INDENT * 2,
+                    attribute=self.attribute,
+                    state=self._constant(state),
+                )
+            )
+        return lines
+
+    def _compile_setter(self, name, state):
+        constant = self._constant(state)
+        lines = ["{indent}def {name}(self):".format(indent=INDENT, name=name)]
+        if not self.meta["complete"]:
+            lines.extend(
+                [
+                    "{indent}if {state} not in _TRANSITIONS[self.{attribute}]:".format(
+                        indent=INDENT * 2, state=constant, attribute=self.attribute
+                    ),
+                    "{indent}raise TransitionError(".format(indent=INDENT * 3),
+                    "{indent}\"Cannot transit from '{{actual_value}}' to "
+                    "'{{value}}'.\".format(".format(indent=INDENT * 4),
+                    "{indent}actual_value=self.{attribute}.value, "
+                    "value={state}.value".format(
+                        indent=INDENT * 5, attribute=self.attribute, state=constant
+                    ),
+                    "{indent})".format(indent=INDENT * 4),
+                    "{indent})".format(indent=INDENT * 3),
+                ]
+            )
+        lines.extend(self._compile_assignment(constant))
+        return lines
+
+    def _compile_try_setter(self, name, state):
+        constant = self._constant(state)
+        lines = ["{indent}def {name}(self):".format(indent=INDENT, name=name)]
+        if not self.meta["complete"]:
+            lines.extend(
+                [
+                    "{indent}if {state} not in _TRANSITIONS[self.{attribute}]:".format(
+                        indent=INDENT * 2, state=constant, attribute=self.attribute
+                    ),
+                    "{indent}return False".format(indent=INDENT * 3),
+                ]
+            )
+        lines.extend(self._compile_assignment(constant))
+        lines.append("{indent}return True".format(indent=INDENT * 2))
+        return lines
+
+    def _compile_assignment(self, constant):
+        if self.meta["listeners"]:
+            return [
+                "{indent}self.force_set({state})".format(
+                    indent=INDENT * 2, state=constant
+                )
+            ]
+        return [
+            "{indent}self.{attribute} = {state}".format(
+                indent=INDENT * 2, attribute=self.attribute, state=constant
+            )
+        ]
+
+    def _compile_meta(self):
+        meta = self.meta
+        lines = [
+            "",
+            "",
+            "{name}._meta = {{".format(name=self.machine.__name__),
+            '{indent}"translator": _translator,'.format(indent=INDENT),
+            '{indent}"state_attribute_name": {attribute!r},'.format(
+                indent=INDENT, attribute=self.attribute
+            ),
+            '{indent}"transitions": _TRANSITIONS,'.format(indent=INDENT),
+            '{indent}"complete": {complete!r},'.format(
+                indent=INDENT, complete=meta["complete"]
+            ),
+            '{indent}"graph": graph.TransitionGraph('
+            "tuple(States), _TRANSITIONS, {complete!r}),".format(
+                indent=INDENT, complete=meta["complete"]
+            ),
+            '{indent}"config_getter": partial('
+            "machines.get_config, machines.DefaultMeta),".format(indent=INDENT),
+            '{indent}"initial_state": {state},'.format(
+                indent=INDENT, state=self._constant(meta["initial_state"])
+            ),
+            '{indent}"generated_methods": frozenset({names!r}),'.format(
+                indent=INDENT, names=sorted(meta["generated_methods"])
+            ),
+        ]
+        if meta.get("events"):
+            lines.extend(
+                [
+                    '{indent}"events": _EVENTS,'.format(indent=INDENT),
+                    '{indent}"event_ids": _EVENT_IDS,'.format(indent=INDENT),
+                    '{indent}"event_table": _EVENT_TABLE,'.format(indent=INDENT),
+                ]
+            )
+        if meta.get("timeouts"):
+            lines.extend(
+                [
+                    '{indent}"timeouts": _TIMEOUTS,'.format(indent=INDENT),
+                    '{indent}"listeners": (_scheduler.on_change,),'.format(
+                        indent=INDENT
+                    ),
+                    '{indent}"initializers": (_scheduler.on_create,),'.format(
+                        indent=INDENT
+                    ),
+                ]
+            )
+        else:
+            lines.extend(
+                [
+                    '{indent}"listeners": (),'.format(indent=INDENT),
+                    '{indent}"initializers": (),'.format(indent=INDENT),
+                ]
+            )
+        lines.append("}")
+        return lines
+
+
+def compile_machine(machine, source=None):
+    """Get source of Python module with compiled state machine class."""
+    return MachineCompiler(machine, source).compile()
+
+
+def load_machine(path):
+    """Load state machine class from path like ``package.module:Class``."""
+    try:
+        module_name, name = path.split(":")
+    except ValueError:
+        raise ValueError(
+            "Wrong path '{path}' - expected 'module:Class'.".format(path=path)
+        )
+
+    result = importlib.import_module(module_name)
+    for part in name.split("."):
+        result = getattr(result, part)
+    return result
+
+
+def main(argv=None):
+    """Run command line interface."""
+    parser = argparse.ArgumentParser(
+        prog="python -m super_state_machine.compile",
+        description="Compile state machine class to plain Python module.",
+    )
+    parser.add_argument("machine", help="State machine class, as 'module:Class'.")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout).")
+    args = parser.parse_args(argv)
+
+    source = compile_machine(load_machine(args.machine), args.machine)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(source)
+    else:
+        sys.stdout.write(source)
+
+
+if __name__ == "__main__":
+    main()
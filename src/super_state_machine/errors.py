@@ -3,3 +3,7 @@
 
 class TransitionError(RuntimeError):
     """Raised for situation, when transition is not allowed."""
+
+
+class StaleStateError(TransitionError):
+    """Raised when state was changed since version, that was expected."""
@@ -0,0 +1,274 @@
+"""Executors applying streams of transitions to many machines in parallel.
+
+Machines are sharded by key between fixed number of workers (threads or
+asyncio tasks), so all transitions of one machine are applied by the same
+worker, in order of submission, while different machines are processed
+concurrently. Queues of workers are bounded - when worker falls behind,
+submitting blocks (or waits), which gives backpressure.
+
+"""
+
+import asyncio
+import queue
+import threading
+
+_stop = object()
+
+
+class _Shards(object):
+    """Common logic of executors."""
+
+    def __init__(self, workers, method, batch_size, key, on_error):
+        if workers < 1:
+            raise ValueError("At least one worker is required.")
+
+        self.workers = workers
+        self.method = method
+        self.batch_size = batch_size
+        self.key = key
+        self.on_error = on_error
+        self.errors = []
+        self._closed = False
+
+    def _shard(self, machine):
+        # Hash of tuple mixes bits of key, so keys like identities (which are
+        # aligned addresses) are spread evenly too.
+        return hash((self.key(machine),)) % self.workers
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError("Cannot submit items after shutdown.")
+
+    def _close(self):
+        """Mark executor as closed, return `False` if it already was."""
+        closed, self._closed = self._closed, True
+        return not closed
+
+    def _apply(self, batch):
+        """Apply batch, calling method once for each item.
+
+        Consecutive items of the same machine are applied together, with
+        method looked up once. Errors (of lookup too) are handled for each
+        item, so they never stop worker.
+
+        """
+        position = 0
+        size = len(batch)
+        while position < size:
+            machine = batch[position][0]
+            start = position
+            while position < size and batch[position][0] is machine:
+                position += 1
+
+            try:
+                method = getattr(machine, self.method)
+            except Exception as error:
+                for _, item in batch[start:position]:
+                    self._handle_error(machine, item, error)
+                continue
+
+            for _, item in batch[start:position]:
+                try:
+                    method(item)
+                except Exception as error:
+                    self._handle_error(machine, item, error)
+
+    def _handle_error(self, machine, item, error):
+        """Pass error to callback, or collect it when there is none (or it
+        fails itself)."""
+        if self.on_error is not None:
+            try:
+                self.on_error(machine, item, error)
+                return
+            except Exception as callback_error:
+                error = callback_error
+        self.errors.append((machine, item, error))
+
+
+class KeyedExecutor(_Shards):
+    """Executor with worker threads."""
+
+    def __init__(
+        self,
+        workers=4,
+        method="set_",
+        queue_size=1000,
+        batch_size=100,
+        key=id,
+        on_error=None,
+    ):
+        """Init.
+
+        :param int workers: Number of worker threads.
+        :param str method: Name of method of machine called with each item
+            (like ``'set_'`` or ``'send'``).
+        :param int queue_size: Size of queue of each worker.
+        :param int batch_size: Maximal number of items taken from queue at
+            once.
+        :param callable key: Gets key of machine, used for sharding. By default
+            machines are sharded by identity.
+        :param callable on_error: Called with machine, item and exception when
+            applying item fails. By default failures are collected in
+            ``errors`` list.
+
+        """
+        super(KeyedExecutor, self).__init__(workers, method, batch_size, key, on_error)
+        self.queues = [queue.Queue(queue_size) for _ in range(workers)]
+        # Items are put under lock of queue, so stop is always put after
+        # items submitted before shutdown.
+        self._locks = [threading.Lock() for _ in range(workers)]
+        self._lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._run, args=(items,), daemon=True)
+            for items in self.queues
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        return False
+
+    def submit(self, machine, item):
+        """Queue item to be applied to machine.
+
+        Blocks if queue of worker is full.
+
+        :raises RuntimeError: When executor was shut down.
+
+        """
+        shard = self._shard(machine)
+        with self._locks[shard]:
+            self._check_open()
+            self.queues[shard].put((machine, item))
+
+    def join(self):
+        """Wait until all submitted items are applied."""
+        for items in self.queues:
+            items.join()
+
+    def shutdown(self, wait=True):
+        """Apply all submitted items and stop workers.
+
+        Items can't be submitted after shutdown.
+
+        """
+        with self._lock:
+            stop = self._close()
+        if stop:
+            for lock, items in zip(self._locks, self.queues):
+                with lock:
+                    items.put(_stop)
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    def _run(self, items):
+        while True:
+            batch = [items.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(items.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = _stop in batch
+            if stop:
+                batch = batch[: batch.index(_stop)]
+            try:
+                self._apply(batch)
+            finally:
+                for _ in range(len(batch) + stop):
+                    items.task_done()
+            if stop:
+                return
+
+
+class AsyncKeyedExecutor(_Shards):
+    """Executor with worker asyncio tasks.
+
+    It has to be created in running event loop.
+
+    """
+
+    def __init__(
+        self,
+        workers=4,
+        method="set_",
+        queue_size=1000,
+        batch_size=100,
+        key=id,
+        on_error=None,
+    ):
+        """Init.
+
+        Parameters are the same as for `KeyedExecutor`.
+
+        """
+        super(AsyncKeyedExecutor, self).__init__(
+            workers, method, batch_size, key, on_error
+        )
+        self.queues = [asyncio.Queue(queue_size) for _ in range(workers)]
+        self._locks = [asyncio.Lock() for _ in range(workers)]
+        loop = asyncio.get_running_loop()
+        self.tasks = [loop.create_task(self._run(items)) for items in self.queues]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.shutdown()
+        return False
+
+    async def submit(self, machine, item):
+        """Queue item to be applied to machine.
+
+        Waits if queue of worker is full.
+
+        :raises RuntimeError: When executor was shut down.
+
+        """
+        shard = self._shard(machine)
+        async with self._locks[shard]:
+            self._check_open()
+            await self.queues[shard].put((machine, item))
+
+    async def join(self):
+        """Wait until all submitted items are applied."""
+        for items in self.queues:
+            await items.join()
+
+    async def shutdown(self):
+        """Apply all submitted items and stop workers.
+
+        Items can't be submitted after shutdown.
+
+        """
+        if self._close():
+            for lock, items in zip(self._locks, self.queues):
+                async with lock:
+                    await items.put(_stop)
+        await asyncio.gather(*self.tasks)
+
+    async def _run(self, items):
+        while True:
+            batch = [await items.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(items.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            stop = _stop in batch
+            if stop:
+                batch = batch[: batch.index(_stop)]
+            try:
+                self._apply(batch)
+            finally:
+                for _ in range(len(batch) + stop):
+                    items.task_done()
+            if stop:
+                return
@@ -1,7 +1,11 @@
 """Extra utilities for state machines, to make them more usable."""
 
+import threading
 from weakref import WeakKeyDictionary
 
+from . import utils
+from .errors import TransitionError
+
 
 class ProxyString(str):
     """String that proxies every call to nested machine."""
@@ -17,6 +21,20 @@ class ProxyString(str):
         return getattr(self.state_machine, name)
 
 
+class ProxyInt(int):
+    """Integer that proxies every call to nested machine."""
+
+    def __new__(cls, value, machine):
+        """Create new integer instance with reference to given machine."""
+        number = super(cls, cls).__new__(cls, value)
+        number.state_machine = machine
+        return number
+
+    def __getattr__(self, name):
+        """Proxy call to machine."""
+        return getattr(self.state_machine, name)
+
+
 class PropertyMachine(object):
     """Descriptor to help using machines as properties."""
 
@@ -24,6 +42,7 @@ class PropertyMachine(object):
         """Create descriptor."""
         self.memory = WeakKeyDictionary()
         self.machine_type = machine_type
+        self._lock = threading.Lock()
 
     def __set__(self, instance, value):
         """Set state to machine."""
@@ -36,10 +55,174 @@ class PropertyMachine(object):
             return self
         self.check_memory(instance)
         machine = self.memory[instance]
-        return ProxyString(machine.actual_state.value, machine)
+        value = machine.actual_state.value
+        if isinstance(value, str):
+            return ProxyString(value, machine)
+        return ProxyInt(value, machine)
 
     def check_memory(self, instance):
+        if instance in self.memory:
+            return
+        # Machine is created under lock, so concurrent first accesses of
+        # instance don't create (and lose state of) two machines.
+        with self._lock:
+            if instance not in self.memory:
+                self.memory[instance] = self.machine_type()
+
+
+def advance_many(machines, state):
+    """Advance all machines to given state through shortest paths.
+
+    Plans are computed once per machine class and actual state, and all of
+    them are checked before any machine is touched, so when some machine
+    can't reach given state `TransitionError` is raised and nothing changes.
+    Machine given many times is advanced only once.
+
+    """
+    plans = {}
+    scheduled = []
+    seen = set()
+    for machine in machines:
+        if id(machine) in seen:
+            continue
+        seen.add(id(machine))
+        key = (type(machine), machine.actual_state)
+        try:
+            plan = plans[key]
+        except KeyError:
+            meta = machine._meta
+            target = meta["translator"].translate(state)
+            path = meta["graph"].path(machine.actual_state, target)
+            if path is None:
+                raise TransitionError(
+                    "Cannot reach '{value}' from '{actual_value}'.".format(
+                        actual_value=machine.actual_state.value, value=target.value
+                    )
+                )
+            plan = plans[key] = path[1:]
+        scheduled.append((machine, plan))
+
+    for machine, plan in scheduled:
+        for step in plan:
+            machine.force_set(step)
+
+
+def send_many(machines, events):
+    """Send events to machines - each event to machine at the same position.
+
+    Targets of all events are found before any machine is changed (events of
+    the same machine one after another, each from target of the previous
+    one), so when any of events is not allowed `TransitionError` is raised
+    and nothing changes. Numbers of machines and events must be equal.
+
+    """
+    states = {}
+    changes = []
+    for machine, event in zip(machines, events, strict=True):
+        state = states.get(id(machine), machine.actual_state)
+        target = states[id(machine)] = utils.get_event_target(machine, event, state)
+        changes.append((machine, target))
+    for machine, target in changes:
+        machine.force_set(target)
+
+
+def compare_and_set_many(changes):
+    """Set states of many versioned machines, rejecting stale changes.
+
+    All transitions are checked first, so when any of them is not allowed
+    `TransitionError` is raised and nothing changes. Machines keeping states
+    in the same backend are changed in one batch.
+
+    :param changes: Iterable of 3-tuples of machine, state and expected
+        version.
+    :returns: List of machines, which were changed since expected version (so
+        their states were not set).
+
+    """
+    items = []
+    for machine, state, expected_version in changes:
+        if not machine.can_be_(state):
+            state = machine._meta["translator"].translate(state)
+            raise TransitionError(
+                "Cannot transit from '{actual_value}' to '{value}'.".format(
+                    actual_value=machine.actual_state.value, value=state.value
+                )
+            )
+        items.append((machine, expected_version, state))
+    return utils.compare_version_and_set_many(items)
+
+
+class Transaction(object):
+    """Group of transitions of many machines, applied all or none.
+
+    Transitions are only recorded until commit, so machines keep their states
+    (and their listeners are not notified) until then. On commit all recorded
+    transitions are validated against transitions tables of machines first,
+    and only if all of them are allowed machines are changed. Each changed
+    machine has its listeners notified once, with state from before
+    transaction and final one - intermediate states are coalesced.
+
+    """
+
+    def __init__(self):
+        """Init."""
+        self.pending = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def set_(self, machine, state):
+        """Record transition of machine to given state."""
+        state = machine._meta["translator"].translate(state)
         try:
-            self.memory[instance]
+            self.pending[machine].append(state)
         except KeyError:
-            self.memory[instance] = self.machine_type()
+            self.pending[machine] = [state]
+
+    def rollback(self):
+        """Forget all recorded transitions."""
+        self.pending = {}
+
+    def commit(self):
+        """Validate and apply all recorded transitions.
+
+        :raises TransitionError: If any of transitions is not allowed, in
+            which case no machine is changed.
+
+        """
+        pending, self.pending = self.pending, {}
+        changes = []
+        for machine, steps in pending.items():
+            meta = machine._meta
+            previous = state = machine.actual_state
+            for step in steps:
+                if not (
+                    meta["complete"]
+                    or state is None
+                    or step in meta["transitions"][state]
+                ):
+                    raise TransitionError(
+                        "Cannot transit from '{actual_value}' to '{value}'.".format(
+                            actual_value=state.value, value=step.value
+                        )
+                    )
+                state = step
+            changes.append((machine, meta, previous, state))
+
+        for machine, meta, previous, state in changes:
+            setattr(machine, meta["state_attribute_name"], state)
+        for machine, meta, previous, state in changes:
+            if state is not previous:
+                utils.notify_listeners(machine, previous, state)
+
+
+def transaction():
+    """Get new `Transaction`, to be used as context manager."""
+    return Transaction()
@@ -0,0 +1,143 @@
+"""Analysis of state machine transitions graph."""
+
+import threading
+
+
+class TransitionGraph(object):
+    """Reachability and shortest paths over states graph.
+
+    Tables are built lazily on first query and then shared by all instances of
+    state machine. Reachability is kept as bitsets (one integer per state) and
+    shortest paths as all-pairs next hop table, so after build each query is
+    answered without walking the graph. Build is guarded by lock, so graph
+    can be queried from many threads.
+
+    """
+
+    def __init__(self, states, transitions, complete):
+        """Init.
+
+        :param tuple states: All states, in order of their indexes.
+        :param dict transitions: Allowed transitions, maps state to set of
+            states that can be reached directly from it.
+        :param bool complete: If graph is complete (every transition is
+            allowed).
+
+        """
+        self.states = states
+        self.index = dict((state, number) for number, state in enumerate(states))
+        self.transitions = transitions
+        self.complete = complete
+        self._reachability = None
+        self._next_hops = None
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def _get_adjacency(self):
+        everything = list(range(len(self.states)))
+        adjacency = []
+        for state in self.states:
+            if self.complete:
+                adjacency.append(everything)
+            else:
+                adjacency.append(
+                    sorted(self.index[target] for target in self.transitions[state])
+                )
+        return adjacency
+
+    def _build(self):
+        """Calculate reachability closure and next hop table.
+
+        Breadth first search is run once from every state, which gives
+        O(V * (V + E)) for the whole build.
+
+        """
+        with self._lock:
+            if self._reachability is None:
+                self._calculate()
+
+    def _calculate(self):
+        adjacency = self._get_adjacency()
+        size = len(self.states)
+        reachability = []
+        next_hops = []
+        for source in range(size):
+            hops = [-1] * size
+            hops[source] = source
+            mask = 1 << source
+            queue = []
+            for target in adjacency[source]:
+                if hops[target] == -1:
+                    hops[target] = target
+                    mask |= 1 << target
+                    queue.append(target)
+
+            for state in queue:
+                first_hop = hops[state]
+                for target in adjacency[state]:
+                    if hops[target] == -1:
+                        hops[target] = first_hop
+                        mask |= 1 << target
+                        queue.append(target)
+
+            reachability.append(mask)
+            next_hops.append(hops)
+
+        self._next_hops = next_hops
+        self._reachability = reachability
+
+    @property
+    def reachability(self):
+        """Reachability bitsets, one for each state index."""
+        if self._reachability is None:
+            self._build()
+        return self._reachability
+
+    @property
+    def next_hops(self):
+        """Next hop table - ``next_hops[source][target]`` is index of state
+        which is the first step on the shortest path (or ``-1``)."""
+        if self._reachability is None:
+            self._build()
+        return self._next_hops
+
+    def can_reach(self, source, target):
+        """Check if target state can be reached from source state.
+
+        Every state can reach itself.
+
+        """
+        index = self.index
+        return bool(self.reachability[index[source]] >> index[target] & 1)
+
+    def path(self, source, target):
+        """Get shortest path between states.
+
+        Paths are cached per (source, target) pair.
+
+        :returns: Tuple of states, starting with source and ending with target
+            or `None` if target can't be reached.
+
+        """
+        try:
+            return self._paths[(source, target)]
+        except KeyError:
+            pass
+
+        result = self._find_path(source, target)
+        self._paths[(source, target)] = result
+        return result
+
+    def _find_path(self, source, target):
+        index = self.index
+        hops = self.next_hops
+        target_index = index[target]
+        current = index[source]
+        if hops[current][target_index] == -1:
+            return None
+
+        result = [source]
+        while current != target_index:
+            current = hops[current][target_index]
+            result.append(self.states[current])
+        return tuple(result)
@@ -1,9 +1,10 @@
 """State machine core."""
 
+import threading
 from enum import Enum
 from functools import partial
 
-from . import utils
+from . import backends, graph, metrics, timers, tracking, utils, versions
 
 
 NotSet = object()
@@ -23,45 +24,205 @@ class AttributeDict(dict):
         return self[key]
 
 
+class BuildContext(object):
+    """Context of state machine class being built.
+
+    Contexts are kept separately for each thread (as stack, in case building
+    one class triggers building of another), so classes can be built
+    concurrently.
+
+    """
+
+    def __init__(self):
+        """Init."""
+        self._local = threading.local()
+
+    def __get__(self, instance, owner=None):
+        """Get context of class being built in actual thread."""
+        try:
+            return self._local.stack[-1]
+        except (AttributeError, IndexError):
+            raise AttributeError("No state machine class is being built.")
+
+    def push(self, context):
+        """Start building class with given context."""
+        try:
+            self._local.stack.append(context)
+        except AttributeError:
+            self._local.stack = [context]
+
+    def pop(self):
+        """Finish building class."""
+        self._local.stack.pop()
+
+
+class StateMethod(object):
+    """Implementations of method for states, before state machine is built."""
+
+    def __init__(self, states, function, base=None):
+        """Init.
+
+        :param tuple states: States for which function is used (empty for
+            fallback).
+        :param function function: Implementation.
+        :param StateMethod base: State method extended with this
+            implementation.
+
+        """
+        self.base = base
+        self.implementations = [(states, function)]
+        if base is not None:
+            self.implementations = base.implementations + self.implementations
+
+    def state(self, *states):
+        """Mark method as another implementation, used in given states.
+
+        Works like `property.setter` - decorated method should have the same
+        name, and it extends this state method. Method decorated without
+        states is used as fallback for all other states.
+
+        """
+
+        def decorator(function):
+            return StateMethod(states, function, self)
+
+        return decorator
+
+
+def state_method(*states):
+    """Mark method as implementation used only in given states.
+
+    Implementations for other states are added with ``state`` decorator of
+    returned state method, so all of them are combined into one method, which
+    calls implementation for actual state. Method decorated without states is
+    used as fallback for all other states.
+
+    """
+
+    def decorator(function):
+        return StateMethod(states, function)
+
+    return decorator
+
+
+class StateMethodsNamespace(dict):
+    """Namespace of state machine class body."""
+
+    def __setitem__(self, key, value):
+        """Forbid replacing state method with unrelated one."""
+        previous = self.get(key)
+        if (
+            isinstance(value, StateMethod)
+            and isinstance(previous, StateMethod)
+            and value.base is not previous
+        ):
+            raise ValueError(
+                "State method '{name}' is already defined - add implementations "
+                "with '@{name}.state(...)'.".format(name=key)
+            )
+        super(StateMethodsNamespace, self).__setitem__(key, value)
+
+
 class StateMachineMetaclass(type):
     """Metaclass for state machine, to build all its logic."""
 
+    context = BuildContext()
+
+    @classmethod
+    def __prepare__(cls, name, bases, **kwargs):
+        """Get namespace, which merges state methods of the same name."""
+        return StateMethodsNamespace()
+
     def __new__(cls, name, bases, attrs):
         """Create state machine and add all logic and methods to it."""
-        cls._set_up_context()
         new_class = super(cls, cls).__new__(cls, name, bases, attrs)
-        cls.context.new_class = new_class
-
         parents = [b for b in bases if isinstance(b, cls)]
         if not parents:
-            return cls.context.new_class
+            return new_class
+
+        cls._set_up_context()
+        try:
+            return cls._build(new_class, attrs, parents)
+        finally:
+            StateMachineMetaclass.__dict__["context"].pop()
+
+    @classmethod
+    def _build(cls, new_class, attrs, parents):
+        cls.context.new_class = new_class
+        cls.context.attrs = attrs
 
+        cls._set_up_parent_machine(parents)
         cls._set_up_config_getter()
         cls._check_states_enum()
-        cls._check_if_states_are_strings()
+        cls._check_states_values()
+        cls._check_narrowed_states()
         cls._set_up_translator()
         cls._calculate_state_name()
         cls._check_state_value()
         cls._add_standard_attributes()
         cls._generate_standard_transitions()
+        cls._set_up_timeouts()
+        cls._set_up_events()
+        cls._set_up_instance_tracking()
+        cls._set_up_dirty_tracking()
+        cls._set_up_history()
+        cls._set_up_dwell_times()
+        cls._set_up_backend()
+        cls._set_up_versioning()
+        cls._set_up_hooks()
         cls._generate_standard_methods()
         cls._generate_named_checkers()
         cls._generate_named_transitions()
+        cls._set_up_state_methods()
         cls._add_new_methods()
         cls._set_complete_option()
         cls._complete_meta_for_new_class()
 
-        new_class = cls.context.new_class
-        del cls.context
-        return new_class
+        return cls.context.new_class
+
+    def __call__(cls, *args, **kwargs):
+        """Create state machine instance and run its initializers."""
+        instance = super(StateMachineMetaclass, cls).__call__(*args, **kwargs)
+        meta = getattr(cls, "_meta", None)
+        if meta is not None:
+            for initializer in meta["initializers"]:
+                initializer(instance)
+        return instance
 
     @classmethod
     def _set_up_context(cls):
         """Create context to keep all needed variables in."""
-        cls.context = AttributeDict()
+        StateMachineMetaclass.__dict__["context"].push(AttributeDict())
         cls.context.new_meta = {}
         cls.context.new_transitions = {}
         cls.context.new_methods = {}
+        cls.context.replaced_methods = set()
+        cls.context.method_states = {}
+        cls.context.inherited_transitions = set()
+        cls.context.listeners = []
+        cls.context.initializers = []
+
+    @classmethod
+    def _set_up_parent_machine(cls, parents):
+        """Find state machine this class extends (if any).
+
+        Subclass of state machine reuses compiled tables of its parent and
+        compiles only what it adds (or removes).
+
+        """
+        machines = []
+        for parent in parents:
+            meta = getattr(parent, "_meta", None)
+            if meta is None or any(meta is m for m in machines):
+                continue
+            if any(p is not parent and issubclass(p, parent) for p in parents):
+                continue
+            machines.append(meta)
+
+        if len(machines) > 1:
+            raise ValueError("State machine can extend only one state machine.")
+
+        cls.context.parent_meta = machines[0] if machines else None
 
     @classmethod
     def _check_states_enum(cls):
@@ -85,34 +246,73 @@ class StateMachineMetaclass(type):
             raise ValueError("Please provide enum instance to define available states.")
 
     @classmethod
-    def _check_if_states_are_strings(cls):
-        """Check if all states are strings."""
+    def _check_states_values(cls):
+        """Check if all states are strings or if all states are integers."""
+        kinds = set()
         for item in list(cls.context.states_enum):
-            if not isinstance(item.value, str):
+            if isinstance(item.value, str):
+                kinds.add(str)
+            elif isinstance(item.value, int) and not isinstance(item.value, bool):
+                kinds.add(int)
+            else:
                 raise ValueError(
-                    "Item {name} is not string. Only strings are allowed.".format(
-                        name=item.name
-                    )
+                    "Item {name} is neither string nor integer. Only strings "
+                    "and integers are allowed.".format(name=item.name)
                 )
 
+        if len(kinds) > 1:
+            raise ValueError(
+                "States can't mix strings and integers - please use one type "
+                "for all values."
+            )
+
+    @classmethod
+    def _check_narrowed_states(cls):
+        """Check if states of subclass are subset of parent states."""
+        parent_meta = cls.context.parent_meta
+        cls.context.states_changed = False
+        if parent_meta is None:
+            return
+
+        parent_enum = parent_meta["translator"].base_enum
+        if cls.context.states_enum is parent_enum:
+            return
+
+        parent_values = set(item.value for item in parent_enum)
+        for item in cls.context.states_enum:
+            if item.value not in parent_values:
+                raise ValueError(
+                    "State '{value}' is not present in parent state machine - "
+                    "states can be only narrowed.".format(value=item.value)
+                )
+        cls.context.states_changed = True
+        cls.context.state_values = set(item.value for item in cls.context.states_enum)
+
     @classmethod
     def _check_state_value(cls):
         """Check initial state value - if is proper and translate it.
 
         Initial state is required.
         """
-        state_value = cls.context.get_config("initial_state", None)
-        state_value = state_value or getattr(
-            cls.context.new_class, cls.context.state_name, None
-        )
+        state_value = cls.context.get_own_config("initial_state", None)
+        if _is_empty(state_value):
+            state_value = cls._get_own_state_value()
+        if _is_empty(state_value) and cls.context.parent_meta is not None:
+            state_value = cls.context.parent_meta["initial_state"]
 
-        if not state_value:
+        if _is_empty(state_value):
             raise ValueError(
                 "Empty state is disallowed, yet no initial state is given!"
             )
         state_value = cls.context.new_meta["translator"].translate(state_value)
         cls.context.state_value = state_value
 
+    @classmethod
+    def _get_own_state_value(cls):
+        if cls.context.parent_meta is None:
+            return getattr(cls.context.new_class, cls.context.state_name, None)
+        return cls.context.attrs.get(cls.context.state_name, None)
+
     @classmethod
     def _add_standard_attributes(cls):
         """Add attributes common to all state machines.
@@ -130,47 +330,332 @@ class StateMachineMetaclass(type):
         setattr(cls.context.new_class, "is_", utils.is_)
         setattr(cls.context.new_class, "can_be_", utils.can_be_)
         setattr(cls.context.new_class, "set_", utils.set_)
+        setattr(cls.context.new_class, "try_set_", utils.try_set_)
 
     @classmethod
     def _generate_standard_transitions(cls):
         """Generate methods used for transitions."""
-        allowed_transitions = cls.context.get_config("transitions", {})
+        allowed_transitions = cls.context.get_own_config("transitions", {})
+        translator = cls.context.new_meta["translator"]
+        cls._inherit_transitions()
+        for state in cls.context.states_enum:
+            cls.context.new_transitions.setdefault(state, set())
+
         for key, transitions in allowed_transitions.items():
-            key = cls.context.new_meta["translator"].translate(key)
+            key = translator.translate(key)
+            cls._add_transitions(key, [translator.translate(t) for t in transitions])
 
-            new_transitions = set()
-            for trans in transitions:
-                if not isinstance(trans, Enum):
-                    trans = cls.context.new_meta["translator"].translate(trans)
-                new_transitions.add(trans)
+    @classmethod
+    def _inherit_transitions(cls):
+        """Take transitions of parent machine.
 
-            cls.context.new_transitions[key] = new_transitions
+        If states weren't changed sets of transitions are shared with parent
+        and copied only when subclass adds something to them.
 
-        for state in cls.context.states_enum:
-            if state not in cls.context.new_transitions:
-                cls.context.new_transitions[state] = set()
+        """
+        parent_meta = cls.context.parent_meta
+        if parent_meta is None:
+            return
+
+        parent_transitions = parent_meta["transitions"]
+        if not cls.context.states_changed:
+            cls.context.new_transitions.update(parent_transitions)
+            cls.context.inherited_transitions.update(parent_transitions)
+            return
+
+        states = dict((item.value, item) for item in cls.context.states_enum)
+        for state, targets in parent_transitions.items():
+            if state.value in states:
+                cls.context.new_transitions[states[state.value]] = set(
+                    states[target.value] for target in targets if target.value in states
+                )
+
+    @classmethod
+    def _add_transitions(cls, state, targets):
+        """Add transitions from given state to targets."""
+        if state in cls.context.inherited_transitions:
+            cls.context.inherited_transitions.discard(state)
+            cls.context.new_transitions[state] = set(cls.context.new_transitions[state])
+        cls.context.new_transitions[state].update(targets)
+
+    @classmethod
+    def _set_up_timeouts(cls):
+        """Set up timed states.
+
+        Timeout transitions are added to transitions graph.
+
+        """
+        translator = cls.context.new_meta["translator"]
+        new_timeouts = {}
+        parent_meta = cls.context.parent_meta
+        if parent_meta is not None:
+            for key, (delay, target) in parent_meta.get("timeouts", {}).items():
+                if cls._is_still_present(key):
+                    new_timeouts[translator.translate(key)] = (
+                        delay,
+                        translator.translate(target),
+                    )
+
+        timeouts = cls.context.get_own_config("timeouts", None) or {}
+        for key, (delay, target) in timeouts.items():
+            key = translator.translate(key)
+            target = translator.translate(target)
+            new_timeouts[key] = (delay, target)
+            if target not in cls.context.new_transitions[key]:
+                cls._add_transitions(key, [target])
+
+        if not new_timeouts:
+            return
+
+        scheduler = timers.TimeoutScheduler(
+            new_timeouts, cls.context.get_config("timer_wheel", None)
+        )
+        cls.context.new_meta["timeouts"] = new_timeouts
+        cls.context.listeners.append(scheduler.on_change)
+        cls.context.initializers.append(scheduler.on_create)
+
+    @classmethod
+    def _set_up_events(cls):
+        """Compile events into flat table of targets.
+
+        Target of event sent in state is kept at ``state_index * events_count
+        + event_id``, where ``state_index`` is index of state in transitions
+        graph. Transitions of events are added to transitions graph.
+
+        """
+        translator = cls.context.new_meta["translator"]
+        events = {}
+        parent_meta = cls.context.parent_meta
+        if parent_meta is not None:
+            for event, edges in parent_meta.get("events", {}).items():
+                events[event] = dict(
+                    (translator.translate(source), translator.translate(target))
+                    for source, target in edges.items()
+                    if cls._is_still_present(source) and cls._is_still_present(target)
+                )
+
+        own_events = cls.context.get_own_config("events", None) or {}
+        for event, pairs in own_events.items():
+            edges = events.setdefault(event, {})
+            for source, target in pairs:
+                source = translator.translate(source)
+                target = translator.translate(target)
+                if edges.get(source, target) is not target:
+                    raise ValueError(
+                        "Event '{event}' has many targets for state '{state}'.".format(
+                            event=event, state=source.value
+                        )
+                    )
+                edges[source] = target
+                if target not in cls.context.new_transitions[source]:
+                    cls._add_transitions(source, [target])
+
+        if not events:
+            return
+
+        index = dict(
+            (state, number) for number, state in enumerate(cls.context.states_enum)
+        )
+        event_ids = dict((event, number) for number, event in enumerate(events))
+        table = [None] * (len(index) * len(event_ids))
+        for event, edges in events.items():
+            for source, target in edges.items():
+                table[index[source] * len(event_ids) + event_ids[event]] = target
+
+        cls.context.new_meta["events"] = events
+        cls.context.new_meta["event_ids"] = event_ids
+        cls.context.new_meta["event_table"] = tuple(table)
+        cls._add_shared_method("send", utils.send)
+
+    @classmethod
+    def _set_up_instance_tracking(cls):
+        """Set up live index of instances by state (if enabled)."""
+        if not cls.context.get_config("track_instances", False):
+            return
+
+        index = tracking.InstanceIndex(tuple(cls.context.states_enum))
+        cls.context.new_meta["instance_index"] = index
+        cls.context.listeners.append(index.on_change)
+        cls.context.initializers.append(index.on_create)
+        cls._add_shared_method("instances_in", classmethod(utils.instances_in))
+        cls._add_shared_method("count_in", classmethod(utils.count_in))
+
+    @classmethod
+    def _set_up_dirty_tracking(cls):
+        """Set up tracking of instances which changed state (if enabled)."""
+        if not cls.context.get_config("track_dirty", False):
+            return
+
+        tracker = tracking.DirtyTracker()
+        cls.context.new_meta["dirty_tracker"] = tracker
+        cls.context.listeners.append(tracker.on_change)
+        cls.context.initializers.append(tracker.on_create)
+        cls._add_shared_method("collect_dirty", classmethod(utils.collect_dirty))
+        cls._add_shared_method(
+            "clear_dirty",
+            utils.ClassOrInstanceMethod(utils.class_clear_dirty, utils.clear_dirty),
+        )
+
+    @classmethod
+    def _set_up_history(cls):
+        """Set up recording of last transitions of instances (if enabled)."""
+        size = cls.context.get_config("history", None)
+        if not size:
+            return
+
+        history = tracking.TransitionHistory(tuple(cls.context.states_enum), size)
+        cls.context.new_meta["history"] = history
+        cls.context.listeners.append(history.on_change)
+        cls._add_shared_method("history", utils.history)
+
+    @classmethod
+    def _set_up_dwell_times(cls):
+        """Set up histograms of times spent in states (if enabled)."""
+        if not cls.context.get_config("track_dwell_times", False):
+            return
+
+        dwell_times = metrics.DwellTimes(
+            tuple(cls.context.states_enum),
+            cls.context.get_config("dwell_time_buckets", metrics.DEFAULT_BUCKETS),
+        )
+        cls.context.new_meta["dwell_times"] = dwell_times
+        cls.context.listeners.append(dwell_times.on_change)
+        cls.context.initializers.append(dwell_times.on_create)
+        cls._add_shared_method("dwell_times", classmethod(utils.dwell_times))
+
+    @classmethod
+    def _set_up_backend(cls):
+        """Keep states in backend (if it is set)."""
+        backend = cls.context.get_config("backend", None)
+        if backend is None:
+            return
+
+        state = backends.BackendState(
+            backend,
+            cls.context.get_config("backend_key", "id"),
+            cls.context.new_meta["translator"],
+            cls.context.state_value,
+            cls.context.new_meta["state_attribute_name"],
+        )
+        cls.context.new_meta["backend"] = backend
+        setattr(
+            cls.context.new_class, cls.context.new_meta["state_attribute_name"], state
+        )
+
+    @classmethod
+    def _set_up_versioning(cls):
+        """Count versions of states (if enabled)."""
+        if not cls.context.get_config("versioned", False):
+            return
+
+        attribute = cls.context.new_meta["state_attribute_name"]
+        if "backend" in cls.context.new_meta:
+            store = vars(cls.context.new_class)[attribute]
+        else:
+            store = versions.VersionedState(attribute, cls.context.state_value)
+            setattr(cls.context.new_class, attribute, store)
+        cls.context.new_meta["state_store"] = store
+        cls._add_shared_method("version", utils.state_version)
+
+    @classmethod
+    def _set_up_hooks(cls):
+        """Add hooks called after every change of state.
+
+        Hooks are callables or names of methods of state machine.
+
+        """
+        for hook in cls.context.get_config("on_change", None) or []:
+            if isinstance(hook, str):
+                hook = partial(_call_hook_method, hook)
+            cls.context.listeners.append(hook)
+
+    @classmethod
+    def _get_force_set(cls):
+        if cls.context.get_config("run_to_completion", False):
+            return utils.queued_force_set
+        if cls.context.listeners:
+            return utils.notifying_force_set
+        return utils.force_set
+
+    @classmethod
+    def _add_shared_method(cls, name, method):
+        """Add method, which may be already inherited from parent machine."""
+        cls.context.new_methods[name] = method
+        cls.context.replaced_methods.add(name)
+
+    @classmethod
+    def _is_still_present(cls, state):
+        """Check if state of parent machine is present after narrowing."""
+        if not cls.context.states_changed:
+            return True
+        return state.value in cls.context.state_values
 
     @classmethod
     def _generate_standard_methods(cls):
         """Generate standard setters, getters and checkers."""
+        if cls.context.parent_meta is not None:
+            cls._generate_inherited_methods()
+            return
+
+        method_states = cls.context.method_states
         for state in cls.context.states_enum:
-            getter_name = "is_{name}".format(name=state.value)
+            name = utils.get_method_suffix(state)
+            getter_name = "is_{name}".format(name=name)
             cls.context.new_methods[getter_name] = utils.generate_getter(state)
+            method_states[getter_name] = ("getter", state)
 
-            setter_name = "set_{name}".format(name=state.value)
+            setter_name = "set_{name}".format(name=name)
             cls.context.new_methods[setter_name] = utils.generate_setter(state)
+            method_states[setter_name] = ("setter", state)
 
-            checker_name = "can_be_{name}".format(name=state.value)
+            try_setter_name = "try_set_{name}".format(name=name)
+            try_setter = utils.generate_try_setter(state)
+            cls.context.new_methods[try_setter_name] = try_setter
+            method_states[try_setter_name] = ("try_setter", state)
+
+            checker_name = "can_be_{name}".format(name=name)
             checker = utils.generate_checker(state)
             cls.context.new_methods[checker_name] = checker
+            method_states[checker_name] = ("checker", state)
 
         cls.context.new_methods["actual_state"] = utils.actual_state
         cls.context.new_methods["as_enum"] = utils.as_enum
-        cls.context.new_methods["force_set"] = utils.force_set
+        cls.context.new_methods["force_set"] = cls._get_force_set()
+        cls.context.new_methods["advance_to"] = utils.advance_to
+        cls.context.new_methods["fork"] = utils.fork
+        cls.context.new_methods["fork_many"] = classmethod(utils.fork_many)
+        cls.context.new_methods["speculate"] = utils.speculate
+        cls.context.new_methods["can_reach"] = utils.ClassOrInstanceMethod(
+            utils.class_can_reach, utils.can_reach
+        )
+        cls.context.new_methods["path"] = utils.ClassOrInstanceMethod(
+            utils.class_path, utils.path
+        )
+
+    @classmethod
+    def _generate_inherited_methods(cls):
+        """Generate only methods which differ from parent ones.
+
+        Methods generated for states removed from subclass (including named
+        transitions and checkers) are blocked, and force set is replaced, as
+        listeners may have changed.
+
+        """
+        translator = cls.context.new_meta["translator"]
+        parent_method_states = cls.context.parent_meta["method_states"]
+        for name, (kind, state) in parent_method_states.items():
+            if not cls._is_still_present(state):
+                cls.context.new_methods[name] = utils.removed_attribute
+                cls.context.replaced_methods.add(name)
+            else:
+                cls.context.method_states[name] = (kind, translator.translate(state))
+
+        cls.context.new_methods["force_set"] = cls._get_force_set()
+        cls.context.replaced_methods.add("force_set")
 
     @classmethod
     def _generate_named_checkers(cls):
-        named_checkers = cls.context.get_config("named_checkers", None) or []
+        named_checkers = cls.context.get_own_config("named_checkers", None) or []
         for method, key in named_checkers:
             if method in cls.context.new_methods:
                 raise ValueError(
@@ -182,10 +667,11 @@ class StateMachineMetaclass(type):
 
             key = cls.context.new_meta["translator"].translate(key)
             cls.context.new_methods[method] = utils.generate_checker(key.value)
+            cls.context.method_states[method] = ("checker", key)
 
     @classmethod
     def _generate_named_transitions(cls):
-        named_transitions = cls.context.get_config("named_transitions", None) or []
+        named_transitions = cls.context.get_own_config("named_transitions", None) or []
 
         translator = cls.context.new_meta["translator"]
         for item in named_transitions:
@@ -201,12 +687,64 @@ class StateMachineMetaclass(type):
 
             key = translator.translate(key)
             cls.context.new_methods[method] = utils.generate_setter(key)
+            cls.context.method_states[method] = ("setter", key)
 
-            if from_values:
-                from_values = [translator.translate(k) for k in from_values]
-                for s in cls.context.states_enum:
-                    if s in from_values:
-                        cls.context.new_transitions[s].add(key)
+            for value in from_values:
+                cls._add_transitions(translator.translate(value), [key])
+
+    @classmethod
+    def _set_up_state_methods(cls):
+        """Build dispatch tables of state methods.
+
+        State methods of parent machine are inherited (and rebuilt, as states
+        may have been narrowed), own ones override them state by state. Other
+        attributes of the same name replace them completely.
+
+        """
+        translator = cls.context.new_meta["translator"]
+        attrs = cls.context.attrs
+        state_methods = {}
+        parent_meta = cls.context.parent_meta
+        if parent_meta is not None:
+            for name, (table, fallback) in parent_meta["state_methods"].items():
+                if name in attrs and not isinstance(attrs[name], StateMethod):
+                    continue
+                state_methods[name] = (
+                    dict(
+                        (translator.translate(state), function)
+                        for state, function in table.items()
+                        if cls._is_still_present(state)
+                    ),
+                    fallback,
+                )
+
+        for name, value in attrs.items():
+            if not isinstance(value, StateMethod):
+                continue
+            table, fallback = state_methods.get(name, ({}, None))
+            table = dict(table)
+            own_states = set()
+            for states, function in value.implementations:
+                if not states:
+                    fallback = function
+                for state in states:
+                    state = translator.translate(state)
+                    if state in own_states:
+                        raise ValueError(
+                            "State method '{name}' has many implementations "
+                            "for state '{state}'.".format(name=name, state=state.value)
+                        )
+                    own_states.add(state)
+                    table[state] = function
+            state_methods[name] = (table, fallback)
+
+        for name, (table, fallback) in state_methods.items():
+            setattr(
+                cls.context.new_class,
+                name,
+                utils.StateDispatcher(name, table, fallback),
+            )
+        cls.context.new_meta["state_methods"] = state_methods
 
     @classmethod
     def _unpack_named_transition_tuple(cls, item):
@@ -224,37 +762,121 @@ class StateMachineMetaclass(type):
 
     @classmethod
     def _add_new_methods(cls):
-        """Add all generated methods to result class."""
+        """Add all generated methods to result class.
+
+        Methods generated for parent machine can be replaced only by machine
+        itself, never by methods defined in class.
+
+        """
+        generated_methods = set()
+        if cls.context.parent_meta is not None:
+            generated_methods.update(cls.context.parent_meta["generated_methods"])
+            for name in generated_methods:
+                if name in cls.context.attrs:
+                    raise ValueError(
+                        "Name collision in state machine class - '{name}'.".format(
+                            name=name
+                        )
+                    )
+
+        replaced = cls.context.replaced_methods
         for name, method in cls.context.new_methods.items():
-            if hasattr(cls.context.new_class, name):
+            if name in cls.context.attrs or (
+                name not in replaced and hasattr(cls.context.new_class, name)
+            ):
                 raise ValueError("Name collision in state machine class - '{name}'.")
 
             setattr(cls.context.new_class, name, method)
 
+        generated_methods.update(cls.context.new_methods)
+        cls.context.new_meta["generated_methods"] = frozenset(generated_methods)
+
     @classmethod
     def _set_complete_option(cls):
         """Check and set complete option."""
         get_config = cls.context.get_config
+        get_own_config = cls.context.get_own_config
         complete = get_config("complete", None)
         if complete is None:
             conditions = [
-                get_config("transitions", False),
-                get_config("named_transitions", False),
+                get_own_config("transitions", False),
+                get_own_config("named_transitions", False),
+                get_own_config("events", False),
             ]
             complete = not any(conditions)
+            if cls.context.parent_meta is not None:
+                complete = complete and cls.context.parent_meta["complete"]
 
         cls.context.new_meta["complete"] = complete
 
     @classmethod
     def _set_up_config_getter(cls):
-        meta = getattr(cls.context.new_class, "Meta", DefaultMeta)
-        cls.context.get_config = partial(get_config, meta)
+        """Set up config getters.
+
+        Subclass of state machine takes config of its parent, unless it is
+        overridden in its own ``Meta``. Options that extend machine (like
+        transitions) are taken only from its own ``Meta``.
+
+        """
+        parent_meta = cls.context.parent_meta
+        if parent_meta is None:
+            meta = getattr(cls.context.new_class, "Meta", DefaultMeta)
+            cls.context.get_config = partial(get_config, meta)
+            cls.context.get_own_config = cls.context.get_config
+            return
+
+        meta = cls.context.attrs.get("Meta", None)
+        cls.context.get_config = partial(
+            get_inherited_config, meta, parent_meta["config_getter"]
+        )
+        cls.context.get_own_config = partial(get_config, meta)
 
     @classmethod
     def _set_up_translator(cls):
-        translator = utils.EnumValueTranslator(cls.context["states_enum"])
+        get_config = cls.context.get_config
+        parent_meta = cls.context.parent_meta
+        aliases = get_config("aliases", None)
+        if parent_meta is not None:
+            own_options = ["aliases", "translate_names", "case_insensitive"]
+            changed = any(
+                cls.context.get_own_config(option, None) is not None
+                for option in own_options
+            )
+            if not changed and not cls.context.states_changed:
+                cls.context.new_meta["translator"] = parent_meta["translator"]
+                return
+            aliases = cls._get_inherited_aliases()
+
+        translator = utils.EnumValueTranslator(
+            cls.context["states_enum"],
+            aliases=aliases,
+            names=get_config("translate_names", False),
+            case_insensitive=get_config("case_insensitive", False),
+        )
         cls.context.new_meta["translator"] = translator
 
+    @classmethod
+    def _get_inherited_aliases(cls):
+        """Get aliases of parent machine extended with own ones.
+
+        States of parent machine are aliases for states of subclass, so
+        everything that worked for parent still works (unless state was
+        removed).
+
+        """
+        parent_translator = cls.context.parent_meta["translator"]
+        states = dict((item.value, item) for item in cls.context.states_enum)
+        aliases = {}
+        for item in parent_translator.base_enum:
+            if item.value in states:
+                aliases[item] = states[item.value]
+        for alias in parent_translator.aliases:
+            value = parent_translator.translate(alias).value
+            if value in states:
+                aliases[alias] = states[value]
+        aliases.update(cls.context.get_own_config("aliases", None) or {})
+        return aliases
+
     @classmethod
     def _calculate_state_name(cls):
         cls.context.state_name = "state"
@@ -264,7 +886,19 @@ class StateMachineMetaclass(type):
     @classmethod
     def _complete_meta_for_new_class(cls):
         cls.context.new_meta["transitions"] = cls.context.new_transitions
+        cls.context.new_meta["graph"] = graph.TransitionGraph(
+            tuple(cls.context.states_enum),
+            cls.context.new_transitions,
+            cls.context.new_meta["complete"],
+        )
         cls.context.new_meta["config_getter"] = cls.context["get_config"]
+        cls.context.new_meta["run_to_completion"] = cls.context.get_config(
+            "run_to_completion", False
+        )
+        cls.context.new_meta["initial_state"] = cls.context.state_value
+        cls.context.new_meta["method_states"] = cls.context.method_states
+        cls.context.new_meta["listeners"] = tuple(cls.context.listeners)
+        cls.context.new_meta["initializers"] = tuple(cls.context.initializers)
         setattr(cls.context.new_class, "_meta", cls.context["new_meta"])
 
 
@@ -283,3 +917,23 @@ def get_config(original_meta, attribute, default=NotSet):
         raise
 
     return default
+
+
+def get_inherited_config(original_meta, parent_getter, attribute, default=NotSet):
+    try:
+        return getattr(original_meta, attribute)
+    except AttributeError:
+        pass
+
+    if default is NotSet:
+        return parent_getter(attribute)
+    return parent_getter(attribute, default)
+
+
+def _is_empty(value):
+    # Integer states (including ``0``) are proper values.
+    return value is None or value == ""
+
+
+def _call_hook_method(name, machine, previous, state):
+    getattr(machine, name)(previous, state)
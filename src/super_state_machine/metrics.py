@@ -0,0 +1,123 @@
+"""Metrics of state machines."""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.001, 0.01, 0.1, 1, 10, 60, 600, 3600)
+
+
+class Histogram(object):
+    """Histogram of times spent in one state."""
+
+    def __init__(self, bounds, counts, total):
+        """Init.
+
+        :param tuple bounds: Upper bounds of buckets (in seconds).
+        :param list counts: Counts of buckets - one more than bounds, the last
+            one counts times greater than all bounds.
+        :param float total: Sum of all times.
+
+        """
+        self.bounds = bounds
+        self.counts = counts
+        self.total = total
+
+    @property
+    def count(self):
+        """Get number of recorded times."""
+        return sum(self.counts)
+
+    def __repr__(self):
+        return "<Histogram count={count} total={total}>".format(
+            count=self.count, total=self.total
+        )
+
+
+class DwellTimes(object):
+    """Recorder of times spent by instances of state machine class in states.
+
+    Time of entering state is kept in instance and time spent in state is
+    recorded when machine leaves it. Each thread records into its own shard
+    (arrays of counts and sums), so recording doesn't take locks - shards are
+    merged only when snapshot is taken.
+
+    """
+
+    entered_attribute_name = "_state_entered"
+
+    def __init__(self, states, bounds=DEFAULT_BUCKETS, clock=time.monotonic):
+        """Init.
+
+        :param tuple states: All states of state machine.
+        :param tuple bounds: Upper bounds of buckets (in seconds), ascending.
+        :param callable clock: Monotonic clock returning seconds.
+
+        """
+        bounds = tuple(bounds)
+        if list(bounds) != sorted(set(bounds)):
+            raise ValueError("Bounds of buckets must be ascending.")
+
+        self.states = tuple(states)
+        self.index = dict((state, number) for number, state in enumerate(states))
+        self.bounds = bounds
+        self.clock = clock
+        self._width = len(bounds) + 1
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def on_create(self, machine):
+        """Remember time of entering initial state."""
+        setattr(machine, self.entered_attribute_name, self.clock())
+
+    def on_change(self, machine, previous, state):
+        """Record time spent in previous state."""
+        now = self.clock()
+        entered = getattr(machine, self.entered_attribute_name, None)
+        setattr(machine, self.entered_attribute_name, now)
+        if entered is None or previous is None:
+            return
+
+        try:
+            counts, totals = self._local.shard
+        except AttributeError:
+            counts, totals = self._add_shard()
+
+        elapsed = now - entered
+        number = self.index[previous]
+        counts[number * self._width + bisect_left(self.bounds, elapsed)] += 1
+        totals[number] += elapsed
+
+    def _add_shard(self):
+        shard = (
+            array("Q", [0]) * (len(self.states) * self._width),
+            array("d", [0.0]) * len(self.states),
+        )
+        self._local.shard = shard
+        with self._lock:
+            self._shards.append(shard)
+        return shard
+
+    def snapshot(self):
+        """Get histograms of all states.
+
+        :returns: Dict mapping states to `Histogram` instances.
+
+        """
+        with self._lock:
+            shards = list(self._shards)
+
+        width = self._width
+        result = {}
+        for number, state in enumerate(self.states):
+            counts = [0] * width
+            total = 0.0
+            for shard_counts, shard_totals in shards:
+                start = number * width
+                for bucket, value in enumerate(shard_counts[start : start + width]):
+                    counts[bucket] += value
+                total += shard_totals[number]
+            result[state] = Histogram(self.bounds, counts, total)
+        return result
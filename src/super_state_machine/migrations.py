@@ -0,0 +1,217 @@
+"""Bulk migration of persisted states between versions of states enum.
+
+States can be persisted as values (like ``'draft'``) or as codes - indexes of
+states in their enum (useful for array backed or memory mapped stores). Codes
+in byte stores are migrated with one lookup table translation per chunk,
+NumPy arrays (if NumPy is installed) with vectorized indexing.
+
+"""
+
+from array import array
+from collections import Counter
+from enum import Enum
+
+from .utils import EnumValueTranslator
+
+CHUNK_SIZE = 1 << 20
+
+
+class MigrationReport(object):
+    """Result of migration."""
+
+    def __init__(self, total, unmapped):
+        """Init.
+
+        :param int total: Number of migrated items.
+        :param Counter unmapped: Counts of items that couldn't be migrated, by
+            their original value (or code).
+
+        """
+        self.total = total
+        self.unmapped = unmapped
+
+    @property
+    def ok(self):
+        """Check if all items were migrated."""
+        return not self.unmapped
+
+    def __repr__(self):
+        return "<MigrationReport total={total} unmapped={unmapped}>".format(
+            total=self.total, unmapped=dict(self.unmapped)
+        )
+
+
+def _get_translator(source):
+    meta = getattr(source, "_meta", None)
+    if meta is not None:
+        return meta["translator"]
+    if isinstance(source, type) and issubclass(source, Enum):
+        return EnumValueTranslator(source)
+    raise ValueError("Please provide state machine class or states enum.")
+
+
+class StateMigration(object):
+    """Migration of states from one states enum to another.
+
+    States of old enum which have counterparts with the same values in new enum
+    are mapped to them, unless mapping says otherwise (or ``keep_same`` is
+    disabled). Mapping is validated against translators of both machines, so
+    it can use anything that translates to state (values, members, aliases).
+
+    """
+
+    def __init__(self, old, new, mapping=None, keep_same=True):
+        """Init.
+
+        :param old: State machine class or states enum to migrate from.
+        :param new: State machine class or states enum to migrate to.
+        :param dict mapping: Maps old states to new ones.
+        :param bool keep_same: If states with the same value should be mapped
+            automatically.
+
+        """
+        self.old_translator = _get_translator(old)
+        self.new_translator = _get_translator(new)
+        self.old_states = tuple(self.old_translator.base_enum)
+        self.new_states = tuple(self.new_translator.base_enum)
+
+        table = {}
+        if keep_same:
+            new_values = dict((state.value, state) for state in self.new_states)
+            for state in self.old_states:
+                if state.value in new_values:
+                    table[state] = new_values[state.value]
+        for key, value in (mapping or {}).items():
+            table[self.old_translator.translate(key)] = self.new_translator.translate(
+                value
+            )
+
+        self.table = table
+        self.unmapped = tuple(state for state in self.old_states if state not in table)
+        self.value_table = dict(
+            (state.value, target.value) for state, target in table.items()
+        )
+
+    def translate(self, state):
+        """Get new state for old one (or `None` if it is not mapped)."""
+        return self.table.get(self.old_translator.translate(state))
+
+    def migrate_values(self, values, default=None):
+        """Migrate serialized (by value) states.
+
+        :param values: Iterable of old values.
+        :param default: Used for values that can't be migrated.
+        :returns: 2-tuple of list of new values and `MigrationReport`.
+
+        """
+        value_table = self.value_table
+        unmapped = Counter()
+        result = []
+        for value in values:
+            try:
+                result.append(value_table[value])
+            except (KeyError, TypeError):
+                unmapped[value] += 1
+                result.append(default)
+        return result, MigrationReport(len(result), unmapped)
+
+    def code_table(self, unmapped_code=-1):
+        """Get lookup table from old codes to new ones.
+
+        Codes are indexes of states in their enums.
+
+        """
+        if 0 <= unmapped_code < len(self.new_states):
+            raise ValueError(
+                "Code {code} is used by state of new enum.".format(code=unmapped_code)
+            )
+        new_codes = dict((state, code) for code, state in enumerate(self.new_states))
+        return [
+            new_codes[self.table[state]] if state in self.table else unmapped_code
+            for state in self.old_states
+        ]
+
+    def migrate_codes(self, codes, unmapped_code=None):
+        """Migrate states stored as codes, in place.
+
+        Supported stores are byte stores (`bytearray`, writable `memoryview`
+        or `mmap`, one byte per state), `array.array`, lists and NumPy arrays.
+
+        :param codes: Store of codes.
+        :param int unmapped_code: Code written for states that can't be
+            migrated. By default maximal value for unsigned stores and ``-1``
+            for signed ones.
+        :returns: `MigrationReport` with unmapped items counted by their old
+            codes.
+
+        """
+        if hasattr(codes, "dtype") and hasattr(codes, "__array__"):
+            return self._migrate_numpy(codes, unmapped_code)
+        if isinstance(codes, array):
+            if unmapped_code is None:
+                unmapped_code = _get_max_code(codes.typecode, codes.itemsize)
+            return self._migrate_sequence(codes, unmapped_code)
+        if isinstance(codes, list):
+            if unmapped_code is None:
+                unmapped_code = -1
+            return self._migrate_sequence(codes, unmapped_code)
+        return self._migrate_bytes(
+            codes, 0xFF if unmapped_code is None else unmapped_code
+        )
+
+    def _migrate_bytes(self, codes, unmapped_code):
+        if len(self.old_states) > 256 or len(self.new_states) > 256:
+            raise ValueError("Too many states to store codes in bytes.")
+
+        lookup = self.code_table(unmapped_code)
+        table = bytes(lookup + [unmapped_code] * (256 - len(lookup)))
+        mapped = bytes(
+            code for code, new_code in enumerate(lookup) if new_code != unmapped_code
+        )
+
+        if isinstance(codes, memoryview):
+            codes = codes.cast("B")
+
+        unmapped = Counter()
+        total = len(codes)
+        for start in range(0, total, CHUNK_SIZE):
+            chunk = bytes(codes[start : start + CHUNK_SIZE])
+            rest = chunk.translate(None, mapped)
+            if rest:
+                unmapped.update(rest)
+            codes[start : start + len(chunk)] = chunk.translate(table)
+        return MigrationReport(total, unmapped)
+
+    def _migrate_sequence(self, codes, unmapped_code):
+        lookup = dict(enumerate(self.code_table(unmapped_code)))
+        unmapped = Counter()
+        for position, code in enumerate(codes):
+            new_code = lookup.get(code, unmapped_code)
+            if new_code == unmapped_code:
+                unmapped[code] += 1
+            codes[position] = new_code
+        return MigrationReport(len(codes), unmapped)
+
+    def _migrate_numpy(self, codes, unmapped_code):
+        import numpy
+
+        if unmapped_code is None:
+            info = numpy.iinfo(codes.dtype)
+            unmapped_code = info.max if info.min == 0 else -1
+
+        lookup = numpy.asarray(self.code_table(unmapped_code), dtype=codes.dtype)
+        valid = (codes >= 0) & (codes < len(lookup))
+        result = numpy.full_like(codes, unmapped_code)
+        result[valid] = lookup[codes[valid]]
+
+        failed = codes[result == unmapped_code]
+        values, counts = numpy.unique(failed, return_counts=True)
+        unmapped = Counter(dict(zip(values.tolist(), counts.tolist())))
+        codes[...] = result
+        return MigrationReport(int(codes.size), unmapped)
+
+
+def _get_max_code(typecode, itemsize):
+    if typecode.isupper():
+        return (1 << (8 * itemsize)) - 1
+    return -1
@@ -0,0 +1,177 @@
+"""Monte-Carlo simulation of many entities moving through state machine.
+
+Entities are not instances of state machine - their states are kept as one
+NumPy array of state indexes, which is stepped for all entities at once,
+using probabilities of transitions. Only allowed transitions of machine may
+have probabilities.
+
+Requires NumPy (install with ``pip install super_state_machine[simulation]``).
+
+Usage::
+
+    >>> from super_state_machine import simulation
+    >>> occupancy = simulation.simulate(
+    ...     Order,
+    ...     {('new', 'paid'): 0.3, ('paid', 'shipped'): 0.1},
+    ...     {'new': 1000000},
+    ...     ticks=100,
+    ... )
+    >>> occupancy[-1]  # counts of entities in states after last tick
+
+"""
+
+import numpy
+
+
+def get_states(machine_class):
+    """Get states of machine, in order of their indexes in simulation."""
+    return machine_class._meta["graph"].states
+
+
+def get_allowed(machine_class):
+    """Get matrix of allowed transitions of machine.
+
+    :returns: Square boolean array, ``allowed[source, target]`` is true when
+        transition is allowed. Staying in state is always allowed.
+
+    """
+    graph = machine_class._meta["graph"]
+    size = len(graph.states)
+    if graph.complete:
+        return numpy.ones((size, size), dtype=bool)
+
+    allowed = numpy.eye(size, dtype=bool)
+    for state, targets in graph.transitions.items():
+        for target in targets:
+            allowed[graph.index[state], graph.index[target]] = True
+    return allowed
+
+
+def transition_matrix(machine_class, probabilities):
+    """Build matrix of probabilities of transitions for each tick.
+
+    :param machine_class: State machine class.
+    :param probabilities: Dict mapping pairs of (source, target) states to
+        probability of transition from source to target in one tick (states
+        may be given in any form accepted by machine). Entities stay in their
+        state with the remaining probability. Square array of all
+        probabilities (indexed like `get_states`) is accepted too.
+    :returns: Square array with rows summing to 1.
+    :raises ValueError: When probabilities are not valid or are given for
+        transitions which are not allowed.
+
+    """
+    allowed = get_allowed(machine_class)
+    size = len(allowed)
+
+    if isinstance(probabilities, dict):
+        meta = machine_class._meta
+        translator = meta["translator"]
+        index = meta["graph"].index
+        matrix = numpy.zeros((size, size))
+        for (source, target), probability in probabilities.items():
+            source = index[translator.translate(source)]
+            target = index[translator.translate(target)]
+            matrix[source, target] += probability
+        diagonal = numpy.arange(size)
+        matrix[diagonal, diagonal] = 0.0
+        remaining = 1.0 - matrix.sum(axis=1)
+        # Rounding errors of probabilities summing to 1 are not negative.
+        remaining[numpy.isclose(remaining, 0.0)] = 0.0
+        matrix[diagonal, diagonal] = remaining
+    else:
+        matrix = numpy.array(probabilities, dtype=float)
+        if matrix.shape != (size, size):
+            raise ValueError(
+                "Matrix of probabilities must have shape {shape}.".format(
+                    shape=(size, size)
+                )
+            )
+        if not numpy.allclose(matrix.sum(axis=1), 1.0):
+            raise ValueError("Rows of probabilities must sum to 1.")
+
+    if ((matrix < 0) | (matrix > 1)).any():
+        raise ValueError(
+            "Probabilities must be between 0 and 1 (and sum to at most 1 "
+            "for each state)."
+        )
+    if (matrix[~allowed] != 0).any():
+        states = get_states(machine_class)
+        sources, targets = numpy.nonzero((matrix != 0) & ~allowed)
+        raise ValueError(
+            "Transition from {source!r} to {target!r} is not allowed.".format(
+                source=states[sources[0]].value,
+                target=states[targets[0]].value,
+            )
+        )
+    return matrix
+
+
+def initial_states(machine_class, counts):
+    """Build array of states of entities.
+
+    :param dict counts: Maps states to numbers of entities in them.
+    :returns: Array of state indexes (entities in the same state are
+        consecutive).
+
+    """
+    meta = machine_class._meta
+    translator = meta["translator"]
+    index = meta["graph"].index
+    dtype = numpy.min_scalar_type(len(index) - 1)
+    numbers = numpy.zeros(len(index), dtype=numpy.intp)
+    for state, count in counts.items():
+        numbers[index[translator.translate(state)]] += count
+    return numpy.repeat(numpy.arange(len(index), dtype=dtype), numbers)
+
+
+def simulate(machine_class, probabilities, initial, ticks, seed=None):
+    """Simulate entities moving through states of machine.
+
+    :param machine_class: State machine class.
+    :param probabilities: Probabilities of transitions, see
+        `transition_matrix`.
+    :param initial: Dict mapping states to numbers of entities (see
+        `initial_states`) or array of state indexes of entities, which is
+        stepped in place (so it holds states of entities after last tick).
+    :param int ticks: Number of ticks.
+    :param seed: Seed or `numpy.random.Generator` used for random numbers.
+    :returns: Array of shape ``(ticks + 1, number of states)`` - row ``t``
+        holds numbers of entities in each state after ``t`` ticks (so the
+        first row is initial occupancy). Columns are ordered like
+        `get_states`.
+
+    """
+    matrix = transition_matrix(machine_class, probabilities)
+    if isinstance(initial, dict):
+        states = initial_states(machine_class, initial)
+    else:
+        states = initial
+
+    random = numpy.random.default_rng(seed)
+    size = len(matrix)
+    cumulative = numpy.cumsum(matrix, axis=1)
+    cumulative[:, -1] = 1.0
+    # Absorbing states (and states without entities) are skipped in steps.
+    moving = [number for number in range(size) if matrix[number, number] < 1.0]
+
+    occupancy = numpy.empty((ticks + 1, size), dtype=numpy.int64)
+    occupancy[0] = numpy.bincount(states, minlength=size)
+    for tick in range(1, ticks + 1):
+        _step(states, cumulative, moving, occupancy[tick - 1], random)
+        occupancy[tick] = numpy.bincount(states, minlength=size)
+    return occupancy
+
+
+def _step(states, cumulative, moving, occupancy, random):
+    """Move all entities at once.
+
+    Masks of entities are taken before any of them moves, so each entity
+    makes at most one transition per tick. Target is found by searching
+    uniform random number in cumulative probabilities of its state.
+
+    """
+    masks = [(number, states == number) for number in moving if occupancy[number]]
+    for number, mask in masks:
+        draws = random.random(int(occupancy[number]))
+        states[mask] = numpy.searchsorted(cumulative[number], draws, side="right")
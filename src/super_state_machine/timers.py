@@ -0,0 +1,276 @@
+"""Timers for timed states.
+
+All timed states in process share one hierarchical timer wheel, so scheduling
+and cancelling timeout is O(1) and there is no thread or task per machine.
+Wheel must be driven - either by calling `TimerWheel.advance` periodically or
+by one of drivers (`ThreadDriver` or `AsyncioDriver`).
+
+"""
+
+import asyncio
+import math
+import threading
+import time
+import weakref
+
+
+class Timer(object):
+    """Single scheduled call."""
+
+    __slots__ = ("expires", "callback", "args", "slot", "cancelled")
+
+    def __init__(self, expires, callback, args):
+        """Init.
+
+        :param int expires: Tick of wheel, in which timer expires.
+        :param callable callback: Function to call.
+        :param tuple args: Arguments for callback.
+
+        """
+        self.expires = expires
+        self.callback = callback
+        self.args = args
+        self.slot = None
+        self.cancelled = False
+
+
+class TimerWheel(object):
+    """Hierarchical timer wheel.
+
+    Each level has ``2 ** slot_bits`` slots and each slot of level covers whole
+    rotation of level below. Timers are cascaded down to lower levels when
+    wheel reaches their slot, and fired from the lowest level. Timers further
+    than all levels can cover are parked in the farthest slot and rescheduled
+    when cascaded.
+
+    """
+
+    def __init__(self, resolution=0.1, slot_bits=6, levels=4, clock=time.monotonic):
+        """Init.
+
+        :param float resolution: Length of one tick in seconds.
+        :param int slot_bits: Each level has ``2 ** slot_bits`` slots.
+        :param int levels: Number of levels.
+        :param callable clock: Monotonic clock returning seconds.
+
+        """
+        self.resolution = resolution
+        self.clock = clock
+        self._bits = slot_bits
+        self._mask = (1 << slot_bits) - 1
+        self._levels = [[set() for _ in range(1 << slot_bits)] for _ in range(levels)]
+        self._origin = clock()
+        self._tick = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Get number of pending timers."""
+        return self._count
+
+    def schedule(self, delay, callback, *args):
+        """Schedule call of callback after given delay (in seconds).
+
+        :returns: `Timer` instance, which can be cancelled.
+
+        """
+        with self._lock:
+            expires = math.ceil((self.clock() - self._origin + delay) / self.resolution)
+            timer = Timer(max(expires, self._tick + 1), callback, args)
+            self._insert(timer)
+            self._count += 1
+        return timer
+
+    def cancel(self, timer):
+        """Cancel timer. Cancelling expired or cancelled timer does nothing."""
+        with self._lock:
+            timer.cancelled = True
+            if timer.slot is not None:
+                timer.slot.discard(timer)
+                timer.slot = None
+                self._count -= 1
+
+    def advance(self, now=None):
+        """Fire all timers that expired till now.
+
+        Expired timers are collected first and then called in one batch,
+        outside of wheel lock.
+
+        :returns: Number of fired timers.
+
+        """
+        if now is None:
+            now = self.clock()
+        target = int((now - self._origin) / self.resolution)
+
+        expired = []
+        with self._lock:
+            if not self._count:
+                self._tick = max(self._tick, target)
+            while self._tick < target:
+                self._step(expired)
+
+        fired = 0
+        for timer in expired:
+            if not timer.cancelled:
+                timer.callback(*timer.args)
+                fired += 1
+        return fired
+
+    def _insert(self, timer):
+        bits = self._bits
+        delta = timer.expires - self._tick
+        last = len(self._levels) - 1
+        for level, slots in enumerate(self._levels):
+            if delta < 1 << (bits * (level + 1)) or level == last:
+                break
+
+        expires = timer.expires
+        if level == last:
+            expires = min(expires, self._tick + (1 << (bits * (last + 1))) - 1)
+
+        slot = slots[(expires >> (bits * level)) & self._mask]
+        slot.add(timer)
+        timer.slot = slot
+
+    def _step(self, expired):
+        self._tick += 1
+        tick = self._tick
+        bits = self._bits
+
+        for level in range(len(self._levels) - 1, 0, -1):
+            shift = bits * level
+            if tick & ((1 << shift) - 1):
+                continue
+            slot = self._levels[level][(tick >> shift) & self._mask]
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                self._insert(timer)
+
+        slot = self._levels[0][tick & self._mask]
+        if slot:
+            for timer in slot:
+                timer.slot = None
+            expired.extend(slot)
+            self._count -= len(slot)
+            slot.clear()
+
+
+default_wheel = TimerWheel()
+
+
+class ThreadDriver(object):
+    """Drives timer wheel from background thread."""
+
+    def __init__(self, wheel=None, interval=None):
+        """Init.
+
+        :param TimerWheel wheel: Wheel to drive, default one by default.
+        :param float interval: How often to advance wheel, by default
+            resolution of wheel.
+
+        """
+        self.wheel = default_wheel if wheel is None else wheel
+        self.interval = interval or self.wheel.resolution
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start driving wheel."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop driving wheel and wait for thread to finish."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.wheel.advance()
+
+
+class AsyncioDriver(object):
+    """Drives timer wheel from asyncio task."""
+
+    def __init__(self, wheel=None, interval=None):
+        """Init.
+
+        :param TimerWheel wheel: Wheel to drive, default one by default.
+        :param float interval: How often to advance wheel, by default
+            resolution of wheel.
+
+        """
+        self.wheel = default_wheel if wheel is None else wheel
+        self.interval = interval or self.wheel.resolution
+        self._task = None
+
+    def start(self):
+        """Start driving wheel in running event loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        """Stop driving wheel."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.wheel.advance()
+
+
+class TimeoutScheduler(object):
+    """Schedules timeout transitions for instances of one machine class."""
+
+    timer_attribute_name = "_state_timer"
+
+    def __init__(self, timeouts, wheel=None):
+        """Init.
+
+        :param dict timeouts: Maps state to 2-tuple of delay (in seconds) and
+            target state.
+        :param TimerWheel wheel: Wheel to use, default one by default.
+
+        """
+        self.timeouts = timeouts
+        self.wheel = default_wheel if wheel is None else wheel
+
+    def on_create(self, machine):
+        """Start timer for initial state of new machine."""
+        self._schedule(machine, machine.actual_state)
+
+    def on_change(self, machine, previous, state):
+        """Cancel timer of left state and start timer for new one."""
+        timer = getattr(machine, self.timer_attribute_name, None)
+        if timer is not None:
+            self.wheel.cancel(timer)
+            setattr(machine, self.timer_attribute_name, None)
+        self._schedule(machine, state)
+
+    def _schedule(self, machine, state):
+        try:
+            delay, target = self.timeouts[state]
+        except KeyError:
+            return
+
+        timer = self.wheel.schedule(
+            delay, self._fire, weakref.ref(machine), state, target
+        )
+        setattr(machine, self.timer_attribute_name, timer)
+
+    @staticmethod
+    def _fire(reference, state, target):
+        machine = reference()
+        if machine is not None and machine.actual_state is state:
+            machine.force_set(target)
@@ -0,0 +1,183 @@
+"""Tracking of state machine instances."""
+
+import threading
+import time
+from array import array
+from weakref import WeakSet
+
+
+class InstanceIndex(object):
+    """Live index of instances of state machine class by their state.
+
+    Index is updated incrementally on every change of state (under lock, as
+    weak sets are not safe for concurrent changes) and keeps only weak
+    references, so it doesn't keep machines alive.
+
+    """
+
+    def __init__(self, states):
+        """Init.
+
+        :param tuple states: All states of state machine.
+
+        """
+        self.index = dict((state, WeakSet()) for state in states)
+        self._lock = threading.Lock()
+
+    def on_create(self, machine):
+        """Add new machine to index."""
+        with self._lock:
+            self.index[machine.actual_state].add(machine)
+
+    def on_change(self, machine, previous, state):
+        """Move machine to its new state."""
+        with self._lock:
+            self.index[previous].discard(machine)
+            self.index[state].add(machine)
+
+    def instances_in(self, state):
+        """Get all live instances in given state."""
+        with self._lock:
+            return list(self.index[state])
+
+    def count_in(self, state):
+        """Get number of live instances in given state."""
+        return len(self.index[state])
+
+
+class DirtyTracker(object):
+    """Tracker of instances of state machine class which changed state.
+
+    Every instance has flag (kept in its attribute), so only the first change
+    after flush touches shared set of dirty instances. New instances are
+    dirty as well, since they were never flushed.
+
+    """
+
+    flag_attribute_name = "_state_dirty"
+
+    def __init__(self):
+        """Init."""
+        self.dirty = WeakSet()
+        self._lock = threading.Lock()
+
+    def on_create(self, machine):
+        """Mark new machine as dirty."""
+        self._mark(machine)
+
+    def on_change(self, machine, previous, state):
+        """Mark machine as dirty (if it is not dirty already)."""
+        if not getattr(machine, self.flag_attribute_name, False):
+            self._mark(machine)
+
+    def _mark(self, machine):
+        with self._lock:
+            setattr(machine, self.flag_attribute_name, True)
+            self.dirty.add(machine)
+
+    def collect(self):
+        """Get all dirty instances and mark them as clean."""
+        with self._lock:
+            dirty, self.dirty = self.dirty, WeakSet()
+            machines = list(dirty)
+            for machine in machines:
+                setattr(machine, self.flag_attribute_name, False)
+        return machines
+
+    def clear(self):
+        """Mark all instances as clean."""
+        self.collect()
+
+    def discard(self, machine):
+        """Mark given instance as clean."""
+        with self._lock:
+            setattr(machine, self.flag_attribute_name, False)
+            self.dirty.discard(machine)
+
+
+class HistoryBuffer(object):
+    """Ring buffer of transitions of one machine.
+
+    Transitions are kept as pairs of indexes of states and timestamps in
+    preallocated arrays, so memory used by buffer is fixed.
+
+    """
+
+    __slots__ = ("transitions", "timestamps", "position", "count")
+
+    def __init__(self, size, typecode):
+        """Init.
+
+        :param int size: Number of transitions to keep.
+        :param str typecode: Type code of array with indexes of states.
+
+        """
+        self.transitions = array(typecode, [0]) * (2 * size)
+        self.timestamps = array("d", [0.0]) * size
+        self.position = 0
+        self.count = 0
+
+
+class TransitionHistory(object):
+    """Recorder of last transitions of instances of state machine class.
+
+    Buffer of machine is allocated on its first change of state.
+
+    """
+
+    buffer_attribute_name = "_state_history"
+
+    def __init__(self, states, size, clock=time.monotonic):
+        """Init.
+
+        :param tuple states: All states of state machine.
+        :param int size: Number of transitions to keep for each machine.
+        :param callable clock: Source of timestamps.
+
+        """
+        self.states = tuple(states)
+        self.index = dict((state, number) for number, state in enumerate(states))
+        self.size = size
+        self.clock = clock
+        self.typecode = "H" if len(self.states) <= 1 << 16 else "L"
+
+    def on_change(self, machine, previous, state):
+        """Record transition."""
+        buffer = getattr(machine, self.buffer_attribute_name, None)
+        if buffer is None:
+            buffer = HistoryBuffer(self.size, self.typecode)
+            setattr(machine, self.buffer_attribute_name, buffer)
+
+        position = buffer.position
+        buffer.transitions[2 * position] = self.index[previous]
+        buffer.transitions[2 * position + 1] = self.index[state]
+        buffer.timestamps[position] = self.clock()
+        buffer.position = (position + 1) % self.size
+        if buffer.count < self.size:
+            buffer.count += 1
+
+    def read(self, machine):
+        """Get recorded transitions of machine, from the oldest one.
+
+        :returns: List of 3-tuples of previous state, new state and timestamp.
+
+        """
+        buffer = getattr(machine, self.buffer_attribute_name, None)
+        if buffer is None:
+            return []
+
+        states = self.states
+        transitions = buffer.transitions
+        timestamps = buffer.timestamps
+        start = buffer.position - buffer.count
+        result = []
+        for offset in range(buffer.count):
+            position = (start + offset) % self.size
+            result.append(
+                (
+                    states[transitions[2 * position]],
+                    states[transitions[2 * position + 1]],
+                    timestamps[position],
+                )
+            )
+        return result
@@ -1,9 +1,14 @@
 """Utilities for core."""
 
+from collections import deque
 from enum import Enum, unique
 from functools import wraps
+from types import MethodType
 
-from .errors import TransitionError
+from .errors import StaleStateError, TransitionError
+
+_missing = object()
+_checked = object()
 
 
 def is_(self, state):
@@ -36,17 +41,375 @@ def force_set(self, state):
     setattr(self, attr, state)
 
 
-def set_(self, state):
-    """Set new state for machine."""
+def speculative_force_set(self, state):
+    """Set new state of speculating machine (see `Speculation`).
+
+    State is written directly to instance, so listeners are not notified and
+    versions or backends are not touched.
+
+    """
+    meta = self._meta
+    vars(self)[meta["state_attribute_name"]] = meta["translator"].translate(state)
+
+
+def notifying_force_set(self, state):
+    """Set new state without checking if transition is allowed.
+
+    After change all listeners of state machine are notified.
+
+    """
+    translator = self._meta["translator"]
+    state = translator.translate(state)
+    attr = self._meta["state_attribute_name"]
+    previous = getattr(self, attr)
+    setattr(self, attr, state)
+    for listener in self._meta["listeners"]:
+        listener(self, previous, state)
+
+
+def queued_force_set(self, state):
+    """Set new state without checking if transition is allowed.
+
+    Changes requested while previous change is still processed (by listeners
+    of state machine) are queued and done after it, one by one, so cascades of
+    changes don't grow stack. If any listener fails, queued changes are
+    dropped.
+
+    """
+    translator = self._meta["translator"]
+    _run_to_completion(self, translator.translate(state), _missing)
+
+
+def notify_listeners(self, previous, state):
+    """Notify listeners of machine about change of state, which was made.
+
+    For machines running to completion notification is processed like change
+    requested by `queued_force_set` - after change being processed, and
+    changes requested by listeners are queued after it.
+
+    """
+    if self._meta.get("run_to_completion", False):
+        _run_to_completion(self, state, previous)
+    else:
+        for listener in self._meta["listeners"]:
+            listener(self, previous, state)
+
+
+def _run_to_completion(self, state, previous):
+    """Process change of state, and then changes queued meanwhile.
+
+    Previous state is `_missing` for changes, which are not made yet, and
+    `_checked` for changes requested by `set_` - their transitions are checked
+    against actual state when they are taken from queue. If transition is not
+    allowed `TransitionError` is raised (to caller of change being processed
+    first) and other queued changes are dropped.
+
+    """
+    queue = getattr(self, "_state_queue", None)
+    if queue is not None:
+        queue.append((state, previous))
+        return
+
+    attr = self._meta["state_attribute_name"]
+    listeners = self._meta["listeners"]
+    queue = self._state_queue = deque([(state, previous)])
+    try:
+        while queue:
+            state, previous = queue.popleft()
+            if previous is _checked:
+                _check_transition(self, state)
+                previous = _missing
+            if previous is _missing:
+                previous = getattr(self, attr)
+                setattr(self, attr, state)
+            for listener in listeners:
+                listener(self, previous, state)
+    finally:
+        self._state_queue = None
+
+
+def set_(self, state, expected_version=None):
+    """Set new state for machine.
+
+    For versioned machines expected version can be given - then state is set
+    only if it wasn't changed since then (otherwise `StaleStateError` is
+    raised).
+
+    While machine running to completion processes other change, new state is
+    queued and its transition is checked when it is taken from queue (see
+    `_run_to_completion`).
+
+    """
+    queue = getattr(self, "_state_queue", None)
+    if queue is not None and expected_version is None:
+        queue.append((self._meta["translator"].translate(state), _checked))
+        return
+
     if not self.can_be_(state):
-        state = self._meta["translator"].translate(state)
+        _check_transition(self, self._meta["translator"].translate(state))
+
+    if expected_version is None:
+        self.force_set(state)
+    elif compare_version_and_set_many([(self, expected_version, state)]):
+        raise StaleStateError(
+            "State was changed since version {version}.".format(
+                version=expected_version
+            )
+        )
+
+
+def _check_transition(self, state):
+    """Raise `TransitionError` if machine can't transit to state."""
+    meta = self._meta
+    actual_state = self.actual_state
+    if not (
+        meta["complete"]
+        or actual_state is None
+        or state in meta["transitions"][actual_state]
+    ):
         raise TransitionError(
             "Cannot transit from '{actual_value}' to '{value}'.".format(
+                actual_value=actual_state.value, value=state.value
+            )
+        )
+
+
+def compare_version_and_set_many(items):
+    """Set states of versioned machines, if their versions are expected ones.
+
+    Transitions are not checked. Listeners are notified about accepted
+    changes.
+
+    :param items: Iterable of 3-tuples of machine, expected version and state.
+    :returns: List of machines, which states were not set.
+
+    """
+    batches = {}
+    for machine, expected_version, state in items:
+        meta = machine._meta
+        try:
+            store = meta["state_store"]
+        except KeyError:
+            raise ValueError("State machine is not versioned.")
+        state = meta["translator"].translate(state)
+        change = (machine, expected_version, state, machine.actual_state)
+        try:
+            batches[store].append(change)
+        except KeyError:
+            batches[store] = [change]
+
+    rejected = []
+    for store, changes in batches.items():
+        failed = store.compare_version_and_set_many(
+            [(machine, version, state) for machine, version, state, _ in changes]
+        )
+        rejected.extend(failed)
+        failed = set(map(id, failed))
+        for machine, _, state, previous in changes:
+            if id(machine) not in failed:
+                notify_listeners(machine, previous, state)
+    return rejected
+
+
+def get_event_target(self, event, state=_missing):
+    """Get state to which event leads from actual state (or given one).
+
+    :raises TransitionError: If event is not allowed in the state.
+
+    """
+    if state is _missing:
+        state = self.actual_state
+    meta = self._meta
+    event_ids = meta["event_ids"]
+    try:
+        event_id = event_ids[event]
+    except KeyError:
+        raise ValueError("Unknown event '{event}'.".format(event=event))
+
+    index = meta["graph"].index[state]
+    target = meta["event_table"][index * len(event_ids) + event_id]
+    if target is None:
+        raise TransitionError(
+            "Event '{event}' is not allowed in state '{value}'.".format(
+                event=event, value=state.value
+            )
+        )
+    return target
+
+
+def send(self, event):
+    """Change state by transition assigned to event in actual state."""
+    self.force_set(get_event_target(self, event))
+
+
+def can_reach(self, state):
+    """Check if machine can ever reach given state from actual one."""
+    state = self._meta["translator"].translate(state)
+    return self._meta["graph"].can_reach(self.actual_state, state)
+
+
+def path(self, state):
+    """Get shortest path from actual state to given one (or `None`)."""
+    state = self._meta["translator"].translate(state)
+    return self._meta["graph"].path(self.actual_state, state)
+
+
+def advance_to(self, state):
+    """Go to given state through shortest chain of allowed transitions.
+
+    Every step is done with `force_set`, since plan comes from transitions
+    graph and each step is valid by definition.
+
+    """
+    state = self._meta["translator"].translate(state)
+    path = self._meta["graph"].path(self.actual_state, state)
+    if path is None:
+        raise TransitionError(
+            "Cannot reach '{value}' from '{actual_value}'.".format(
                 actual_value=self.actual_state.value, value=state.value
             )
         )
 
+    for step in path[1:]:
+        self.force_set(step)
+
+
+def class_can_reach(cls, source, target):
+    """Check if target state can ever be reached from source state."""
+    translator = cls._meta["translator"]
+    return cls._meta["graph"].can_reach(
+        translator.translate(source), translator.translate(target)
+    )
+
+
+def class_path(cls, source, target):
+    """Get shortest path between source and target states (or `None`)."""
+    translator = cls._meta["translator"]
+    return cls._meta["graph"].path(
+        translator.translate(source), translator.translate(target)
+    )
+
+
+def instances_in(cls, state):
+    """Get all live instances of state machine in given state."""
+    state = cls._meta["translator"].translate(state)
+    return cls._meta["instance_index"].instances_in(state)
+
+
+def count_in(cls, state):
+    """Get number of live instances of state machine in given state."""
+    state = cls._meta["translator"].translate(state)
+    return cls._meta["instance_index"].count_in(state)
+
+
+def fork(self):
+    """Get copy of state machine in the same state.
+
+    Only state is copied - `__init__` is not called and other attributes of
+    instance are not copied, while all tables are shared with class.
+    Initializers (like timeouts) are run, as for new machine. State is kept
+    in fork itself, so forks of machines keeping states in backend are
+    detached from backend (and versions of forks start from zero).
+
+    """
+    cls = type(self)
+    meta = cls._meta
+    machine = cls.__new__(cls)
+    vars(machine)[meta["state_attribute_name"]] = self.actual_state
+    for initializer in meta["initializers"]:
+        initializer(machine)
+    return machine
+
+
+def fork_many(cls, machines):
+    """Get copies of given state machines (see `fork`)."""
+    meta = cls._meta
+    attr = meta["state_attribute_name"]
+    initializers = meta["initializers"]
+    new = cls.__new__
+    forks = []
+    for machine in machines:
+        copy = new(cls)
+        vars(copy)[attr] = machine.actual_state
+        for initializer in initializers:
+            initializer(copy)
+        forks.append(copy)
+    return forks
+
+
+def speculate(self):
+    """Get context in which changes of state are rolled back on exit."""
+    return Speculation(self)
+
+
+@property
+def state_version(self):
+    """Get version of state - number of its changes."""
+    return self._meta["state_store"].read_version(self)
+
+
+def history(self):
+    """Get last transitions of machine, from the oldest one.
+
+    :returns: List of 3-tuples of previous state, new state and timestamp.
+
+    """
+    return self._meta["history"].read(self)
+
+
+def dwell_times(cls):
+    """Get histograms of times spent in states by instances of state machine.
+
+    :returns: Dict mapping states to `metrics.Histogram` instances.
+
+    """
+    return cls._meta["dwell_times"].snapshot()
+
+
+def collect_dirty(cls):
+    """Get instances of state machine changed since last collection.
+
+    Collected instances are marked as clean.
+
+    """
+    return cls._meta["dirty_tracker"].collect()
+
+
+def class_clear_dirty(cls):
+    """Mark all instances of state machine as clean."""
+    cls._meta["dirty_tracker"].clear()
+
+
+def clear_dirty(self):
+    """Mark state machine as clean."""
+    self._meta["dirty_tracker"].discard(self)
+
+
+def try_set_(self, state):
+    """Set new state for machine if transition is allowed.
+
+    Unlike `set_` it doesn't raise (and format) `TransitionError`.
+
+    While machine running to completion processes other change, transition
+    is checked from state after all queued changes, and `True` means that
+    change was queued.
+
+    :returns: `True` if state was changed, `False` otherwise.
+
+    """
+    meta = self._meta
+    state = meta["translator"].translate(state)
+    queue = getattr(self, "_state_queue", None)
+    actual_state = queue[-1][0] if queue else self.actual_state
+    if not (
+        meta["complete"]
+        or actual_state is None
+        or state in meta["transitions"][actual_state]
+    ):
+        return False
+
     self.force_set(state)
+    return True
 
 
 def state_getter(self):
@@ -62,6 +425,17 @@ def state_setter(self, value):
     self.set_(value)
 
 
+def get_method_suffix(state):
+    """Get suffix of methods generated for state.
+
+    It is value of state, or lowercased name of state for integer states.
+
+    """
+    if isinstance(state.value, str):
+        return state.value
+    return state.name.lower()
+
+
 def generate_getter(value):
     """Generate getter for given value."""
 
@@ -84,6 +458,16 @@ def generate_checker(value):
     return checker
 
 
+def generate_try_setter(value):
+    """Generate non raising setter for given value."""
+
+    @wraps(try_set_)
+    def try_setter(self):
+        return self.try_set_(value)
+
+    return try_setter
+
+
 def generate_setter(value):
     """Generate setter for given value."""
 
@@ -97,6 +481,127 @@ def generate_setter(value):
 state_property = property(state_getter, state_setter)
 
 
+class ClassOrInstanceMethod(object):
+    """Method that has separate implementations for class and instance."""
+
+    def __init__(self, class_method, instance_method):
+        """Init.
+
+        :param function class_method: Used when accessed through class.
+        :param function instance_method: Used when accessed through instance.
+
+        """
+        self.class_method = class_method
+        self.instance_method = instance_method
+        self.__doc__ = instance_method.__doc__
+
+    def __get__(self, instance, owner=None):
+        """Bind proper implementation."""
+        if instance is None:
+            return MethodType(self.class_method, owner)
+        return MethodType(self.instance_method, instance)
+
+
+class StateDispatcher(object):
+    """Method, which calls implementation assigned to actual state.
+
+    Implementation is found when method is called (not when it is looked up),
+    so bound method kept across changes of state always calls the proper one.
+
+    """
+
+    def __init__(self, name, table, fallback=None):
+        """Init.
+
+        :param str name: Name of method.
+        :param dict table: Maps states to implementations.
+        :param function fallback: Used in states without implementation.
+
+        """
+        self.name = name
+        self.table = table
+        self.fallback = fallback
+
+    def __get__(self, instance, owner=None):
+        """Bind dispatcher to instance."""
+        if instance is None:
+            return self
+        return MethodType(self, instance)
+
+    def __call__(self, instance, *args, **kwargs):
+        """Call implementation for actual state of instance."""
+        try:
+            function = self.table[instance.actual_state]
+        except KeyError:
+            function = self.fallback
+            if function is None:
+                raise TransitionError(
+                    "Method '{name}' is not available in state '{value}'.".format(
+                        name=self.name, value=instance.actual_state.value
+                    )
+                )
+        return function(instance, *args, **kwargs)
+
+
+class Speculation(object):
+    """Context manager, which restores state of machine on exit.
+
+    While speculating, `force_set` of machine is replaced (in instance) by
+    `speculative_force_set`, so changes of state have no side effects -
+    listeners are not notified and versions or backends are not touched. On
+    exit raw state of instance is restored. Call `commit` to keep changes made
+    so far - they are applied on exit with `force_set`, as one change from
+    state before speculation.
+
+    """
+
+    __slots__ = ("machine", "state", "committed", "saved")
+
+    def __init__(self, machine):
+        self.machine = machine
+        self.state = self.committed = None
+        self.saved = None
+
+    def __enter__(self):
+        machine = self.machine
+        values = vars(machine)
+        attr = machine._meta["state_attribute_name"]
+        self.state = self.committed = machine.actual_state
+        self.saved = [
+            (name, values.get(name, _missing))
+            for name in (attr, "force_set", "_state_queue")
+        ]
+        values[attr] = self.state
+        values["_state_queue"] = None
+        values["force_set"] = MethodType(speculative_force_set, machine)
+        return machine
+
+    def __exit__(self, *exc_info):
+        values = vars(self.machine)
+        for name, value in self.saved:
+            if value is _missing:
+                values.pop(name, None)
+            else:
+                values[name] = value
+        if self.committed is not self.state:
+            self.machine.force_set(self.committed)
+        return False
+
+    def rollback(self):
+        """Restore state from beginning of speculation (or last commit)."""
+        self.machine.force_set(self.committed)
+
+    def commit(self):
+        """Keep actual state of machine after exit."""
+        self.committed = self.machine.actual_state
+
+
+@property
+def removed_attribute(self):
+    """Attribute of parent machine, that is not available in subclass."""
+    raise AttributeError("This attribute is not available for this state machine.")
+
+
 @property
 def actual_state(self):
     """Actual state as `None` or `enum` instance."""
@@ -113,18 +618,88 @@ def as_enum(self):
 class EnumValueTranslator(object):
     """Helps to find enum element by its value."""
 
-    def __init__(self, base_enum):
+    max_error_value_length = 100
+
+    def __init__(self, base_enum, aliases=None, names=False, case_insensitive=False):
         """Init.
 
         :param enum base_enum: Enum, to which elements values are translated.
+        :param dict aliases: Additional values, that translate to given states.
+        :param bool names: If names of enum members should be translated too.
+        :param bool case_insensitive: If strings should be matched regardless
+            of their case.
 
         """
         base_enum = unique(base_enum)
         self.base_enum = base_enum
+        self.aliases = aliases or {}
+        self.names = names
+        self.case_insensitive = case_insensitive
         self.generate_search_table()
 
     def generate_search_table(self):
-        self.search_table = dict((item.value, item) for item in list(self.base_enum))
+        """Generate table used for translation.
+
+        Enum members, their values, names and aliases are keys in the same
+        table, so every translation is just one dictionary lookup. For case
+        insensitive translator there is also table of case folded keys, which
+        is consulted only if exact match fails.
+
+        """
+        items = list(self.base_enum)
+        search_table = dict((item, item) for item in items)
+        for item in items:
+            self._add_key(search_table, item.value, item)
+        if self.names:
+            for item in items:
+                self._add_key(search_table, item.name, item)
+        for alias, state in self.aliases.items():
+            try:
+                state = search_table[state]
+            except KeyError:
+                raise ValueError(
+                    "Alias '{alias}' points to unknown state '{state}'.".format(
+                        alias=alias, state=state
+                    )
+                )
+            self._add_key(search_table, alias, state)
+
+        folded_table = {}
+        if self.case_insensitive:
+            for key, item in search_table.items():
+                if isinstance(key, str) and not isinstance(key, Enum):
+                    self._add_key(folded_table, key.casefold(), item)
+
+        self.set_tables(search_table, folded_table)
+
+    def set_tables(self, search_table, folded_table):
+        """Set tables used for translation.
+
+        Dictionaries match keys by equality, so for found state it is checked
+        that value is really one of keys - enum members by identity (so
+        members of other enums with equal values don't match) and other values
+        by type (so ``True`` or ``1.0`` don't match state with value ``1``).
+
+        """
+        self.search_table = search_table
+        self.folded_table = folded_table
+        self.member_ids = frozenset(
+            id(key) for key in search_table if isinstance(key, Enum)
+        )
+        # Members of mixin enums (like `IntEnum`) are keys for their values.
+        self.key_types = frozenset(
+            type(key.value) if isinstance(key, Enum) else type(key)
+            for key in search_table
+        )
+
+    @staticmethod
+    def _add_key(table, key, item):
+        if table.get(key, item) is not item:
+            raise ValueError(
+                "Value '{key}' is ambiguous - it matches both '{first}' and "
+                "'{second}'.".format(key=key, first=table[key], second=item)
+            )
+        table[key] = item
 
     def translate(self, value):
         """Translate value to enum instance.
@@ -133,23 +708,44 @@ class EnumValueTranslator(object):
         enum.
 
         """
-        if self._check_if_already_proper(value):
-            return value
-
         try:
-            return self.search_table[value]
+            result = self.search_table[value]
         except KeyError:
-            raise ValueError(
-                "Value {value} doesn't match any state.".format(value=value)
-            )
+            if (
+                self.case_insensitive
+                and isinstance(value, str)
+                and self._is_raw_key(value)
+            ):
+                try:
+                    return self.folded_table[value.casefold()]
+                except KeyError:
+                    pass
+            raise self._get_error(value)
+
+        if result is value or type(value) in self.key_types:
+            return result
+        if isinstance(value, Enum):
+            if id(value) in self.member_ids:
+                return result
+        elif self._is_raw_key(value):
+            return result
+        raise self._get_error(value)
+
+    def _is_raw_key(self, value):
+        """Check if value is instance (or subclass instance) of key type."""
+        if isinstance(value, (Enum, bool)):
+            return False
+        return isinstance(value, tuple(self.key_types))
+
+    def _get_error(self, value):
+        text = str(value)
+        if len(text) > self.max_error_value_length:
+            text = text[: self.max_error_value_length] + "..."
 
-    def _check_if_already_proper(self, value):
         if isinstance(value, Enum):
-            if value in self.base_enum:
-                return True
-            raise ValueError(
+            return ValueError(
                 "Given value ('{value}') doesn't belong to states enum.".format(
-                    value=value
+                    value=text
                 )
             )
-        return False
+        return ValueError("Value {value} doesn't match any state.".format(value=text))
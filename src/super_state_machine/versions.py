@@ -0,0 +1,61 @@
+"""Versions of states, for optimistic concurrency."""
+
+import threading
+
+
+class VersionedState(object):
+    """State attribute of machine class, which counts changes of state.
+
+    State and its version are kept in instance. Versions of machines keeping
+    states in backend are kept by backend (see `backends.BackendState`).
+
+    """
+
+    version_attribute_name = "_state_version"
+
+    def __init__(self, name, initial_state):
+        """Init.
+
+        :param str name: Name of state attribute.
+        :param Enum initial_state: State of new machines.
+
+        """
+        self.name = name
+        self.initial_state = initial_state
+        self._lock = threading.Lock()
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self.initial_state
+        return instance.__dict__.get(self.name, self.initial_state)
+
+    def __set__(self, instance, state):
+        with self._lock:
+            self._set(instance, state)
+
+    def _set(self, instance, state):
+        values = instance.__dict__
+        values[self.name] = state
+        values[self.version_attribute_name] = (
+            values.get(self.version_attribute_name, 0) + 1
+        )
+
+    def read_version(self, instance):
+        """Get version of state of instance."""
+        return instance.__dict__.get(self.version_attribute_name, 0)
+
+    def compare_version_and_set_many(self, items):
+        """Set states of instances, if their versions are the expected ones.
+
+        :param list items: 3-tuples of instance, expected version and state.
+        :returns: List of instances, which states were not set.
+
+        """
+        rejected = []
+        with self._lock:
+            for instance, expected_version, state in items:
+                if self.read_version(instance) == expected_version:
+                    self._set(instance, state)
+                else:
+                    rejected.append(instance)
+        return rejected
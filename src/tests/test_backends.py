@@ -0,0 +1,259 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+
+import pytest
+
+from super_state_machine import backends, compile, errors, extras, machines
+
+
+class StatesEnum(Enum):
+    NEW = "new"
+    ACTIVE = "active"
+    CLOSED = "closed"
+
+
+@pytest.fixture(params=["memory", "sqlite", "cached"])
+def backend(request):
+    if request.param == "memory":
+        return backends.MemoryBackend()
+    if request.param == "sqlite":
+        return backends.SQLiteBackend(batch_size=3)
+    return backends.CachedBackend(backends.SQLiteBackend(batch_size=3))
+
+
+def test_backend_operations(backend):
+    assert backend.read("a") is None
+    assert backend.read("a", "x") == "x"
+    backend.write("a", "new")
+    assert backend.read("a") == "new"
+
+    assert backend.compare_and_set("a", "active", "closed") is False
+    assert backend.compare_and_set("a", "new", "active") is True
+    assert backend.read("a") == "active"
+    assert backend.compare_and_set("b", None, "new") is True
+    assert backend.compare_and_set("b", None, "new") is False
+
+    backend.write_many({"c": 1, "d": 2, "e": 3, "f": 4})
+    assert backend.read_many(["a", "c", "f", "missing"]) == {
+        "a": "active",
+        "c": 1,
+        "f": 4,
+    }
+    backend.flush()
+    assert backend.read("e") == 3
+
+
+def test_backend_versions(backend):
+    assert backend.read_version("a") == 0
+    backend.write("a", "new")
+    backend.write("a", "active")
+    assert backend.read_version("a") == 2
+    backend.flush()
+    assert backend.read_version("a") == 2
+
+    assert backend.compare_version_and_set("a", 1, "closed") is False
+    assert backend.compare_version_and_set("a", 2, "closed") is True
+    assert backend.read("a") == "closed"
+    assert backend.compare_and_set("a", "closed", "new") is True
+    assert backend.read_version("a") == 4
+
+    rejected = backend.compare_version_and_set_many(
+        {"a": (4, "active"), "b": (0, "new"), "c": (1, "new")}
+    )
+    assert rejected == ["c"]
+    assert backend.read_many(["a", "b", "c"]) == {"a": "active", "b": "new"}
+
+
+def test_sqlite_backend_pipelines_writes(tmp_path):
+    path = str(tmp_path / "states.db")
+    backend = backends.SQLiteBackend(path, batch_size=3)
+    other = backends.SQLiteBackend(path)
+
+    backend.write("a", "new")
+    backend.write("a", "active")
+    backend.write("b", "new")
+    assert backend.read("a") == "active"
+    assert other.read("a") is None
+
+    backend.write("c", "new")
+    assert other.read_many(["a", "b", "c"]) == {
+        "a": "active",
+        "b": "new",
+        "c": "new",
+    }
+
+    backend.write("d", "new")
+    backend.close()
+    assert other.read("d") == "new"
+
+
+def test_sqlite_backend_checks_table_name():
+    with pytest.raises(ValueError):
+        backends.SQLiteBackend(table="states; DROP TABLE states")
+
+
+def test_cached_backend():
+    inner = backends.MemoryBackend()
+    backend = backends.CachedBackend(inner)
+    inner.write("a", "new")
+    assert backend.read("a") == "new"
+    inner.write("a", "active")
+    assert backend.read("a") == "new"
+    backend.invalidate(["a"])
+    assert backend.read("a") == "active"
+
+    inner.write("a", "closed")
+    assert backend.compare_and_set("a", "active", "new") is False
+    assert backend.read("a") == "closed"
+
+
+def test_cached_backend_concurrent_miss_and_write():
+    reading = threading.Event()
+
+    class SlowBackend(backends.MemoryBackend):
+        def read(self, key, default=None):
+            value = super().read(key, default)
+            reading.set()
+            time.sleep(0.05)
+            return value
+
+    inner = SlowBackend()
+    inner.write("a", "new")
+    backend = backends.CachedBackend(inner)
+
+    def write():
+        reading.wait()
+        backend.write("a", "active")
+
+    with ThreadPoolExecutor(2) as executor:
+        read = executor.submit(backend.read, "a")
+        executor.submit(write).result()
+        read.result()
+
+    assert inner.data["a"] == "active"
+    assert backend.read("a") == "active"
+
+
+def test_cached_backend_concurrent_compare_and_set():
+    inner = backends.MemoryBackend()
+    backend = backends.CachedBackend(inner)
+    inner.write("counter", 0)
+
+    def increment(_):
+        while True:
+            value = backend.read("counter")
+            if backend.compare_and_set("counter", value, value + 1):
+                return
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(increment, range(200)))
+
+    assert inner.data["counter"] == 200
+    assert backend.read("counter") == 200
+
+
+def test_machine_keeps_state_in_backend(backend):
+    states_backend = backend
+
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "new"
+
+        class Meta:
+            transitions = {"new": ["active"], "active": ["closed"]}
+            track_instances = True
+            backend = states_backend
+
+        def __init__(self, id):
+            self.id = id
+
+    first = Machine(1)
+    assert first.is_new is True
+    first.set_active()
+    assert backend.read(1) == "active"
+    assert first in Machine.instances_in("active")
+
+    same = Machine(1)
+    assert same.is_active is True
+    same.set_closed()
+    assert first.state == "closed"
+    with pytest.raises(errors.TransitionError):
+        first.set_new()
+
+    second = Machine(2)
+    assert second.is_new is True
+    assert backend.read(2) is None
+    with extras.transaction() as transaction:
+        transaction.set_(second, "active")
+    assert backend.read(2) == "active"
+
+
+def test_backend_key_and_compilation():
+    backend = backends.MemoryBackend()
+    states_backend = backend
+
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "new"
+
+        class Meta:
+            backend = states_backend
+            backend_key = "name"
+
+        def __init__(self, name):
+            self.name = name
+
+    Machine("x").set_closed()
+    assert backend.data == {"x": "closed"}
+    assert Machine("x").is_closed is True
+
+    with pytest.raises(ValueError):
+        compile.compile_machine(Machine)
+
+
+def test_forks_and_speculation_are_detached_from_backend():
+    backend = backends.MemoryBackend()
+    states_backend = backend
+
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "new"
+
+        class Meta:
+            backend = states_backend
+            versioned = True
+
+        def __init__(self, id):
+            self.id = id
+
+    sm = Machine("a")
+    sm.set_active()
+    assert backend.data == {"a": "active"}
+
+    fork = sm.fork()
+    assert fork.is_active is True
+    assert fork.version == 0
+    fork.set_closed()
+    fork.set_("active", expected_version=1)
+    assert fork.is_active is True
+    assert fork.version == 2
+    assert Machine.fork_many([sm])[0].is_active is True
+    assert backend.data == {"a": "active"}
+    assert backend.read_version("a") == 1
+
+    with sm.speculate():
+        sm.set_closed()
+        assert sm.is_closed is True
+        assert backend.data == {"a": "active"}
+    assert sm.is_active is True
+    assert backend.read_version("a") == 1
+
+    speculation = sm.speculate()
+    with speculation:
+        sm.set_closed()
+        speculation.commit()
+    assert backend.data == {"a": "closed"}
+    assert backend.read_version("a") == 2
+    assert sm.version == 2
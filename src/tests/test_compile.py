@@ -0,0 +1,213 @@
+import importlib.util
+import sys
+from enum import Enum, IntEnum
+
+import pytest
+
+from super_state_machine import compile, errors, machines, timers
+
+
+class Task(machines.StateMachine):
+    class States(Enum):
+        DRAFT = "draft"
+        SCHEDULED = "scheduled"
+        PROCESSING = "processing"
+        SENT = "sent"
+        FAILED = "failed"
+
+    class Meta:
+        initial_state = "draft"
+        aliases = {"D": "draft"}
+        case_insensitive = True
+        transitions = {
+            "draft": ["scheduled", "failed"],
+            "scheduled": ["failed"],
+            "processing": ["sent", "failed"],
+        }
+        named_transitions = [
+            ("process", "processing", ["scheduled"]),
+            ("fail", "failed"),
+        ]
+        named_checkers = [
+            ("can_be_processed", "processing"),
+        ]
+
+    def describe(self):
+        return self.state
+
+
+class Narrowed(Task):
+    class States(Enum):
+        DRAFT = "draft"
+        SCHEDULED = "scheduled"
+        FAILED = "failed"
+
+
+class Timed(machines.StateMachine):
+    class States(Enum):
+        PENDING = "pending"
+        EXPIRED = "expired"
+
+    state = "pending"
+
+    class Meta:
+        timeouts = {"pending": (30, "expired")}
+
+
+def _load(tmp_path, machine, name):
+    path = tmp_path / "{name}.py".format(name=name)
+    path.write_text(compile.compile_machine(machine))
+    spec = importlib.util.spec_from_file_location(name, str(path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_compiled_machine_works_like_original(tmp_path):
+    module = _load(tmp_path, Task, "compiled_task")
+    Compiled = module.Task
+
+    assert not isinstance(Compiled, machines.StateMachineMetaclass)
+    for machine_class in [Task, Compiled]:
+        sm = machine_class()
+        assert sm.state == "draft"
+        assert sm.is_draft is True
+        assert sm.is_("D") is True
+        assert sm.can_be_scheduled is True
+        assert sm.can_be_processed is False
+        with pytest.raises(errors.TransitionError):
+            sm.set_sent()
+        assert sm.try_set_sent() is False
+        assert sm.try_set_("sent") is False
+        with sm.speculate():
+            sm.set_failed()
+        assert sm.is_draft is True
+        assert sm.fork().is_draft is True
+        assert sm.try_set_scheduled() is True
+        sm.process()
+        assert sm.state == "processing"
+        sm.state = "SENT"
+        assert sm.is_sent is True
+        sm.fail()
+        assert sm.actual_state.value == "failed"
+        assert machine_class.can_reach("draft", "sent") is True
+        assert machine_class.path("draft", "failed") == (
+            machine_class.States.DRAFT,
+            machine_class.States.FAILED,
+        )
+
+    assert set(Compiled._meta["generated_methods"]) == set(
+        Task._meta["generated_methods"]
+    )
+    assert "describe" in module.__doc__
+    assert not hasattr(Compiled, "describe")
+
+
+def test_compile_narrowed_machine(tmp_path):
+    module = _load(tmp_path, Narrowed, "compiled_narrowed")
+    sm = module.Narrowed()
+    sm.set_scheduled()
+    with pytest.raises(AttributeError):
+        sm.process
+    with pytest.raises(ValueError):
+        sm.set_("sent")
+
+
+def test_compile_machine_with_integer_states(tmp_path):
+    class Switch(machines.StateMachine):
+        state = 0
+
+        class States(IntEnum):
+            OFF = 0
+            ON = 1
+
+        class Meta:
+            transitions = {0: [1]}
+
+    module = _load(tmp_path, Switch, "compiled_switch")
+    sm = module.Switch()
+    assert sm.state == 0
+    assert sm.try_set_on() is True
+    assert sm.state == 1
+    assert sm.is_on is True
+    with pytest.raises(errors.TransitionError):
+        sm.set_off()
+
+
+def test_compile_machine_with_events(tmp_path):
+    class Document(machines.StateMachine):
+        state = "draft"
+
+        class States(Enum):
+            DRAFT = "draft"
+            PENDING = "pending"
+            APPROVED = "approved"
+
+        class Meta:
+            events = {
+                "submit": [("draft", "pending")],
+                "approve": [("pending", "approved"), ("draft", "approved")],
+            }
+
+    module = _load(tmp_path, Document, "compiled_document")
+    sm = module.Document()
+    sm.send("submit")
+    assert sm.is_pending is True
+    with pytest.raises(errors.TransitionError):
+        sm.send("submit")
+    sm.send("approve")
+    assert sm.is_approved is True
+
+
+def test_compile_timed_machine(tmp_path):
+    module = _load(tmp_path, Timed, "compiled_timed")
+    sm = module.Timed()
+    timer = sm._state_timer
+    assert timer is not None
+    sm.set_expired()
+    assert timer.cancelled is True
+
+
+def test_compile_refuses_custom_timer_wheel():
+    class CustomTimed(machines.StateMachine):
+        class States(Enum):
+            PENDING = "pending"
+            EXPIRED = "expired"
+
+        state = "pending"
+
+        class Meta:
+            timeouts = {"pending": (30, "expired")}
+            timer_wheel = timers.TimerWheel()
+
+    with pytest.raises(ValueError):
+        compile.compile_machine(CustomTimed)
+
+
+def test_command_line_interface(tmp_path, capsys):
+    output = tmp_path / "generated.py"
+    compile.main(["tests.test_compile:Task", "-o", str(output)])
+    assert "class Task(object):" in output.read_text()
+
+    compile.main(["tests.test_compile:Task"])
+    assert capsys.readouterr().out == output.read_text()
+
+    with pytest.raises(ValueError):
+        compile.load_machine("tests.test_compile.Task")
+    assert sys.modules["tests.test_compile"].Task is Task
+
+
+def test_compile_refuses_state_methods():
+    class Door(machines.StateMachine):
+        class States(Enum):
+            OPEN = "open"
+            CLOSED = "closed"
+
+        state = "open"
+
+        @machines.state_method("open")
+        def handle(self):
+            return "come in"
+
+    with pytest.raises(ValueError):
+        compile.compile_machine(Door)
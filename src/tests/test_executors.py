@@ -0,0 +1,172 @@
+import asyncio
+from enum import Enum
+
+import pytest
+
+from super_state_machine import errors, executors, machines
+
+
+class Counter(machines.StateMachine):
+    class States(Enum):
+        EVEN = "even"
+        ODD = "odd"
+
+    class Meta:
+        initial_state = "even"
+        transitions = {"even": ["odd"], "odd": ["even"]}
+        on_change = ["count"]
+
+    def __init__(self):
+        self.seen = []
+
+    def count(self, previous, state):
+        self.seen.append(state.value)
+
+
+def _expected(changes):
+    return ["odd", "even"] * (changes // 2)
+
+
+def test_keyed_executor_keeps_order_of_machine():
+    counters = [Counter() for _ in range(20)]
+    with executors.KeyedExecutor(workers=4, queue_size=10, batch_size=7) as executor:
+        for number in range(100):
+            for counter in counters:
+                executor.submit(counter, "odd" if number % 2 == 0 else "even")
+        executor.join()
+        assert all(counter.seen == _expected(100) for counter in counters)
+    assert executor.errors == []
+
+
+def test_keyed_executor_collects_errors():
+    counter = Counter()
+    executor = executors.KeyedExecutor(workers=2)
+    executor.submit(counter, "even")
+    executor.submit(counter, "odd")
+    executor.shutdown()
+    assert counter.seen == ["odd"]
+    [(machine, item, error)] = executor.errors
+    assert machine is counter
+    assert item == "even"
+    assert isinstance(error, errors.TransitionError)
+
+    failures = []
+    executor = executors.KeyedExecutor(
+        workers=1, on_error=lambda *args: failures.append(args)
+    )
+    executor.submit(counter, "wrong")
+    executor.shutdown()
+    assert len(failures) == 1
+    assert isinstance(failures[0][2], ValueError)
+
+
+def test_keyed_executor_survives_failing_lookup_and_callback():
+    counter = Counter()
+    executor = executors.KeyedExecutor(workers=1, method="missing", queue_size=2)
+    for _ in range(10):
+        executor.submit(counter, "odd")
+    executor.join()
+    assert len(executor.errors) == 10
+    assert all(isinstance(error, AttributeError) for _, _, error in executor.errors)
+
+    executor.method = "set_"
+    executor.on_error = lambda *args: 1 / 0
+    executor.submit(counter, "odd")
+    executor.submit(counter, "odd")
+    executor.submit(counter, "even")
+    executor.shutdown()
+    assert counter.seen == ["odd", "even"]
+    assert isinstance(executor.errors[-1][2], ZeroDivisionError)
+    assert len(executor.errors) == 11
+
+
+def test_keyed_executor_uses_given_method():
+    class Switch(machines.StateMachine):
+        class States(Enum):
+            OFF = "off"
+            ON = "on"
+
+        class Meta:
+            initial_state = "off"
+            events = {"toggle": [("off", "on"), ("on", "off")]}
+
+    switches = [Switch() for _ in range(10)]
+    with executors.KeyedExecutor(workers=3, method="send") as executor:
+        for _ in range(3):
+            for switch in switches:
+                executor.submit(switch, "toggle")
+    assert all(switch.is_on for switch in switches)
+
+
+def test_async_keyed_executor():
+    counters = [Counter() for _ in range(10)]
+
+    async def run():
+        async with executors.AsyncKeyedExecutor(
+            workers=3, queue_size=5, batch_size=4
+        ) as executor:
+            for number in range(50):
+                for counter in counters:
+                    await executor.submit(counter, "odd" if number % 2 == 0 else "even")
+            await executor.join()
+            assert all(counter.seen == _expected(50) for counter in counters)
+        return executor
+
+    executor = asyncio.run(run())
+    assert executor.errors == []
+
+
+def test_keyed_executor_rejects_items_after_shutdown():
+    counter = Counter()
+    executor = executors.KeyedExecutor(workers=2)
+    executor.submit(counter, "odd")
+    executor.shutdown()
+    with pytest.raises(RuntimeError):
+        executor.submit(counter, "even")
+    executor.shutdown()
+    executor.join()
+    assert counter.seen == ["odd"]
+
+
+def test_async_keyed_executor_rejects_items_after_shutdown():
+    counter = Counter()
+
+    async def run():
+        executor = executors.AsyncKeyedExecutor(workers=2)
+        await executor.submit(counter, "odd")
+        await executor.shutdown()
+        with pytest.raises(RuntimeError):
+            await executor.submit(counter, "even")
+        await executor.shutdown()
+        await executor.join()
+
+    asyncio.run(run())
+    assert counter.seen == ["odd"]
+
+
+def test_keyed_executor_dispatches_state_methods_per_item():
+    class Door(machines.StateMachine):
+        class States(Enum):
+            OPEN = "open"
+            CLOSED = "closed"
+
+        state = "open"
+
+        def __init__(self):
+            self.log = []
+
+        @machines.state_method("open")
+        def handle(self, item):
+            self.log.append(("open", item))
+            self.set_closed()
+
+        @handle.state("closed")
+        def handle(self, item):
+            self.log.append(("closed", item))
+
+    door = Door()
+    with executors.KeyedExecutor(workers=1, method="handle") as executor:
+        executor.submit(door, 1)
+        executor.submit(door, 2)
+    assert door.log == [("open", 1), ("closed", 2)]
+    assert executor.errors == []
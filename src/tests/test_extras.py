@@ -1,6 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
 import enum
 
-from super_state_machine import extras, machines
+import pytest
+
+from super_state_machine import errors, extras, machines
 
 
 class Lock(machines.StateMachine):
@@ -35,3 +38,191 @@ def test_property_machine():
     door.lock2.open()
     assert door.lock1 == "open"
     assert door.lock2 == "open"
+
+
+def test_property_machine_with_integer_states():
+    class Switch(machines.StateMachine):
+        class States(enum.IntEnum):
+            OFF = 0
+            ON = 1
+
+        class Meta:
+            initial_state = 0
+
+    class Lamp(object):
+        switch = extras.PropertyMachine(Switch)
+
+    lamp = Lamp()
+    assert lamp.switch == 0
+    assert isinstance(lamp.switch, extras.ProxyInt)
+    lamp.switch.set_on()
+    assert lamp.switch == 1
+    lamp.switch = 0
+    assert lamp.switch.is_off is True
+
+
+class Task(machines.StateMachine):
+    class States(enum.Enum):
+        DRAFT = "draft"
+        SCHEDULED = "scheduled"
+        PROCESSING = "processing"
+        SENT = "sent"
+        FAILED = "failed"
+
+    class Meta:
+        initial_state = "draft"
+        transitions = {
+            "draft": ["scheduled", "failed"],
+            "scheduled": ["processing", "failed"],
+            "processing": ["sent", "failed"],
+        }
+
+
+def test_advance_many():
+    tasks = [Task() for _ in range(3)]
+    tasks[1].set_scheduled()
+    extras.advance_many(tasks, "sent")
+    assert all(task.is_sent for task in tasks)
+
+
+def test_advance_many_advances_repeated_machine_once():
+    changes = []
+
+    class Notified(Task):
+        class Meta:
+            on_change = [lambda machine, previous, state: changes.append(state)]
+
+    task = Notified()
+    extras.advance_many([task, task], "processing")
+    assert task.is_processing is True
+    assert changes == [Notified.States.SCHEDULED, Notified.States.PROCESSING]
+
+
+def test_advance_many_doesnt_change_anything_when_target_is_unreachable():
+    tasks = [Task() for _ in range(3)]
+    tasks[2].set_failed()
+    with pytest.raises(errors.TransitionError):
+        extras.advance_many(tasks, "sent")
+    assert [task.state for task in tasks] == ["draft", "draft", "failed"]
+
+
+class Order(machines.StateMachine):
+    class States(enum.Enum):
+        NEW = "new"
+        PAID = "paid"
+        SHIPPED = "shipped"
+
+    class Meta:
+        initial_state = "new"
+        transitions = {
+            "new": ["paid"],
+            "paid": ["shipped"],
+        }
+        track_instances = True
+
+
+def test_transaction():
+    order = Order()
+    task = Task()
+    with extras.transaction() as transaction:
+        transaction.set_(order, "paid")
+        transaction.set_(order, "shipped")
+        transaction.set_(task, "scheduled")
+        assert order.is_new is True
+    assert order.is_shipped is True
+    assert task.is_scheduled is True
+    assert order in Order.instances_in("shipped")
+    assert order not in Order.instances_in("paid")
+
+
+def test_transaction_changes_nothing_when_any_transition_is_wrong():
+    order = Order()
+    task = Task()
+    with pytest.raises(errors.TransitionError):
+        with extras.transaction() as transaction:
+            transaction.set_(task, "scheduled")
+            transaction.set_(order, "shipped")
+    assert task.is_draft is True
+    assert order.is_new is True
+
+    with pytest.raises(ValueError):
+        with extras.transaction() as transaction:
+            transaction.set_(task, "scheduled")
+            transaction.set_(order, "wrong")
+    assert task.is_draft is True
+
+
+def test_transaction_notifies_listeners_once():
+    changes = []
+
+    def remember(machine, previous, state):
+        changes.append((previous, state))
+
+    class Notified(Order):
+        class Meta:
+            on_change = [remember]
+
+    order = Notified()
+    with extras.transaction() as transaction:
+        transaction.set_(order, "paid")
+        transaction.set_(order, "shipped")
+    assert changes == [(Notified.States.NEW, Notified.States.SHIPPED)]
+
+
+class Approval(machines.StateMachine):
+    class States(enum.Enum):
+        PENDING = "pending"
+        APPROVED = "approved"
+        REJECTED = "rejected"
+
+    class Meta:
+        initial_state = "pending"
+        events = {
+            "approve": [("pending", "approved")],
+            "reject": [("pending", "rejected"), ("approved", "rejected")],
+        }
+
+
+def test_send_many():
+    approvals = [Approval(), Approval(), Approval()]
+    approvals[2].send("approve")
+    extras.send_many(approvals, ["approve", "reject", "reject"])
+    assert [item.state for item in approvals] == ["approved", "rejected", "rejected"]
+
+    with pytest.raises(errors.TransitionError):
+        extras.send_many(approvals, ["reject", "approve", "reject"])
+    assert [item.state for item in approvals] == ["approved", "rejected", "rejected"]
+
+
+def test_send_many_resolves_events_of_machine_one_after_another():
+    approval = Approval()
+    with pytest.raises(errors.TransitionError):
+        extras.send_many([approval, approval], ["approve", "approve"])
+    assert approval.is_pending is True
+
+    extras.send_many([approval, approval], ["approve", "reject"])
+    assert approval.is_rejected is True
+
+
+def test_send_many_requires_event_for_every_machine():
+    approvals = [Approval(), Approval()]
+    with pytest.raises(ValueError):
+        extras.send_many(approvals, ["approve"])
+    assert [item.state for item in approvals] == ["pending", "pending"]
+
+
+def test_property_machine_concurrent_first_access():
+    class Door(object):
+        lock = extras.PropertyMachine(Lock)
+
+    door = Door()
+    descriptor = Door.__dict__["lock"]
+
+    def access(_):
+        door.lock
+        return descriptor.memory[door]
+
+    with ThreadPoolExecutor(8) as executor:
+        machines_seen = set(map(id, executor.map(access, range(100))))
+
+    assert len(machines_seen) == 1
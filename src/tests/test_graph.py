@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+
+from super_state_machine import graph
+
+
+class StatesEnum(Enum):
+    ONE = "one"
+    TWO = "two"
+    THREE = "three"
+    FOUR = "four"
+
+
+def _get_graph(complete=False):
+    transitions = {
+        StatesEnum.ONE: {StatesEnum.TWO},
+        StatesEnum.TWO: {StatesEnum.THREE, StatesEnum.ONE},
+        StatesEnum.THREE: {StatesEnum.ONE},
+        StatesEnum.FOUR: set(),
+    }
+    return graph.TransitionGraph(tuple(StatesEnum), transitions, complete)
+
+
+def test_reachability():
+    g = _get_graph()
+    assert g.can_reach(StatesEnum.ONE, StatesEnum.THREE) is True
+    assert g.can_reach(StatesEnum.THREE, StatesEnum.TWO) is True
+    assert g.can_reach(StatesEnum.ONE, StatesEnum.FOUR) is False
+    assert g.can_reach(StatesEnum.FOUR, StatesEnum.ONE) is False
+    assert g.can_reach(StatesEnum.FOUR, StatesEnum.FOUR) is True
+
+
+def test_reachability_bitsets():
+    g = _get_graph()
+    assert g.reachability == [0b0111, 0b0111, 0b0111, 0b1000]
+
+
+def test_shortest_path():
+    g = _get_graph()
+    assert g.path(StatesEnum.ONE, StatesEnum.THREE) == (
+        StatesEnum.ONE,
+        StatesEnum.TWO,
+        StatesEnum.THREE,
+    )
+    assert g.path(StatesEnum.THREE, StatesEnum.ONE) == (
+        StatesEnum.THREE,
+        StatesEnum.ONE,
+    )
+    assert g.path(StatesEnum.TWO, StatesEnum.TWO) == (StatesEnum.TWO,)
+    assert g.path(StatesEnum.ONE, StatesEnum.FOUR) is None
+
+
+def test_complete_graph():
+    g = _get_graph(complete=True)
+    assert g.can_reach(StatesEnum.FOUR, StatesEnum.ONE) is True
+    assert g.path(StatesEnum.FOUR, StatesEnum.TWO) == (
+        StatesEnum.FOUR,
+        StatesEnum.TWO,
+    )
+
+
+def test_tables_are_built_lazily():
+    g = _get_graph()
+    assert g._reachability is None
+    assert g._next_hops is None
+    g.can_reach(StatesEnum.ONE, StatesEnum.TWO)
+    assert g._reachability is not None
+    assert g._next_hops is not None
+
+
+def test_paths_are_cached():
+    g = _get_graph()
+    path = g.path(StatesEnum.ONE, StatesEnum.THREE)
+    assert g.path(StatesEnum.ONE, StatesEnum.THREE) is path
+    assert g.path(StatesEnum.ONE, StatesEnum.FOUR) is None
+    assert (StatesEnum.ONE, StatesEnum.FOUR) in g._paths
+
+
+def test_concurrent_queries():
+    machine_graph = _get_graph()
+
+    def query(_):
+        return (
+            machine_graph.can_reach(StatesEnum.ONE, StatesEnum.THREE),
+            machine_graph.path(StatesEnum.THREE, StatesEnum.TWO),
+        )
+
+    with ThreadPoolExecutor(8) as executor:
+        results = set(executor.map(query, range(100)))
+
+    assert results == set([(True, (StatesEnum.THREE, StatesEnum.ONE, StatesEnum.TWO))])
@@ -0,0 +1,198 @@
+import sys
+from enum import Enum
+
+import pytest
+
+from super_state_machine import errors, extras, machines
+
+
+class StatesEnum(Enum):
+    ONE = "one"
+    TWO = "two"
+    THREE = "three"
+
+
+changes = []
+
+
+def remember(machine, previous, state):
+    changes.append((previous, state))
+
+
+def test_hooks_are_called_after_change():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+        class Meta:
+            on_change = [remember, "log"]
+
+        def __init__(self):
+            self.log_entries = []
+
+        def log(self, previous, state):
+            self.log_entries.append(self.state)
+
+    del changes[:]
+    sm = Machine()
+    sm.set_two()
+    sm.force_set("three")
+    assert changes == [
+        (StatesEnum.ONE, StatesEnum.TWO),
+        (StatesEnum.TWO, StatesEnum.THREE),
+    ]
+    assert sm.log_entries == ["two", "three"]
+
+
+def _make_chain(run_to_completion):
+    class Chain(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+        class Meta:
+            on_change = ["step"]
+
+        Meta.run_to_completion = run_to_completion
+
+        def __init__(self, steps):
+            self.steps = steps
+            self.order = []
+
+        def step(self, previous, state):
+            self.order.append(state.value)
+            if self.steps:
+                self.steps -= 1
+                self.set_("two" if state is StatesEnum.ONE else "one")
+                self.order.append("after " + state.value)
+
+    return Chain
+
+
+def test_nested_changes_are_run_to_completion():
+    Chain = _make_chain(True)
+    sm = Chain(steps=3)
+    sm.set_two()
+    assert sm.order == [
+        "two",
+        "after two",
+        "one",
+        "after one",
+        "two",
+        "after two",
+        "one",
+    ]
+    assert sm.is_one is True
+
+    sm = Chain(steps=sys.getrecursionlimit() * 2)
+    sm.set_two()
+    assert sm.steps == 0
+
+
+def test_nested_changes_recurse_without_run_to_completion():
+    Chain = _make_chain(False)
+    sm = Chain(steps=2)
+    sm.set_two()
+    assert sm.order == ["two", "one", "two", "after one", "after two"]
+
+
+def test_queued_changes_are_dropped_when_hook_fails():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+        class Meta:
+            on_change = ["step"]
+            run_to_completion = True
+
+        def step(self, previous, state):
+            if state is StatesEnum.TWO:
+                self.set_three()
+                raise RuntimeError
+
+    sm = Machine()
+    with pytest.raises(RuntimeError):
+        sm.set_two()
+    assert sm.is_two is True
+    sm.set_three()
+    assert sm.is_three is True
+
+
+def _make_branching(hook):
+    class Branching(machines.StateMachine):
+        class States(Enum):
+            A = "a"
+            B = "b"
+            C = "c"
+            D = "d"
+
+        state = "a"
+
+        class Meta:
+            transitions = {"a": ["b"], "b": ["c", "d"], "c": ["a"]}
+            on_change = ["step"]
+            run_to_completion = True
+
+        def __init__(self):
+            self.results = []
+
+        def step(self, previous, state):
+            if state.value == "b":
+                hook(self)
+
+    return Branching
+
+
+def test_queued_transitions_are_checked_when_taken_from_queue():
+    def hook(sm):
+        sm.set_c()
+        sm.set_d()
+
+    sm = _make_branching(hook)()
+    with pytest.raises(errors.TransitionError):
+        sm.set_b()
+    assert sm.state == "c"
+
+
+def test_queued_try_set_is_checked_from_state_after_queued_changes():
+    def hook(sm):
+        sm.results.append(sm.try_set_("c"))
+        sm.results.append(sm.try_set_("d"))
+        sm.results.append(sm.try_set_("a"))
+
+    sm = _make_branching(hook)()
+    sm.set_b()
+    assert sm.results == [True, False, True]
+    assert sm.state == "a"
+
+
+def test_transactions_and_versioned_changes_are_run_to_completion():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+        class Meta:
+            on_change = ["step"]
+            run_to_completion = True
+            versioned = True
+
+        def __init__(self):
+            self.order = []
+
+        def step(self, previous, state):
+            self.order.append("enter " + state.value)
+            if state is StatesEnum.TWO:
+                self.set_three()
+            self.order.append("exit " + state.value)
+
+    expected = ["enter two", "exit two", "enter three", "exit three"]
+
+    sm = Machine()
+    with extras.transaction() as transaction:
+        transaction.set_(sm, "two")
+    assert sm.order == expected
+    assert sm.is_three is True
+
+    sm = Machine()
+    sm.set_("two", expected_version=0)
+    assert sm.order == expected
+    assert sm.is_three is True
@@ -0,0 +1,245 @@
+import pytest
+from enum import Enum
+
+from super_state_machine import errors, machines, timers
+
+
+class StatesEnum(Enum):
+    ONE = "one"
+    TWO = "two"
+    THREE = "three"
+    FOUR = "four"
+
+
+class NarrowEnum(Enum):
+    ONE = "one"
+    TWO = "two"
+    THREE = "three"
+
+
+class Machine(machines.StateMachine):
+    States = StatesEnum
+    state = "one"
+
+    class Meta:
+        transitions = {
+            "one": ["two"],
+            "two": ["three"],
+            "three": ["four"],
+        }
+        named_transitions = [
+            ("finish", "four", ["two"]),
+        ]
+        named_checkers = [
+            ("can_finish", "four"),
+        ]
+
+
+def test_subclass_works_like_parent():
+    class Child(Machine):
+        pass
+
+    sm = Child()
+    assert sm.is_one is True
+    sm.set_two()
+    assert sm.can_finish is True
+    sm.finish()
+    assert sm.state == "four"
+    with pytest.raises(errors.TransitionError):
+        sm.set_one()
+
+
+def test_subclass_shares_compiled_tables():
+    class Child(Machine):
+        pass
+
+    assert Child._meta is not Machine._meta
+    assert Child._meta["translator"] is Machine._meta["translator"]
+    for state, targets in Child._meta["transitions"].items():
+        assert targets is Machine._meta["transitions"][state]
+    assert Child._meta["complete"] is False
+
+
+def test_subclass_adds_transitions():
+    class Child(Machine):
+        class Meta:
+            transitions = {
+                "four": ["one"],
+            }
+            named_transitions = [
+                ("restart", "one", ["three"]),
+            ]
+
+    sm = Child()
+    sm.advance_to("four")
+    sm.set_one()
+    sm.advance_to("three")
+    sm.restart()
+    assert sm.is_one is True
+
+    transitions = Child._meta["transitions"]
+    parent_transitions = Machine._meta["transitions"]
+    assert transitions[StatesEnum.FOUR] == {StatesEnum.ONE}
+    assert transitions[StatesEnum.THREE] == {StatesEnum.FOUR, StatesEnum.ONE}
+    assert transitions[StatesEnum.TWO] is parent_transitions[StatesEnum.TWO]
+    assert parent_transitions[StatesEnum.FOUR] == set()
+    assert parent_transitions[StatesEnum.THREE] == {StatesEnum.FOUR}
+    assert not hasattr(Machine, "restart")
+
+
+def test_subclass_inherits_config():
+    class Parent(machines.StateMachine):
+        States = StatesEnum
+
+        class Meta:
+            initial_state = "two"
+            aliases = {"2": "two"}
+
+    class Child(Parent):
+        pass
+
+    class OtherChild(Parent):
+        state = "three"
+
+    sm = Child()
+    assert sm.is_two is True
+    sm.set_("2")
+    assert OtherChild().is_three is True
+    assert Child._meta["complete"] is True
+
+
+def test_subclass_can_change_translation():
+    class Child(Machine):
+        class Meta:
+            aliases = {"I": "one"}
+            case_insensitive = True
+
+    sm = Child()
+    assert sm.is_("I") is True
+    assert sm.is_("ONE") is True
+    assert Machine._meta["translator"].case_insensitive is False
+
+
+def test_subclass_can_narrow_states():
+    class Child(Machine):
+        States = NarrowEnum
+
+        class Meta:
+            aliases = {"III": "three"}
+
+    sm = Child()
+    assert sm.actual_state is NarrowEnum.ONE
+    sm.set_two()
+    assert sm.is_(StatesEnum.TWO) is True
+    assert sm.is_two is True
+    sm.set_("III")
+    assert sm.actual_state is NarrowEnum.THREE
+    assert sm.can_be_("one") is False
+
+    assert not hasattr(sm, "is_four")
+    assert not hasattr(sm, "set_four")
+    with pytest.raises(AttributeError):
+        sm.can_be_four
+    with pytest.raises(ValueError):
+        sm.set_("four")
+    assert Child._meta["transitions"][NarrowEnum.THREE] == set()
+    assert Child._meta["transitions"][NarrowEnum.TWO] == {NarrowEnum.THREE}
+
+
+def test_subclass_cant_add_states():
+    class BiggerEnum(Enum):
+        ONE = "one"
+        FIVE = "five"
+
+    with pytest.raises(ValueError):
+
+        class Child(Machine):
+            States = BiggerEnum
+
+
+def test_subclass_cant_override_generated_methods():
+    with pytest.raises(ValueError):
+
+        class Child(Machine):
+            def set_one(self):
+                pass
+
+    with pytest.raises(ValueError):
+
+        class OtherChild(Machine):
+            class Meta:
+                named_transitions = [
+                    ("finish", "one"),
+                ]
+
+    with pytest.raises(ValueError):
+
+        class AnotherChild(Machine):
+            class Meta:
+                named_checkers = [
+                    ("is_one", "one"),
+                ]
+
+
+def test_subclass_adds_timeouts():
+    clock_time = [0]
+    wheel = timers.TimerWheel(resolution=1, clock=lambda: clock_time[0])
+
+    class Child(Machine):
+        class Meta:
+            timeouts = {"two": (10, "four")}
+            timer_wheel = wheel
+
+    sm = Child()
+    parent_sm = Machine()
+    assert Machine._meta["listeners"] == ()
+    assert Child._meta["transitions"][StatesEnum.TWO] == {
+        StatesEnum.THREE,
+        StatesEnum.FOUR,
+    }
+    sm.set_two()
+    parent_sm.set_two()
+    clock_time[0] = 10
+    wheel.advance()
+    assert sm.is_four is True
+    assert parent_sm.is_two is True
+
+
+def test_machine_cant_extend_two_machines():
+    class Other(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+    with pytest.raises(ValueError):
+
+        class Child(Machine, Other):
+            pass
+
+
+def test_subclass_of_subclass():
+    class Child(Machine):
+        States = NarrowEnum
+
+    class GrandChild(Child):
+        class Meta:
+            transitions = {"three": ["one"]}
+
+    class Diamond(GrandChild, Child):
+        pass
+
+    sm = Diamond()
+    sm.advance_to("three")
+    sm.set_one()
+    assert sm.actual_state is NarrowEnum.ONE
+    assert sm.is_(StatesEnum.ONE) is True
+    assert not hasattr(sm, "is_four")
+
+
+def test_narrowing_blocks_named_methods_of_removed_states():
+    class Child(Machine):
+        States = NarrowEnum
+
+    sm = Child()
+    assert not hasattr(sm, "finish")
+    assert not hasattr(sm, "can_finish")
+    assert Child._meta["method_states"]["set_two"] == ("setter", NarrowEnum.TWO)
@@ -1,7 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 import pytest
-from enum import Enum
+from enum import Enum, IntEnum
 
-from super_state_machine import machines
+from super_state_machine import errors, machines
 
 
 class StatesEnum(Enum):
@@ -352,7 +353,7 @@ def test_initial_state_is_required():
                 pass
 
 
-def test_state_machine_allows_only_strings():
+def test_state_machine_doesnt_allow_mixed_values():
     with pytest.raises(ValueError):
 
         class Machine(machines.StateMachine):
@@ -360,3 +361,391 @@ def test_state_machine_allows_only_strings():
                 ONE = 1
                 TWO = "two"
                 THREE = "three"
+
+
+def test_state_machine_allows_only_strings_and_integers():
+    with pytest.raises(ValueError):
+
+        class Machine(machines.StateMachine):
+            class States(Enum):
+                ONE = 1.0
+                TWO = 2.0
+
+    with pytest.raises(ValueError):
+
+        class OtherMachine(machines.StateMachine):
+            class States(Enum):
+                YES = True
+                NO = False
+
+
+def test_integer_states():
+    class Machine(machines.StateMachine):
+        state = 0
+
+        class States(IntEnum):
+            NEW = 0
+            ACTIVE = 1
+            CLOSED = 2
+
+        class Meta:
+            transitions = {
+                0: [1],
+                1: [2],
+            }
+            named_transitions = [("close", 2)]
+
+    sm = Machine()
+    assert sm.state == 0
+    assert type(sm.state) is int
+    assert sm.is_new is True
+    assert sm.can_be_active is True
+    assert sm.can_be_(2) is True
+    assert sm.is_(Machine.States.NEW) is True
+
+    sm.set_active()
+    assert sm.state == 1
+    sm.state = 2
+    assert sm.is_closed is True
+    assert sm.actual_state is Machine.States.CLOSED
+    with pytest.raises(ValueError):
+        sm.set_(3)
+
+
+def test_integer_states_in_plain_enum():
+    class Machine(machines.StateMachine):
+        class States(Enum):
+            DRAFT = 10
+            SENT = 20
+
+        class Meta:
+            initial_state = 10
+            translate_names = True
+
+    sm = Machine()
+    assert sm.state == 10
+    sm.set_("SENT")
+    assert sm.is_sent is True
+    assert sm.state == 20
+
+
+def test_aliases_and_names():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "ONE"
+
+        class Meta:
+            aliases = {"1": "one", "2": "two"}
+            translate_names = True
+            case_insensitive = True
+
+    sm = Machine()
+    assert sm.is_one is True
+    sm.set_("2")
+    assert sm.state == "two"
+    sm.set_("Three")
+    assert sm.is_("THREE") is True
+    assert sm.can_be_("1") is True
+
+
+def test_aliases_must_be_unambiguous():
+    with pytest.raises(ValueError):
+
+        class Machine(machines.StateMachine):
+            States = StatesEnum
+            state = "one"
+
+            class Meta:
+                aliases = {"two": "one"}
+
+
+def test_fork():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+        class Meta:
+            transitions = {"one": ["two"], "two": ["three"]}
+
+        def __init__(self):
+            self.payload = []
+
+    sm = Machine()
+    sm.set_two()
+    fork = sm.fork()
+    assert type(fork) is Machine
+    assert fork.is_two is True
+    assert not hasattr(fork, "payload")
+
+    fork.set_three()
+    assert fork.is_three is True
+    assert sm.is_two is True
+
+    forks = Machine.fork_many([sm, fork])
+    assert [item.state for item in forks] == ["two", "three"]
+    assert forks[0] is not sm
+
+
+def test_speculate():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+        class Meta:
+            transitions = {"one": ["two"], "two": ["three"]}
+            track_instances = True
+
+    sm = Machine()
+    with sm.speculate() as machine:
+        assert machine is sm
+        sm.set_two()
+        sm.set_three()
+        assert sm.is_three is True
+        assert sm not in Machine.instances_in("three")
+    assert sm.is_one is True
+    assert sm in Machine.instances_in("one")
+
+    with pytest.raises(RuntimeError):
+        with sm.speculate():
+            sm.set_two()
+            raise RuntimeError
+    assert sm.is_one is True
+
+    speculation = sm.speculate()
+    with speculation:
+        sm.set_two()
+        speculation.rollback()
+        assert sm.is_one is True
+        sm.set_two()
+        speculation.commit()
+        sm.set_three()
+        assert sm in Machine.instances_in("one")
+    assert sm.is_two is True
+    assert sm in Machine.instances_in("two")
+
+
+def test_speculate_has_no_side_effects():
+    changes = []
+
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+        class Meta:
+            transitions = {"one": ["two"], "two": ["three"]}
+            versioned = True
+            track_dirty = True
+            history = 5
+            on_change = [lambda machine, previous, state: changes.append(state)]
+
+    sm = Machine()
+    Machine.clear_dirty()
+    version = sm.version
+    with sm.speculate():
+        sm.set_two()
+        sm.try_set_three()
+        assert sm.is_three is True
+        assert sm.version == version
+    assert sm.is_one is True
+    assert sm.version == version
+    assert Machine.collect_dirty() == []
+    assert sm.history() == []
+    assert changes == []
+
+    sm.set_("two", expected_version=version)
+    with sm.speculate() as machine:
+        machine.set_three()
+        with machine.speculate() as nested:
+            nested.force_set("one")
+        assert machine.is_three is True
+    assert sm.is_two is True
+    assert sm.version == version + 1
+    assert changes == [StatesEnum.TWO]
+
+    speculation = sm.speculate()
+    with speculation:
+        sm.set_three()
+        speculation.commit()
+    assert sm.is_three is True
+    assert sm.version == version + 2
+    assert [entry[:2] for entry in sm.history()] == [
+        (StatesEnum.ONE, StatesEnum.TWO),
+        (StatesEnum.TWO, StatesEnum.THREE),
+    ]
+    assert changes == [StatesEnum.TWO, StatesEnum.THREE]
+
+
+def test_state_methods():
+    class Door(machines.StateMachine):
+        state = "one"
+        States = StatesEnum
+
+        @machines.state_method("one")
+        def handle(self, value):
+            return "one: " + value
+
+        @handle.state("two", StatesEnum.THREE)
+        def handle(self, value):
+            return "two or three: " + value
+
+        @machines.state_method("one")
+        def greet(self):
+            return "hello"
+
+    door = Door()
+    assert door.handle("x") == "one: x"
+    door.set_two()
+    assert door.handle("y") == "two or three: y"
+    door.set_three()
+    assert door.handle("z") == "two or three: z"
+    with pytest.raises(errors.TransitionError):
+        door.greet()
+    assert set(Door.handle.table) == set(StatesEnum)
+
+
+def test_state_methods_fallback_and_inheritance():
+    class Door(machines.StateMachine):
+        state = "one"
+        States = StatesEnum
+
+        @machines.state_method("one")
+        def handle(self):
+            return "one"
+
+        @handle.state()
+        def handle(self):
+            return "other"
+
+    class Child(Door):
+        @machines.state_method("two")
+        def handle(self):
+            return "two"
+
+    class Narrowed(Door):
+        class States(Enum):
+            ONE = "one"
+            TWO = "two"
+
+    door = Door()
+    door.set_two()
+    assert door.handle() == "other"
+
+    child = Child()
+    assert child.handle() == "one"
+    child.set_two()
+    assert child.handle() == "two"
+    child.set_three()
+    assert child.handle() == "other"
+
+    narrowed = Narrowed()
+    assert narrowed.handle() == "one"
+
+
+def test_state_methods_are_dispatched_when_called():
+    class Door(machines.StateMachine):
+        state = "one"
+        States = StatesEnum
+
+        def __init__(self):
+            self.log = []
+
+        @machines.state_method("one")
+        def handle(self, value):
+            self.log.append(("one", value))
+            self.set_two()
+
+        @handle.state("two")
+        def handle(self, value):
+            self.log.append(("two", value))
+
+        @machines.state_method("three")
+        def close(self):
+            pass
+
+    door = Door()
+    handle = door.handle
+    handle(1)
+    handle(2)
+    assert door.log == [("one", 1), ("two", 2)]
+
+    assert hasattr(door, "close") is True
+    close = getattr(door, "close", None)
+    with pytest.raises(errors.TransitionError):
+        close()
+
+
+def test_state_methods_are_replaced_by_plain_methods():
+    class Door(machines.StateMachine):
+        state = "one"
+        States = StatesEnum
+
+        @machines.state_method("one")
+        def handle(self):
+            return "one"
+
+    class Child(Door):
+        def handle(self):
+            return "child"
+
+    class GrandChild(Child):
+        pass
+
+    assert Child().handle() == "child"
+    assert GrandChild().handle() == "child"
+    assert "handle" not in Child._meta["state_methods"]
+
+
+def test_state_methods_must_be_extended():
+    with pytest.raises(ValueError):
+
+        class Door(machines.StateMachine):
+            state = "one"
+            States = StatesEnum
+
+            @machines.state_method("one")
+            def handle(self):
+                pass
+
+            @machines.state_method("two")
+            def handle(self):  # noqa: F811
+                pass
+
+
+def test_state_methods_cant_have_many_implementations_for_state():
+    with pytest.raises(ValueError):
+
+        class Door(machines.StateMachine):
+            state = "one"
+            States = StatesEnum
+
+            @machines.state_method("one", "two")
+            def handle(self):
+                pass
+
+            @handle.state("two")
+            def handle(self):
+                pass
+
+
+def test_classes_can_be_built_concurrently():
+    def build(number):
+        target = "three" if number % 2 else "two"
+
+        class Machine(machines.StateMachine):
+            state = "one"
+            States = StatesEnum
+
+            class Meta:
+                transitions = {"one": [target]}
+                named_transitions = [("finish", target)]
+
+        machine = Machine()
+        machine.finish()
+        return target, machine.state, machine.is_("one")
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(build, range(200)))
+
+    for target, state, checker in results:
+        assert state == target
+        assert checker is False
@@ -0,0 +1,78 @@
+import threading
+from enum import Enum
+
+import pytest
+
+from super_state_machine import machines, metrics
+
+
+class StatesEnum(Enum):
+    NEW = "new"
+    PROCESSING = "processing"
+    DONE = "done"
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_dwell_times():
+    clock = Clock()
+    recorder = metrics.DwellTimes(tuple(StatesEnum), (1, 10), clock)
+
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "new"
+
+    first, second = Machine(), Machine()
+    recorder.on_create(first)
+    recorder.on_create(second)
+    clock.now = 0.5
+    recorder.on_change(first, StatesEnum.NEW, StatesEnum.PROCESSING)
+    clock.now = 5
+    recorder.on_change(first, StatesEnum.PROCESSING, StatesEnum.DONE)
+    clock.now = 20
+    recorder.on_change(second, StatesEnum.NEW, StatesEnum.DONE)
+
+    snapshot = recorder.snapshot()
+    assert snapshot[StatesEnum.NEW].counts == [1, 0, 1]
+    assert snapshot[StatesEnum.NEW].total == 20.5
+    assert snapshot[StatesEnum.PROCESSING].counts == [0, 1, 0]
+    assert snapshot[StatesEnum.PROCESSING].count == 1
+    assert snapshot[StatesEnum.DONE].count == 0
+
+
+def test_dwell_times_of_machine_class():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "new"
+
+        class Meta:
+            track_dwell_times = True
+            dwell_time_buckets = (60,)
+
+    def work():
+        machine = Machine()
+        for _ in range(100):
+            machine.set_processing()
+            machine.set_new()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    histograms = Machine.dwell_times()
+    assert histograms[StatesEnum.NEW].count == 400
+    assert histograms[StatesEnum.PROCESSING].counts == [400, 0]
+    assert histograms[StatesEnum.DONE].bounds == (60,)
+
+
+def test_buckets_must_be_ascending():
+    with pytest.raises(ValueError):
+        metrics.DwellTimes(tuple(StatesEnum), (10, 1))
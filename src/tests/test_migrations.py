@@ -0,0 +1,144 @@
+import mmap
+from array import array
+from enum import Enum
+
+import pytest
+
+from super_state_machine import machines, migrations
+
+
+class OldStates(Enum):
+    DRAFT = "draft"
+    NEW = "new"
+    SENT = "sent"
+    BROKEN = "broken"
+    LOST = "lost"
+
+
+class NewStates(Enum):
+    DRAFT = "draft"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class NewMachine(machines.StateMachine):
+    States = NewStates
+    state = "draft"
+
+    class Meta:
+        aliases = {"error": "failed"}
+
+
+def _get_migration():
+    return migrations.StateMigration(
+        OldStates, NewMachine, {"new": "draft", OldStates.BROKEN: "error"}
+    )
+
+
+def test_mapping():
+    migration = _get_migration()
+    assert migration.translate("draft") is NewStates.DRAFT
+    assert migration.translate("new") is NewStates.DRAFT
+    assert migration.translate("broken") is NewStates.FAILED
+    assert migration.translate("lost") is None
+    assert migration.unmapped == (OldStates.LOST,)
+
+
+def test_mapping_is_validated():
+    with pytest.raises(ValueError):
+        migrations.StateMigration(OldStates, NewStates, {"missing": "draft"})
+    with pytest.raises(ValueError):
+        migrations.StateMigration(OldStates, NewStates, {"new": "missing"})
+    with pytest.raises(ValueError):
+        migrations.StateMigration(OldStates, object)
+
+
+def test_without_keeping_same_values():
+    migration = migrations.StateMigration(
+        OldStates, NewStates, {"new": "draft"}, keep_same=False
+    )
+    assert migration.translate("draft") is None
+    assert migration.translate("new") is NewStates.DRAFT
+
+
+def test_migrate_values():
+    migration = _get_migration()
+    result, report = migration.migrate_values(
+        ["draft", "new", "lost", "sent", "bogus", "broken", "lost"]
+    )
+    assert result == ["draft", "draft", None, "sent", None, "failed", None]
+    assert report.total == 7
+    assert report.unmapped == {"lost": 2, "bogus": 1}
+    assert report.ok is False
+
+
+def test_code_table():
+    migration = _get_migration()
+    assert migration.code_table() == [0, 0, 1, 2, -1]
+    assert migration.code_table(9) == [0, 0, 1, 2, 9]
+    with pytest.raises(ValueError):
+        migration.code_table(2)
+
+
+def test_migrate_bytes():
+    migration = _get_migration()
+    codes = bytearray([0, 1, 2, 3, 4, 1, 7])
+    report = migration.migrate_codes(codes)
+    assert codes == bytearray([0, 0, 1, 2, 255, 0, 255])
+    assert report.total == 7
+    assert report.unmapped == {4: 1, 7: 1}
+
+
+def test_migrate_bytes_in_chunks(monkeypatch):
+    monkeypatch.setattr(migrations, "CHUNK_SIZE", 4)
+    migration = _get_migration()
+    codes = bytearray([0, 1, 2, 3] * 5)
+    view = memoryview(codes)
+    report = migration.migrate_codes(view)
+    assert codes == bytearray([0, 0, 1, 2] * 5)
+    assert report.ok is True
+    assert report.total == 20
+
+
+def test_migrate_memory_mapped_store(tmp_path):
+    path = tmp_path / "states.bin"
+    path.write_bytes(bytes([1, 2, 4, 3]))
+    migration = _get_migration()
+    with open(str(path), "r+b") as store:
+        mapped = mmap.mmap(store.fileno(), 0)
+        report = migration.migrate_codes(mapped)
+        mapped.flush()
+        mapped.close()
+    assert path.read_bytes() == bytes([0, 1, 255, 2])
+    assert report.unmapped == {4: 1}
+
+
+def test_migrate_arrays_and_lists():
+    migration = _get_migration()
+    codes = array("H", [0, 1, 4, 3])
+    report = migration.migrate_codes(codes)
+    assert codes.tolist() == [0, 0, 65535, 2]
+    assert report.unmapped == {4: 1}
+
+    codes = array("i", [2, 4])
+    migration.migrate_codes(codes)
+    assert codes.tolist() == [1, -1]
+
+    codes = [1, 3, 10]
+    report = migration.migrate_codes(codes, unmapped_code=100)
+    assert codes == [0, 2, 100]
+    assert report.unmapped == {10: 1}
+
+
+def test_migrate_numpy_arrays():
+    numpy = pytest.importorskip("numpy")
+    migration = _get_migration()
+    codes = numpy.array([0, 1, 2, 3, 4, 9], dtype=numpy.uint8)
+    report = migration.migrate_codes(codes)
+    assert codes.tolist() == [0, 0, 1, 2, 255, 255]
+    assert report.unmapped == {4: 1, 9: 1}
+
+    codes = numpy.array([1, -3, 4], dtype=numpy.int32)
+    report = migration.migrate_codes(codes)
+    assert codes.tolist() == [0, -1, -1]
+    assert report.unmapped == {-3: 1, 4: 1}
@@ -0,0 +1,107 @@
+from enum import Enum
+
+import pytest
+
+from super_state_machine import machines
+
+numpy = pytest.importorskip("numpy")
+simulation = pytest.importorskip("super_state_machine.simulation")
+
+
+class Order(machines.StateMachine):
+    state = "new"
+
+    class States(Enum):
+        NEW = "new"
+        PAID = "paid"
+        SHIPPED = "shipped"
+        CANCELLED = "cancelled"
+
+    class Meta:
+        transitions = {
+            "new": ["paid", "cancelled"],
+            "paid": ["shipped", "cancelled"],
+        }
+
+
+def test_transition_matrix():
+    matrix = simulation.transition_matrix(
+        Order,
+        {
+            ("new", "paid"): 0.5,
+            (Order.States.NEW, "cancelled"): 0.25,
+            ("paid", "shipped"): 1.0,
+        },
+    )
+    assert matrix.tolist() == [
+        [0.25, 0.5, 0.0, 0.25],
+        [0.0, 0.0, 1.0, 0.0],
+        [0.0, 0.0, 1.0, 0.0],
+        [0.0, 0.0, 0.0, 1.0],
+    ]
+    assert (simulation.transition_matrix(Order, matrix) == matrix).all()
+
+    matrix = simulation.transition_matrix(
+        Order, {("new", "paid"): 0.7, ("new", "cancelled"): 0.2 + 0.1}
+    )
+    assert matrix[0, 0] == 0.0
+
+
+def test_transition_matrix_is_validated():
+    with pytest.raises(ValueError):
+        simulation.transition_matrix(Order, {("new", "shipped"): 0.5})
+    with pytest.raises(ValueError):
+        simulation.transition_matrix(
+            Order, {("new", "paid"): 0.7, ("new", "cancelled"): 0.7}
+        )
+    with pytest.raises(ValueError):
+        simulation.transition_matrix(Order, numpy.eye(3))
+    with pytest.raises(ValueError):
+        simulation.transition_matrix(Order, numpy.eye(4) * 0.5)
+
+
+def test_simulate():
+    occupancy = simulation.simulate(
+        Order,
+        {("new", "paid"): 1.0, ("paid", "shipped"): 0.5},
+        {"new": 10000, "cancelled": 5},
+        ticks=3,
+        seed=1,
+    )
+    assert occupancy.shape == (4, 4)
+    assert occupancy[0].tolist() == [10000, 0, 0, 5]
+    assert occupancy[1].tolist() == [0, 10000, 0, 5]
+    assert (occupancy.sum(axis=1) == 10005).all()
+    # Entities move at most once per tick.
+    assert occupancy[2, 2] + occupancy[2, 1] == 10000
+    assert 4700 < occupancy[2, 2] < 5300
+    assert 7200 < occupancy[3, 2] < 7800
+
+
+def test_simulate_matches_expected_occupancy():
+    matrix = simulation.transition_matrix(
+        Order,
+        {
+            ("new", "paid"): 0.2,
+            ("new", "cancelled"): 0.1,
+            ("paid", "shipped"): 0.3,
+            ("paid", "cancelled"): 0.05,
+        },
+    )
+    size = 100000
+    occupancy = simulation.simulate(Order, matrix, {"new": size}, 10, seed=2)
+
+    expected = numpy.array([size, 0, 0, 0]) @ numpy.linalg.matrix_power(matrix, 10)
+    assert numpy.abs(occupancy[-1] - expected).max() < 0.01 * size
+
+
+def test_simulate_steps_states_in_place():
+    states = simulation.initial_states(Order, {"paid": 3, "new": 2})
+    assert states.tolist() == [0, 0, 1, 1, 1]
+
+    occupancy = simulation.simulate(
+        Order, {("new", "paid"): 1.0, ("paid", "shipped"): 1.0}, states, 1
+    )
+    assert states.tolist() == [1, 1, 2, 2, 2]
+    assert occupancy[-1].tolist() == [0, 2, 3, 0]
+    assert simulation.get_states(Order)[2] is Order.States.SHIPPED
@@ -0,0 +1,201 @@
+import asyncio
+import gc
+import threading
+import weakref
+from enum import Enum
+
+import pytest
+
+from super_state_machine import machines, timers
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _get_wheel(**kwargs):
+    clock = FakeClock()
+    kwargs.setdefault("resolution", 1)
+    return timers.TimerWheel(clock=clock, **kwargs), clock
+
+
+def test_timer_fires_after_delay():
+    wheel, clock = _get_wheel()
+    fired = []
+    wheel.schedule(3, fired.append, "a")
+    assert len(wheel) == 1
+
+    clock.now = 2
+    assert wheel.advance() == 0
+    clock.now = 3
+    assert wheel.advance() == 1
+    assert fired == ["a"]
+    assert len(wheel) == 0
+
+
+def test_timers_fire_in_batches_across_levels():
+    wheel, clock = _get_wheel(slot_bits=2, levels=3)
+    fired = []
+    delays = [1, 3, 4, 5, 15, 16, 17, 63, 64, 100, 1000]
+    for delay in delays:
+        wheel.schedule(delay, fired.append, delay)
+
+    for now in range(1, 1001):
+        clock.now = now
+        wheel.advance()
+        assert fired == [delay for delay in delays if delay <= now]
+
+
+def test_big_jump_fires_everything_at_once():
+    wheel, clock = _get_wheel(slot_bits=2, levels=2)
+    fired = []
+    for delay in [2, 7, 30]:
+        wheel.schedule(delay, fired.append, delay)
+    clock.now = 50
+    assert wheel.advance() == 3
+    assert sorted(fired) == [2, 7, 30]
+
+
+def test_cancel_timer():
+    wheel, clock = _get_wheel()
+    fired = []
+    timer = wheel.schedule(3, fired.append, "a")
+    wheel.cancel(timer)
+    wheel.cancel(timer)
+    assert len(wheel) == 0
+    clock.now = 10
+    assert wheel.advance() == 0
+    assert fired == []
+
+
+def test_thread_driver():
+    wheel = timers.TimerWheel(resolution=0.01)
+    event = threading.Event()
+    wheel.schedule(0.02, event.set)
+    driver = timers.ThreadDriver(wheel)
+    driver.start()
+    try:
+        assert event.wait(5)
+    finally:
+        driver.stop()
+
+
+def test_asyncio_driver():
+    wheel = timers.TimerWheel(resolution=0.01)
+    fired = []
+
+    async def run():
+        driver = timers.AsyncioDriver(wheel)
+        driver.start()
+        wheel.schedule(0.02, fired.append, True)
+        for _ in range(500):
+            if fired:
+                break
+            await asyncio.sleep(0.01)
+        await driver.stop()
+
+    asyncio.run(run())
+    assert fired == [True]
+
+
+def _get_machine_class(wheel):
+    class Job(machines.StateMachine):
+        class States(Enum):
+            PENDING = "pending"
+            RUNNING = "running"
+            EXPIRED = "expired"
+
+        class Meta:
+            initial_state = "pending"
+            transitions = {
+                "pending": ["running"],
+            }
+            timeouts = {
+                "pending": (30, "expired"),
+            }
+            timer_wheel = wheel
+
+    return Job
+
+
+def test_timed_state():
+    wheel, clock = _get_wheel()
+    Job = _get_machine_class(wheel)
+
+    job = Job()
+    assert job.can_be_expired is True
+    clock.now = 29
+    wheel.advance()
+    assert job.is_pending is True
+    clock.now = 30
+    wheel.advance()
+    assert job.is_expired is True
+    assert len(wheel) == 0
+
+
+def test_timer_is_cancelled_when_state_is_left():
+    wheel, clock = _get_wheel()
+    Job = _get_machine_class(wheel)
+
+    job = Job()
+    other = Job()
+    job.set_running()
+    assert len(wheel) == 1
+    clock.now = 30
+    wheel.advance()
+    assert job.is_running is True
+    assert other.is_expired is True
+
+
+def test_timer_is_restarted_when_state_is_entered_again():
+    wheel, clock = _get_wheel()
+    Job = _get_machine_class(wheel)
+
+    job = Job()
+    clock.now = 20
+    job.force_set("running")
+    job.force_set("pending")
+    clock.now = 30
+    wheel.advance()
+    assert job.is_pending is True
+    clock.now = 50
+    wheel.advance()
+    assert job.is_expired is True
+
+
+def test_timers_dont_keep_machines_alive():
+    wheel, clock = _get_wheel()
+    Job = _get_machine_class(wheel)
+
+    reference = weakref.ref(Job())
+    gc.collect()
+    assert reference() is None
+    clock.now = 30
+    wheel.advance()
+
+
+def test_timeouts_require_proper_states():
+    with pytest.raises(ValueError):
+
+        class Job(machines.StateMachine):
+            class States(Enum):
+                PENDING = "pending"
+
+            class Meta:
+                initial_state = "pending"
+                timeouts = {"pending": (30, "expired")}
+
+
+def test_machines_without_timeouts_dont_get_listeners():
+    class Machine(machines.StateMachine):
+        class States(Enum):
+            ONE = "one"
+
+        state = "one"
+
+    assert Machine._meta["listeners"] == ()
+    assert Machine._meta["initializers"] == ()
@@ -0,0 +1,160 @@
+from concurrent.futures import ThreadPoolExecutor
+import gc
+from enum import Enum
+
+import pytest
+
+from super_state_machine import machines
+
+
+class StatesEnum(Enum):
+    OPEN = "open"
+    FAILED = "failed"
+    CLOSED = "closed"
+
+
+class Machine(machines.StateMachine):
+    States = StatesEnum
+    state = "open"
+
+    class Meta:
+        track_instances = True
+
+
+def test_instances_are_indexed_by_state():
+    first = Machine()
+    second = Machine()
+    assert set(Machine.instances_in("open")) >= set([first, second])
+
+    before = Machine.count_in(StatesEnum.FAILED)
+    first.set_failed()
+    second.force_set("failed")
+    assert Machine.count_in("failed") == before + 2
+    assert first in Machine.instances_in("failed")
+    assert first not in Machine.instances_in("open")
+
+    second.set_closed()
+    assert second in Machine.instances_in("closed")
+    assert second not in Machine.instances_in("failed")
+    assert Machine.count_in("failed") == before + 1
+
+
+def test_index_doesnt_keep_machines_alive():
+    gc.collect()
+    before = Machine.count_in("closed")
+    machine = Machine()
+    machine.set_closed()
+    assert Machine.count_in("closed") == before + 1
+    del machine
+    gc.collect()
+    assert Machine.count_in("closed") == before
+
+
+def test_subclass_has_own_index():
+    class Child(Machine):
+        pass
+
+    child = Child()
+    child.set_failed()
+    assert Child.instances_in("failed") == [child]
+    assert child not in Machine.instances_in("failed")
+
+
+def test_tracking_is_disabled_by_default():
+    class Untracked(machines.StateMachine):
+        States = StatesEnum
+        state = "open"
+
+    assert not hasattr(Untracked, "instances_in")
+    assert Untracked._meta["listeners"] == ()
+
+
+def test_wrong_states_are_rejected():
+    with pytest.raises(ValueError):
+        Machine.count_in("wrong")
+
+
+class Checkpointed(machines.StateMachine):
+    States = StatesEnum
+    state = "open"
+
+    class Meta:
+        track_dirty = True
+
+
+def test_dirty_tracking():
+    Checkpointed.clear_dirty()
+    first = Checkpointed()
+    second = Checkpointed()
+    assert set(Checkpointed.collect_dirty()) == set([first, second])
+    assert Checkpointed.collect_dirty() == []
+
+    first.set_failed()
+    first.set_closed()
+    assert Checkpointed.collect_dirty() == [first]
+
+    second.force_set("closed")
+    second.clear_dirty()
+    assert Checkpointed.collect_dirty() == []
+
+    first.force_set("open")
+    second.force_set("open")
+    Checkpointed.clear_dirty()
+    assert Checkpointed.collect_dirty() == []
+
+
+def test_dirty_tracking_doesnt_keep_machines_alive():
+    Checkpointed.clear_dirty()
+    machine = Checkpointed()
+    machine.set_failed()
+    del machine
+    gc.collect()
+    assert Checkpointed.collect_dirty() == []
+
+
+def test_history():
+    class Recorded(machines.StateMachine):
+        States = StatesEnum
+        state = "open"
+
+        class Meta:
+            history = 3
+
+    sm = Recorded()
+    assert sm.history() == []
+    assert not hasattr(sm, "_state_history")
+
+    sm.set_failed()
+    sm.set_closed()
+    assert [item[:2] for item in sm.history()] == [
+        (StatesEnum.OPEN, StatesEnum.FAILED),
+        (StatesEnum.FAILED, StatesEnum.CLOSED),
+    ]
+
+    sm.set_open()
+    sm.set_failed()
+    history = sm.history()
+    assert [item[:2] for item in history] == [
+        (StatesEnum.FAILED, StatesEnum.CLOSED),
+        (StatesEnum.CLOSED, StatesEnum.OPEN),
+        (StatesEnum.OPEN, StatesEnum.FAILED),
+    ]
+    timestamps = [item[2] for item in history]
+    assert timestamps == sorted(timestamps)
+    assert len(sm._state_history.timestamps) == 3
+    assert Recorded().history() == []
+
+
+def test_index_is_updated_concurrently():
+    def work(_):
+        machine = Machine()
+        for _ in range(50):
+            machine.force_set("failed")
+            machine.force_set("closed")
+        return machine
+
+    with ThreadPoolExecutor(8) as executor:
+        created = list(executor.map(work, range(40)))
+
+    assert set(created) <= set(Machine.instances_in("closed"))
+    assert not set(created) & set(Machine.instances_in("failed"))
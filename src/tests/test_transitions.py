@@ -442,3 +442,239 @@ def test_force_set_accepts_only_proper_values():
         machine.force_set("fourtyfour")
     with pytest.raises(ValueError):
         machine.force_set(OtherEnum.ONE)
+
+
+def test_reachability():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+        class Meta:
+            transitions = {
+                "one": ["two"],
+                "two": ["three"],
+                "three": ["two"],
+            }
+
+    assert Machine.can_reach("one", "three") is True
+    assert Machine.can_reach(StatesEnum.THREE, "one") is False
+    assert Machine.can_reach("four", "four") is True
+
+    sm = Machine()
+    assert sm.can_reach("three") is True
+    assert sm.can_reach("four") is False
+    sm.set_two()
+    assert sm.can_reach("one") is False
+
+    with pytest.raises(ValueError):
+        sm.can_reach("five")
+    with pytest.raises(ValueError):
+        Machine.can_reach("one", OtherEnum.ONE)
+
+
+def test_shortest_path():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+        class Meta:
+            transitions = {
+                "one": ["two", "four"],
+                "two": ["three"],
+                "four": ["three"],
+            }
+            named_transitions = [
+                ("finish", "four", ["three"]),
+            ]
+
+    assert Machine.path("one", "three") in [
+        (StatesEnum.ONE, StatesEnum.TWO, StatesEnum.THREE),
+        (StatesEnum.ONE, StatesEnum.FOUR, StatesEnum.THREE),
+    ]
+    assert Machine.path("two", "four") == (
+        StatesEnum.TWO,
+        StatesEnum.THREE,
+        StatesEnum.FOUR,
+    )
+    assert Machine.path("three", "one") is None
+
+    sm = Machine()
+    assert sm.path("one") == (StatesEnum.ONE,)
+    assert sm.path("four") == (StatesEnum.ONE, StatesEnum.FOUR)
+
+
+def test_reachability_name_collision():
+    with pytest.raises(ValueError):
+
+        class Machine(machines.StateMachine):
+            States = StatesEnum
+            state = "one"
+
+            def can_reach(self, state):
+                pass
+
+
+def test_advance_to():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+        class Meta:
+            transitions = {
+                "one": ["two"],
+                "two": ["three"],
+                "three": ["four"],
+            }
+
+    sm = Machine()
+    sm.advance_to("four")
+    assert sm.is_four is True
+
+    with pytest.raises(errors.TransitionError):
+        sm.advance_to("one")
+    assert sm.is_four is True
+
+    sm.advance_to("four")
+    assert sm.is_four is True
+
+
+def test_transitions_dont_accept_wrong_enums_as_targets():
+    with pytest.raises(ValueError):
+
+        class Machine(machines.StateMachine):
+            States = StatesEnum
+            state = "one"
+
+            class Meta:
+                transitions = {
+                    StatesEnum.ONE: [OtherEnum.ONE],
+                }
+
+
+def test_named_transitions_with_many_initial_states():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+        class Meta:
+            named_transitions = [
+                ("finish", "four", ["one", StatesEnum.TWO, "three"]),
+                ("restart", "one", "four"),
+                ("noop", "two", None),
+            ]
+
+    transitions = Machine._meta["transitions"]
+    assert transitions[StatesEnum.ONE] == {StatesEnum.FOUR}
+    assert transitions[StatesEnum.TWO] == {StatesEnum.FOUR}
+    assert transitions[StatesEnum.THREE] == {StatesEnum.FOUR}
+    assert transitions[StatesEnum.FOUR] == {StatesEnum.ONE}
+
+
+def test_try_set():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+        class Meta:
+            transitions = {
+                "one": ["two"],
+                "two": ["three"],
+            }
+
+    sm = Machine()
+    assert sm.try_set_("three") is False
+    assert sm.is_one is True
+    assert sm.try_set_three() is False
+    assert sm.is_one is True
+
+    assert sm.try_set_("two") is True
+    assert sm.is_two is True
+    assert sm.try_set_three() is True
+    assert sm.is_three is True
+
+    with pytest.raises(ValueError):
+        sm.try_set_("five")
+
+
+def test_try_set_on_complete_machine():
+    class Machine(machines.StateMachine):
+        States = StatesEnum
+        state = "one"
+
+    sm = Machine()
+    assert sm.try_set_four() is True
+    assert sm.is_four is True
+    assert sm.try_set_(StatesEnum.ONE) is True
+    assert sm.is_one is True
+
+
+class Document(machines.StateMachine):
+    States = StatesEnum
+    state = "one"
+
+    class Meta:
+        events = {
+            "submit": [("one", "two")],
+            "approve": [("two", "three"), ("one", "three")],
+            "reset": [("two", "one"), ("three", "one")],
+        }
+
+
+def test_events():
+    sm = Document()
+    sm.send("submit")
+    assert sm.is_two is True
+    sm.send("approve")
+    assert sm.is_three is True
+    with pytest.raises(errors.TransitionError):
+        sm.send("submit")
+    assert sm.is_three is True
+    sm.send("reset")
+    sm.send("approve")
+    assert sm.is_three is True
+
+    with pytest.raises(ValueError):
+        sm.send("unknown")
+
+
+def test_events_define_transitions():
+    assert Document._meta["complete"] is False
+    transitions = Document._meta["transitions"]
+    assert transitions[StatesEnum.ONE] == {StatesEnum.TWO, StatesEnum.THREE}
+    assert transitions[StatesEnum.FOUR] == set()
+    sm = Document()
+    with pytest.raises(errors.TransitionError):
+        sm.set_four()
+
+
+def test_events_with_many_targets_are_rejected():
+    with pytest.raises(ValueError):
+
+        class Machine(machines.StateMachine):
+            States = StatesEnum
+            state = "one"
+
+            class Meta:
+                events = {"go": [("one", "two"), ("one", "three")]}
+
+
+def test_events_are_inherited():
+    class Child(Document):
+        class Meta:
+            events = {"finish": [("three", "four")]}
+
+    class Narrowed(Document):
+        class States(Enum):
+            ONE = "one"
+            THREE = "three"
+
+    sm = Child()
+    sm.send("approve")
+    sm.send("finish")
+    assert sm.is_four is True
+
+    narrowed = Narrowed()
+    with pytest.raises(errors.TransitionError):
+        narrowed.send("submit")
+    narrowed.send("approve")
+    assert narrowed.is_three is True
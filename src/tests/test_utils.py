@@ -1,5 +1,5 @@
 import pytest
-from enum import Enum
+from enum import Enum, IntEnum
 
 from super_state_machine import utils
 
@@ -58,6 +58,141 @@ def test_translator_for_enum_value():
         trans.translate(OtherEnum.ONE)
 
 
+def test_translator_matches_members_by_identity():
+    class MixinEnum(str, Enum):
+        ONE = "one"
+        TWO = "two"
+
+    class OtherMixinEnum(str, Enum):
+        ONE = "one"
+
+    for translator in [
+        utils.EnumValueTranslator(MixinEnum),
+        utils.EnumValueTranslator(MixinEnum, case_insensitive=True),
+    ]:
+        assert translator.translate(MixinEnum.ONE) is MixinEnum.ONE
+        assert translator.translate("one") is MixinEnum.ONE
+        with pytest.raises(ValueError) as info:
+            translator.translate(OtherMixinEnum.ONE)
+        assert "doesn't belong to states enum" in str(info.value)
+
+
 def test_translator_doesnt_accept_non_unique_enums():
     with pytest.raises(ValueError):
         utils.EnumValueTranslator(NonUniqueEnum)
+
+
+def test_translator_search_table_contains_members_and_values():
+    trans = utils.EnumValueTranslator(StatesEnum)
+    assert trans.search_table["one"] is StatesEnum.ONE
+    assert trans.search_table[StatesEnum.ONE] is StatesEnum.ONE
+    assert len(trans.search_table) == 2 * len(StatesEnum)
+
+
+def test_translator_errors():
+    trans = utils.EnumValueTranslator(StatesEnum)
+    with pytest.raises(ValueError, match="doesn't belong to states enum"):
+        trans.translate(OtherEnum.ONE)
+    with pytest.raises(ValueError, match="doesn't match any state"):
+        trans.translate("five")
+
+
+def test_translator_error_message_is_bounded():
+    trans = utils.EnumValueTranslator(StatesEnum)
+    with pytest.raises(ValueError) as error:
+        trans.translate("x" * 10000)
+    assert len(str(error.value)) < 200
+
+
+def test_translator_aliases():
+    trans = utils.EnumValueTranslator(
+        StatesEnum, aliases={"1": "one", "II": StatesEnum.TWO}
+    )
+    assert trans.translate("1") is StatesEnum.ONE
+    assert trans.translate("II") is StatesEnum.TWO
+    assert trans.translate("one") is StatesEnum.ONE
+    with pytest.raises(ValueError):
+        trans.translate("ii")
+
+
+def test_translator_aliases_must_point_to_proper_states():
+    with pytest.raises(ValueError):
+        utils.EnumValueTranslator(StatesEnum, aliases={"5": "five"})
+
+
+def test_translator_aliases_cant_be_ambiguous():
+    with pytest.raises(ValueError):
+        utils.EnumValueTranslator(StatesEnum, aliases={"one": "two"})
+    utils.EnumValueTranslator(StatesEnum, aliases={"one": "one"})
+
+
+def test_translator_names():
+    trans = utils.EnumValueTranslator(StatesEnum, names=True)
+    assert trans.translate("ONE") is StatesEnum.ONE
+    assert trans.translate("one") is StatesEnum.ONE
+    with pytest.raises(ValueError):
+        trans.translate("One")
+
+    trans = utils.EnumValueTranslator(StatesEnum)
+    with pytest.raises(ValueError):
+        trans.translate("ONE")
+
+
+def test_translator_names_cant_be_ambiguous():
+    class Swapped(Enum):
+        A = "B"
+        B = "A"
+
+    utils.EnumValueTranslator(Swapped)
+    with pytest.raises(ValueError):
+        utils.EnumValueTranslator(Swapped, names=True)
+
+
+def test_case_insensitive_translator():
+    trans = utils.EnumValueTranslator(
+        StatesEnum, aliases={"Legacy-1": "one"}, case_insensitive=True
+    )
+    assert trans.translate("One") is StatesEnum.ONE
+    assert trans.translate("TWO") is StatesEnum.TWO
+    assert trans.translate("legacy-1") is StatesEnum.ONE
+    assert trans.translate(StatesEnum.THREE) is StatesEnum.THREE
+    with pytest.raises(ValueError):
+        trans.translate("fiVe")
+    with pytest.raises(ValueError):
+        trans.translate(OtherEnum.ONE)
+
+
+def test_case_insensitive_translator_cant_be_ambiguous():
+    class Cased(Enum):
+        LOWER = "a"
+        UPPER = "A"
+
+    with pytest.raises(ValueError):
+        utils.EnumValueTranslator(Cased, case_insensitive=True)
+
+
+def test_translator_requires_exact_types_for_integer_states():
+    class IntegerEnum(IntEnum):
+        ZERO = 0
+        ONE = 1
+
+    class OtherIntegerEnum(IntEnum):
+        ONE = 1
+
+    class PlainIntegerEnum(Enum):
+        ZERO = 0
+        ONE = 1
+
+    class Integer(int):
+        pass
+
+    for states in [IntegerEnum, PlainIntegerEnum]:
+        translator = utils.EnumValueTranslator(states)
+        assert translator.translate(1) is states.ONE
+        assert translator.translate(Integer(1)) is states.ONE
+        for value in [True, False, 1.0, 0.0, OtherIntegerEnum.ONE]:
+            with pytest.raises(ValueError):
+                translator.translate(value)
+
+    translator = utils.EnumValueTranslator(IntegerEnum)
+    assert translator.translate(IntegerEnum.ONE) is IntegerEnum.ONE
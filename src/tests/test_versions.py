@@ -0,0 +1,112 @@
+from enum import Enum
+
+import pytest
+
+from super_state_machine import backends, compile, errors, extras, machines
+
+
+class StatesEnum(Enum):
+    NEW = "new"
+    ACTIVE = "active"
+    CLOSED = "closed"
+
+
+class Machine(machines.StateMachine):
+    States = StatesEnum
+    state = "new"
+
+    class Meta:
+        transitions = {"new": ["active"], "active": ["closed"]}
+        versioned = True
+
+
+def test_version_is_bumped_on_every_change():
+    sm = Machine()
+    assert sm.version == 0
+    sm.set_active()
+    assert sm.version == 1
+    sm.force_set("new")
+    sm.force_set("new")
+    assert sm.version == 3
+    assert sm.is_new is True
+    assert Machine().version == 0
+
+
+def test_set_with_expected_version():
+    sm = Machine()
+    version = sm.version
+    other = Machine()
+    sm.set_("active", expected_version=version)
+    assert sm.is_active is True
+
+    with pytest.raises(errors.StaleStateError):
+        sm.set_("closed", expected_version=version)
+    assert sm.is_active is True
+
+    with pytest.raises(errors.TransitionError):
+        other.set_("closed", expected_version=0)
+
+    sm.set_("closed", expected_version=version + 1)
+    assert sm.is_closed is True
+
+
+def test_unversioned_machine_doesnt_accept_expected_version():
+    class Plain(machines.StateMachine):
+        States = StatesEnum
+        state = "new"
+
+    sm = Plain()
+    assert not hasattr(sm, "version")
+    with pytest.raises(ValueError):
+        sm.set_("active", expected_version=0)
+    with pytest.raises(ValueError):
+        compile.compile_machine(Machine)
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [backends.MemoryBackend(), backends.SQLiteBackend(batch_size=10)],
+    ids=["memory", "sqlite"],
+)
+def test_versions_in_backend(backend):
+    states_backend = backend
+
+    class Stored(Machine):
+        class Meta:
+            backend = states_backend
+            track_instances = True
+
+        def __init__(self, id):
+            self.id = id
+
+    first = Stored("a")
+    same = Stored("a")
+    assert first.version == 0
+    first.set_active()
+    first.force_set("active")
+    assert same.version == 2
+
+    with pytest.raises(errors.StaleStateError):
+        same.set_("closed", expected_version=1)
+    same.set_("closed", expected_version=2)
+    assert first.is_closed is True
+    assert same in Stored.instances_in("closed")
+
+
+def test_compare_and_set_many():
+    first, second, third = Machine(), Machine(), Machine()
+    second.set_active()
+    second.set_closed()
+    second.force_set("new")
+
+    rejected = extras.compare_and_set_many(
+        [(first, "active", 0), (second, "active", 0), (third, "active", 0)]
+    )
+    assert rejected == [second]
+    assert first.is_active is True
+    assert second.is_new is True
+    assert third.is_active is True
+
+    with pytest.raises(errors.TransitionError):
+        extras.compare_and_set_many([(first, "closed", 1), (second, "closed", 3)])
+    assert first.is_active is True